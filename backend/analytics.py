@@ -0,0 +1,616 @@
+"""
+Aggregate queries behind the /analytics/* endpoints and their result cache.
+
+Each query function takes a cursor plus its filters as keyword arguments and
+returns the result rows. cached_query() normalizes the filters from a
+request, keys the cache on endpoint plus filters, and only runs SQL on a
+miss. The cache backend is chosen with Config.ANALYTICS_CACHE_BACKEND and is
+cleared whenever the loaders bump the data version.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from urllib.parse import urlencode
+import numpy as np
+from config import Config
+from database import get_db_connection, get_data_version, get_pool
+from cache import LRUCache, SQLiteCache
+import column_store
+import metrics
+import partitions
+
+logger = logging.getLogger(__name__)
+
+
+def speed_stats(cursor, side=None, position_group=None, week=None, team=None):
+    """Get speed statistics by position"""
+    # Combine the partial aggregates in speed_rollup (see build_derived.py)
+    # instead of scanning tracking_data. Convert yards/sec to mph: multiply
+    # by 2.04545. The sample standard deviation is rebuilt from the sums:
+    # sqrt((sum_sq - sum^2 / n) / (n - 1))
+    query = """
+        SELECT 
+            r.position,
+            SUM(r.num_frames)::bigint as num_frames,
+            ROUND(((SUM(r.sum_s) / SUM(r.num_frames))::double precision * 2.04545)::numeric, 2) as avg_speed,
+            ROUND((MAX(r.max_s) * 2.04545)::numeric, 2) as max_speed,
+            ROUND((MIN(r.min_s) * 2.04545)::numeric, 2) as min_speed,
+            ROUND((SQRT(GREATEST(SUM(r.sum_sq) - SUM(r.sum_s) * SUM(r.sum_s) / SUM(r.num_frames), 0)
+                        / NULLIF(SUM(r.num_frames) - 1, 0))::double precision * 2.04545)::numeric, 2) as speed_stddev
+        FROM speed_rollup r
+    """
+
+    where_clauses = []
+    params = []
+
+    if week:
+        where_clauses.append("r.week = %s")
+        params.append(int(week))
+    if team:
+        where_clauses.append("(r.home_team_abbr = %s OR r.visitor_team_abbr = %s)")
+        params.append(team)
+        params.append(team)
+
+    # Add side filter (which side they lined up on)
+    if side:
+        where_clauses.append("LOWER(r.player_side) = LOWER(%s)")
+        params.append(side)
+
+    # Add position group filter (by position type)
+    if position_group:
+        if position_group.lower() == 'offense':
+            where_clauses.append("r.position IN ('QB', 'RB', 'FB', 'WR', 'TE')")
+        elif position_group.lower() == 'defense':
+            where_clauses.append("r.position IN ('CB', 'S', 'SS', 'FS', 'LB', 'ILB', 'OLB', 'MLB', 'DE', 'DT', 'NT', 'DL')")
+
+    # Add WHERE clause
+    if where_clauses:
+        query += " WHERE " + " AND ".join(where_clauses)
+
+    # Group and order
+    query += """
+        GROUP BY r.position
+        ORDER BY avg_speed DESC
+    """
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def route_analysis(cursor, week=None, team=None):
+    """Get route analysis with completion rates and yards"""
+    query = """
+        SELECT 
+            p.route_of_targeted_receiver as route,
+            COUNT(*) as attempts,
+            COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END) as completions,
+            ROUND(COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END)::numeric / COUNT(*)::numeric * 100, 1) as completion_pct,
+            ROUND(AVG(p.pass_length)::numeric, 1) as avg_depth,
+            ROUND(AVG(p.yards_gained)::numeric, 1) as avg_yards,
+            ROUND(AVG(p.expected_points_added)::numeric, 2) as avg_epa
+        FROM play_information p
+        WHERE p.route_of_targeted_receiver IS NOT NULL
+    """
+
+    params = []
+
+    if week:
+        query += " AND p.week = %s"
+        params.append(int(week))
+
+    if team:
+        query += " AND (p.home_team_abbr = %s OR p.visitor_team_abbr = %s)"
+        params.append(team)
+        params.append(team)
+
+    query += """
+        GROUP BY p.route_of_targeted_receiver
+        HAVING COUNT(*) >= 5
+        ORDER BY attempts DESC
+    """
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def separation_stats(cursor, week=None, team=None):
+    """
+    Get targeted receiver separation on completions by route
+
+    Separation is the distance in yards from the targeted receiver to the
+    nearest defender, precomputed from tracking data into play_separation
+    (see separation.py). avg/min/max are taken at the catch.
+    """
+    query = """
+        SELECT 
+            p.route_of_targeted_receiver as receiver,
+            COUNT(*) as catches,
+            ROUND(AVG(s.separation_at_catch)::numeric, 1) as avg_separation,
+            ROUND(MIN(s.separation_at_catch)::numeric, 1) as min_separation,
+            ROUND(MAX(s.separation_at_catch)::numeric, 1) as max_separation,
+            ROUND(AVG(s.separation_at_throw)::numeric, 1) as avg_separation_at_throw,
+            ROUND(AVG(s.min_separation)::numeric, 1) as avg_min_separation
+        FROM play_information p
+        JOIN play_separation s ON p.game_id = s.game_id AND p.play_id = s.play_id
+        WHERE p.pass_result = 'C'
+            AND s.player_role = 'Targeted Receiver'
+            AND s.separation_at_catch IS NOT NULL
+            AND p.route_of_targeted_receiver IS NOT NULL
+    """
+
+    params = []
+
+    if week:
+        query += " AND p.week = %s"
+        params.append(int(week))
+
+    if team:
+        query += " AND p.possession_team = %s"
+        params.append(team)
+
+    query += """
+        GROUP BY p.route_of_targeted_receiver
+        HAVING COUNT(*) >= 5
+        ORDER BY catches DESC
+        LIMIT 15
+    """
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def formation_matchup(cursor, week=None, team=None):
+    """Get formation vs coverage matchup success rates"""
+    query = """
+        SELECT 
+            p.offense_formation,
+            p.team_coverage_type,
+            COUNT(*) as plays,
+            COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END) as completions,
+            ROUND(COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END)::numeric / COUNT(*)::numeric * 100, 1) as completion_pct,
+            ROUND(AVG(p.yards_gained)::numeric, 1) as avg_yards,
+            ROUND(AVG(p.expected_points_added)::numeric, 2) as avg_epa
+        FROM play_information p
+        WHERE p.offense_formation IS NOT NULL
+            AND p.team_coverage_type IS NOT NULL
+    """
+
+    params = []
+
+    if week:
+        query += " AND p.week = %s"
+        params.append(int(week))
+
+    if team:
+        query += " AND (p.home_team_abbr = %s OR p.visitor_team_abbr = %s)"
+        params.append(team)
+        params.append(team)
+
+    query += """
+        GROUP BY p.offense_formation, p.team_coverage_type
+        HAVING COUNT(*) >= 3
+        ORDER BY plays DESC
+    """
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def round_numeric(value, places):
+    """Round like Postgres ROUND(numeric, n): half away from zero, as a Decimal"""
+    return Decimal(str(value)).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+
+
+def speed_vs_success(cursor, week=None, team=None):
+    """Get speed vs success rate correlation for receivers"""
+    if Config.TRACKING_BACKEND == 'column_store':
+        store = column_store.get_store()
+        if store is not None:
+            return speed_vs_success_from_store(cursor, store, week, team)
+
+    # Calculate avg speed and success rate for offensive positions
+    query = """
+        WITH receiver_stats AS (
+            SELECT 
+                t.player_name,
+                t.player_position,
+                ROUND(AVG(t.s * 2.04545)::numeric, 2) as avg_speed,
+                COUNT(DISTINCT CASE WHEN p.pass_result = 'C' THEN p.play_id END) as completions,
+                COUNT(DISTINCT p.play_id) as targets
+            FROM tracking_data t
+            JOIN play_information p ON t.game_id = p.game_id AND t.play_id = p.play_id
+            WHERE t.player_position IN ('WR', 'TE', 'RB')
+                AND t.player_side = 'Offense'
+                AND t.s IS NOT NULL
+    """
+
+    params = []
+
+    if week:
+        query += " AND p.week = %s"
+        params.append(int(week))
+        # t.week lets Postgres read only that week's tracking_data partition;
+        # the column only exists once migration 0005 has run
+        if partitions.is_partitioned(cursor, 'tracking_data'):
+            query += " AND t.week = %s"
+            params.append(int(week))
+
+    if team:
+        query += " AND p.possession_team = %s"
+        params.append(team)
+
+    query += """
+            GROUP BY t.player_name, t.player_position
+            HAVING COUNT(DISTINCT p.play_id) >= 5
+        )
+        SELECT 
+            player_name,
+            player_position,
+            avg_speed,
+            targets,
+            completions,
+            ROUND((completions::numeric / targets::numeric * 100), 1) as success_rate
+        FROM receiver_stats
+        ORDER BY targets DESC
+        LIMIT 30
+    """
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def speed_vs_success_from_store(cursor, store, week=None, team=None):
+    """
+    speed_vs_success with the speeds read from the column store: only the
+    matching plays come from play_information, and the tracking rows are
+    aggregated from the mmapped columns instead of scanning tracking_data.
+    Same rows as the SQL version, including its per-play_id counts.
+    """
+    query = "SELECT p.game_id, p.play_id, p.pass_result FROM play_information p WHERE TRUE"
+    params = []
+    if week:
+        query += " AND p.week = %s"
+        params.append(int(week))
+    if team:
+        query += " AND p.possession_team = %s"
+        params.append(team)
+    cursor.execute(query, params)
+    plays = cursor.fetchall()
+
+    play, names, positions, speeds = store.player_speeds(
+        [(p['game_id'], p['play_id']) for p in plays], ('WR', 'TE', 'RB'), 'Offense'
+    )
+    if len(play) == 0:
+        return []
+    play_ids = np.array([p['play_id'] for p in plays], dtype=np.int64)[play]
+    completed = np.array([p['pass_result'] == 'C' for p in plays], dtype=bool)[play]
+
+    # One group per (player_name, player_position) code pair; codes start at -1
+    width = len(store.dictionaries['player_position']) + 1
+    keys, group = np.unique((names.astype(np.int64) + 1) * width + positions + 1, return_inverse=True)
+    frames = np.bincount(group, minlength=len(keys))
+    speed_sums = np.bincount(group, weights=speeds * 2.04545, minlength=len(keys))
+    # COUNT(DISTINCT play_id) per group, over all plays and over completions
+    targeted = np.unique(np.column_stack((group, play_ids)), axis=0)
+    targets = np.bincount(targeted[:, 0], minlength=len(keys))
+    caught = np.unique(np.column_stack((group, play_ids))[completed], axis=0)
+    completions = np.bincount(caught[:, 0], minlength=len(keys)) if len(caught) else np.zeros(len(keys), dtype=np.int64)
+
+    results = []
+    for i in np.flatnonzero(targets >= 5).tolist():
+        name_code, position_code = divmod(int(keys[i]), width)
+        results.append({
+            'player_name': store.decode('player_name', np.array([name_code - 1]))[0],
+            'player_position': store.decode('player_position', np.array([position_code - 1]))[0],
+            'avg_speed': round_numeric(speed_sums[i] / frames[i], 2),
+            'targets': int(targets[i]),
+            'completions': int(completions[i]),
+            'success_rate': round_numeric(Decimal(int(completions[i]) * 100) / int(targets[i]), 1)
+        })
+    results.sort(key=lambda row: row['targets'], reverse=True)
+    return results[:30]
+
+
+def down_distance_heatmap(cursor, week=None, team=None):
+    """Get success rate heatmap by down and distance"""
+    # Calculate success rate by down and distance buckets  
+    query = """
+        WITH situational_data AS (
+            SELECT 
+                p.down,
+                CASE 
+                    WHEN p.yards_to_go <= 3 THEN 'Short (1-3)'
+                    WHEN p.yards_to_go <= 6 THEN 'Medium (4-6)'
+                    WHEN p.yards_to_go <= 10 THEN 'Long (7-10)'
+                    ELSE 'Very Long (11+)'
+                END as distance,
+                p.expected_points_added,
+                p.pass_result,
+                p.yards_gained
+            FROM play_information p
+            WHERE p.down IS NOT NULL
+                AND p.yards_to_go IS NOT NULL
+                AND p.down <= 4
+    """
+
+    params = []
+
+    if week:
+        query += " AND p.week = %s"
+        params.append(int(week))
+
+    if team:
+        query += " AND p.possession_team = %s"
+        params.append(team)
+
+    query += """
+        )
+        SELECT 
+            down,
+            distance,
+            COUNT(*) as plays,
+            ROUND(AVG(expected_points_added)::numeric, 2) as avg_epa,
+            ROUND(COUNT(CASE WHEN pass_result = 'C' THEN 1 END)::numeric / COUNT(*)::numeric * 100, 1) as completion_pct,
+            ROUND(AVG(yards_gained)::numeric, 1) as avg_yards
+        FROM situational_data
+        GROUP BY down, distance
+        ORDER BY down, 
+            CASE distance
+                WHEN 'Short (1-3)' THEN 1
+                WHEN 'Medium (4-6)' THEN 2
+                WHEN 'Long (7-10)' THEN 3
+                WHEN 'Very Long (11+)' THEN 4
+            END
+    """
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+# endpoint name -> (query function, filters it accepts)
+ENDPOINTS = {
+    'speed-stats': (speed_stats, ('side', 'position_group', 'week', 'team')),
+    'route-analysis': (route_analysis, ('week', 'team')),
+    'separation-stats': (separation_stats, ('week', 'team')),
+    'formation-matchup': (formation_matchup, ('week', 'team')),
+    'speed-vs-success': (speed_vs_success, ('week', 'team')),
+    'down-distance-heatmap': (down_distance_heatmap, ('week', 'team'))
+}
+
+
+def normalize_filters(name, args):
+    """
+    Reduce request args to the filters an endpoint uses, in canonical form,
+    so equivalent requests share one cache entry.
+    """
+    filters = {}
+    for key in ENDPOINTS[name][1]:
+        value = args.get(key)
+        if value is None:
+            continue
+        value = str(value).strip()
+        if not value:
+            continue
+        if key == 'week':
+            value = int(value)
+        elif key in ('side', 'position_group'):
+            value = value.lower()
+        filters[key] = value
+
+    # Unknown position groups are ignored by the query, so drop them from the key too
+    if filters.get('position_group') not in (None, 'offense', 'defense'):
+        del filters['position_group']
+    return filters
+
+
+def cache_key(name, filters):
+    return name + '?' + urlencode(sorted(filters.items()))
+
+
+def create_cache():
+    backend = Config.ANALYTICS_CACHE_BACKEND
+    if backend == 'sqlite':
+        return SQLiteCache(Config.ANALYTICS_CACHE_PATH, ttl=Config.ANALYTICS_CACHE_TTL)
+    if backend == 'memory':
+        return LRUCache(Config.ANALYTICS_CACHE_MAX_BYTES, ttl=Config.ANALYTICS_CACHE_TTL)
+    return None
+
+
+analytics_cache = create_cache()
+
+
+def run_query(name, filters, conn, version=None):
+    """Serve one endpoint from the cache, running its query on a miss"""
+    query = ENDPOINTS[name][0]
+    if analytics_cache is None:
+        cursor = conn.cursor()
+        rows = query(cursor, **filters)
+        cursor.close()
+        return rows
+
+    analytics_cache.validate(get_data_version(conn) if version is None else version)
+    key = cache_key(name, filters)
+    rows = analytics_cache.get(key)
+    if rows is None:
+        cursor = conn.cursor()
+        rows = query(cursor, **filters)
+        cursor.close()
+        analytics_cache.put(key, rows)
+    return rows
+
+
+def cached_query(name, args):
+    """Result rows for an analytics endpoint given the request args"""
+    return run_query(name, normalize_filters(name, args), get_db_connection())
+
+
+# Sections returned by /analytics/dashboard when none are requested
+DASHBOARD_SECTIONS = ('speed-stats', 'route-analysis', 'down-distance-heatmap', 'formation-matchup')
+
+
+def _run_section(name, args):
+    """Run one dashboard section on its own pooled connection"""
+    start = time.perf_counter()
+    section = {'data': None, 'error': None}
+    pool = get_pool()
+    conn = None
+    try:
+        conn = pool.getconn()
+        section['data'] = run_query(name, normalize_filters(name, args), conn)
+    except Exception as e:
+        section['error'] = str(e)
+    finally:
+        if conn is not None:
+            pool.putconn(conn)
+    section['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return section
+
+
+def run_dashboard(args, sections=DASHBOARD_SECTIONS):
+    """
+    Run several analytics endpoints concurrently with shared filters.
+
+    Each section gets its own pooled connection and thread, so the total
+    latency is that of the slowest section. Failures are reported per
+    section instead of failing the whole payload. Repeated names are run
+    once, so a request never takes more threads and connections than there
+    are endpoints.
+    """
+    unknown = [name for name in sections if name not in ENDPOINTS]
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(unknown)}")
+    sections = list(dict.fromkeys(sections))[:len(ENDPOINTS)]
+    if not sections:
+        raise ValueError("No sections requested")
+
+    start = time.perf_counter()
+    args = dict(args.items())
+    # Section threads count their query time towards this request
+    context = metrics.request_context()
+    with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+        futures = {
+            name: executor.submit(metrics.run_in_context, context, _run_section, name, args)
+            for name in sections
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    return {
+        'sections': results,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def cache_stats():
+    return analytics_cache.stats() if analytics_cache is not None else None
+
+
+def warmup_combinations(cursor):
+    """Filter sets to precompute: every team x week (and all teams / all weeks)"""
+    cursor.execute("""
+        SELECT DISTINCT week FROM play_information WHERE week IS NOT NULL ORDER BY week
+    """)
+    weeks = [None] + [row['week'] for row in cursor.fetchall()]
+    cursor.execute("""
+        SELECT home_team_abbr as team FROM play_information WHERE home_team_abbr IS NOT NULL
+        UNION
+        SELECT visitor_team_abbr FROM play_information WHERE visitor_team_abbr IS NOT NULL
+        ORDER BY team
+    """)
+    teams = [None] + [row['team'] for row in cursor.fetchall()]
+
+    # The dashboard's speed chart also filters by side or position group
+    speed_filters = [{}] + [{key: value} for key in ('side', 'position_group')
+                            for value in ('offense', 'defense')]
+
+    for week in weeks:
+        for team in teams:
+            base = {key: value for key, value in (('week', week), ('team', team)) if value is not None}
+            for name in ENDPOINTS:
+                extras = speed_filters if name == 'speed-stats' else [{}]
+                for extra in extras:
+                    yield name, normalize_filters(name, {**base, **extra})
+
+
+# Session advisory lock held by the process running the warm-up, and the
+# cache entry that marks a data version as warmed
+WARMUP_LOCK_ID = 7_240_901
+WARMUP_DONE_KEY = 'warmup:done'
+
+
+def warm_cache():
+    """
+    Fill the analytics cache for the common filter combinations.
+
+    Runs at most once per data version across every process sharing the
+    cache: the advisory lock keeps workers that start together from running
+    it side by side, and the done entry stops later (or recycled) workers
+    from running it again. A combination that fails is logged and skipped.
+    """
+    if analytics_cache is None:
+        return 0
+
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        version = get_data_version(conn)
+        analytics_cache.validate(version)
+        if analytics_cache.get(WARMUP_DONE_KEY) is not None:
+            logger.info("Analytics cache already warm for data version %s", version)
+            return 0
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_try_advisory_lock(%s) AS locked", (WARMUP_LOCK_ID,))
+        if not cursor.fetchone()['locked']:
+            cursor.close()
+            conn.rollback()
+            logger.info("Analytics cache warm-up is running in another worker")
+            return 0
+
+        try:
+            combinations = list(warmup_combinations(cursor))
+            conn.rollback()
+
+            start = time.time()
+            failed = 0
+            for name, filters in combinations:
+                try:
+                    run_query(name, filters, conn, version)
+                except Exception:
+                    failed += 1
+                    logger.exception("Warm-up of %s failed", cache_key(name, filters))
+                conn.rollback()
+            elapsed = time.time() - start
+            analytics_cache.put(WARMUP_DONE_KEY, {'combinations': len(combinations), 'failed': failed})
+            logger.info("Warmed %d analytics results in %.1fs (%d failed)",
+                        len(combinations) - failed, elapsed, failed)
+            return len(combinations) - failed
+        finally:
+            conn.rollback()
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (WARMUP_LOCK_ID,))
+            cursor.close()
+            conn.rollback()
+    finally:
+        pool.putconn(conn)
+
+
+def start_warmup():
+    """
+    Run warm_cache in a daemon thread so startup is not delayed. Only the
+    sqlite backend is shared between workers; warming a per-process memory
+    cache would repeat every query in each worker, so it is skipped.
+    """
+    if not isinstance(analytics_cache, SQLiteCache):
+        logger.warning("ANALYTICS_WARMUP needs ANALYTICS_CACHE_BACKEND=sqlite; skipping the warm-up")
+        return None
+
+    def run():
+        try:
+            warm_cache()
+        except Exception:
+            logger.exception("Analytics cache warm-up failed")
+
+    thread = threading.Thread(target=run, name='analytics-warmup', daemon=True)
+    thread.start()
+    return thread
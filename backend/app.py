@@ -1,26 +1,66 @@
 from flask import Flask
 from flask_cors import CORS
+from config import Config
 from routes import api
+import logging
+import analytics
+import database
+import dimensions
+import play_search
+import metrics
 
-app = Flask(__name__)
-CORS(app)
-
-app.register_blueprint(api, url_prefix='/api')
-
-@app.route('/')
-def home():
-    return {
-        'message': 'NFL Tracking API',
-        'endpoints': {
-            'games': '/api/games',
-            'plays': '/api/plays?game_id=GAME_ID',
-            'play_tracking': '/api/play/PLAY_ID/tracking',
-            'play_routes': '/api/play/PLAY_ID/routes',
-            'players': '/api/players?position=POSITION'
+
+def create_app():
+    """
+    Build the Flask app.
+
+    gunicorn (see gunicorn.conf.py) calls this in every worker process after
+    the fork, so each worker opens its own connection pool instead of
+    sharing the master's. Every worker asks for the cache warm-up; only the
+    first one to start runs it (see analytics.warm_cache).
+    """
+    app = Flask(__name__)
+    CORS(app)
+    database.init_app(app)
+    metrics.init_app(app)
+
+    app.register_blueprint(api, url_prefix='/api')
+
+    if Config.PRELOAD_DIMENSIONS:
+        try:
+            dimensions.preload()
+            play_search.preload()
+        except Exception:
+            # Not fatal: the first request that needs them loads them
+            logging.getLogger(__name__).exception("Dimension preload failed")
+
+    if Config.ANALYTICS_WARMUP:
+        analytics.start_warmup()
+
+    @app.route('/')
+    def home():
+        return {
+            'message': 'NFL Tracking API',
+            'endpoints': {
+                'health': '/api/health',
+                'meta': '/api/meta',
+                'games': '/api/games',
+                'plays': '/api/plays?game_id=GAME_ID',
+                'plays_search': '/api/plays/search?down=3&distance=long&coverage=COVER_3_ZONE',
+                'play_tracking': '/api/play/PLAY_ID/tracking',
+                'play_routes': '/api/play/PLAY_ID/routes',
+                'play_proximity': '/api/play/GAME_ID/PLAY_ID/proximity?radius=YARDS',
+                'players': '/api/players?position=POSITION',
+                'metrics': '/api/metrics'
+            }
         }
-    }
+
+    return app
+
 
 if __name__ == '__main__':
+    # Development server: one process, for local use only. Production runs
+    # under gunicorn: gunicorn -c gunicorn.conf.py
     import os
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=port, debug=False)
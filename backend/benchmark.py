@@ -0,0 +1,395 @@
+"""
+End-to-end load benchmark for the API.
+
+Replays a weighted mix of requests against every route in routes.py from
+concurrent clients and reports latency percentiles, throughput, error counts
+and peak RSS as JSON, tagged with the git commit, so runs can be compared
+across commits. Load a database first (synthetic_data.py --load makes one
+without the licensed files), then:
+
+    python benchmark.py --duration 60 --concurrency 8 --out bench.json
+    python benchmark.py --url http://localhost:5000 --server-pid 1234 --duration 60
+    python benchmark.py --duration 60 --compare bench.json
+
+By default the app runs in this process through Flask's test client (one per
+client thread), so peak RSS is the app's own; with --url it drives a running
+server over HTTP and --server-pid reads that process's peak RSS instead.
+--compare exits non-zero when an endpoint's p95 latency grew by more than
+--max-regression.
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+
+WEEKS = range(1, 19)
+POSITIONS = ('QB', 'WR', 'TE', 'RB', 'CB', 'SS', 'FS', 'ILB', 'OLB')
+# What someone has typed into a player picker after a few keystrokes
+SEARCH_PREFIXES = ('j', 'ja', 'jal', 'smi', 'will', 'tr', 'mar', 'dav', 'th', 'ste', 'jonh')
+# Situational play searches an analyst might run across the season
+PLAY_SEARCHES = ('down=3&distance=long,very_long', 'down=3&distance=long&coverage=COVER_3_ZONE&formation=SHOTGUN',
+                 'formation=SHOTGUN&play_action=true', 'coverage=COVER_1_MAN&pass_result=C&min_yards=15',
+                 'distance=short&down=3,4', 'min_epa=2', 'route=GO&pass_result=C,I')
+DASHBOARD_SECTIONS = ('speed-stats', 'route-analysis', 'separation-stats', 'formation-matchup',
+                      'speed-vs-success', 'down-distance-heatmap')
+
+# Routes left out of the mix on purpose
+EXCLUDED_ENDPOINTS = ('api.get_slow_queries',)
+
+
+def analytics_filters(rng, sample):
+    """Query string for the analytics filters: none, a week, a team, or both"""
+    params = []
+    if rng.random() < 0.5:
+        params.append(f"week={rng.choice(sample['weeks'])}")
+    if rng.random() < 0.4:
+        params.append(f"team={rng.choice(sample['teams'])}")
+    return '?' + '&'.join(params) if params else ''
+
+
+def play_path(rng, sample, suffix):
+    game_id, play_id = rng.choice(sample['plays'])
+    return f"/api/play/{game_id}/{play_id}/{suffix}"
+
+
+# (name, endpoint, weight, path builder): roughly what the frontend requests
+# while someone browses plays, with the analytics pages visited less often
+SCENARIOS = (
+    ('meta', 'api.get_meta', 2, lambda rng, s: '/api/meta'),
+    ('games', 'api.get_games', 4, lambda rng, s: '/api/games'),
+    ('plays', 'api.get_plays', 8, lambda rng, s: f"/api/plays?game_id={rng.choice(s['games'])}"),
+    ('plays_all', 'api.get_plays', 1, lambda rng, s: '/api/plays'),
+    ('plays_search', 'api.search_plays', 3, lambda rng, s: f"/api/plays/search?{rng.choice(PLAY_SEARCHES)}"),
+    ('play_tracking', 'api.get_play_tracking', 20, lambda rng, s: play_path(rng, s, 'tracking')),
+    ('play_tracking_columnar', 'api.get_play_tracking', 5,
+     lambda rng, s: play_path(rng, s, 'tracking?format=columnar')),
+    ('play_tracking_filtered', 'api.get_play_tracking', 4,
+     lambda rng, s: play_path(rng, s, 'tracking?side=Offense&fields=x,y,s')),
+    ('play_tracking_5fps', 'api.get_play_tracking', 3, lambda rng, s: play_path(rng, s, 'tracking?fps=5')),
+    ('play_routes', 'api.get_play_routes', 12, lambda rng, s: play_path(rng, s, 'routes')),
+    ('play_routes_simplified', 'api.get_play_routes', 3,
+     lambda rng, s: play_path(rng, s, 'routes?tolerance=0.5')),
+    ('play_proximity', 'api.get_play_proximity', 4, lambda rng, s: play_path(rng, s, 'proximity')),
+    ('players', 'api.get_players', 2, lambda rng, s: '/api/players'),
+    ('players_by_position', 'api.get_players', 3,
+     lambda rng, s: f"/api/players?position={rng.choice(POSITIONS)}"),
+    ('players_search', 'api.search_players', 4,
+     lambda rng, s: f"/api/players/search?q={rng.choice(SEARCH_PREFIXES)}"),
+    ('teams', 'api.get_teams', 3, lambda rng, s: '/api/analytics/teams'),
+    ('dashboard', 'api.get_dashboard', 3, lambda rng, s: '/api/analytics/dashboard' + analytics_filters(rng, s)),
+    ('dashboard_all', 'api.get_dashboard', 1,
+     lambda rng, s: '/api/analytics/dashboard?sections=' + ','.join(DASHBOARD_SECTIONS)),
+    ('speed_stats', 'api.get_speed_stats', 2, lambda rng, s: '/api/analytics/speed-stats' + analytics_filters(rng, s)),
+    ('route_analysis', 'api.get_route_analysis', 2,
+     lambda rng, s: '/api/analytics/route-analysis' + analytics_filters(rng, s)),
+    ('separation_stats', 'api.get_separation_stats', 2,
+     lambda rng, s: '/api/analytics/separation-stats' + analytics_filters(rng, s)),
+    ('formation_matchup', 'api.get_formation_matchup', 2,
+     lambda rng, s: '/api/analytics/formation-matchup' + analytics_filters(rng, s)),
+    ('speed_vs_success', 'api.get_speed_vs_success', 2,
+     lambda rng, s: '/api/analytics/speed-vs-success' + analytics_filters(rng, s)),
+    ('down_distance_heatmap', 'api.get_down_distance_heatmap', 2,
+     lambda rng, s: '/api/analytics/down-distance-heatmap' + analytics_filters(rng, s)),
+    ('health', 'api.get_health', 1, lambda rng, s: '/api/health'),
+    ('metrics', 'api.get_metrics', 1, lambda rng, s: '/api/metrics'),
+)
+
+
+class TestClientTarget:
+    """Requests served by the app in this process"""
+
+    def __init__(self):
+        from app import create_app
+        self.app = create_app()
+        self.local = threading.local()
+
+    def get(self, path):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+        try:
+            return response.status_code, response.get_data()
+        finally:
+            response.close()
+
+    def endpoints(self):
+        return {rule.endpoint for rule in self.app.url_map.iter_rules() if rule.endpoint.startswith('api.')}
+
+
+class HTTPTarget:
+    """Requests sent to a running server"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def get(self, path):
+        request = urllib.request.Request(self.url + path, headers={'Accept-Encoding': 'gzip'})
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def endpoints(self):
+        return None
+
+
+def read_json(body):
+    # Bodies are requested with Accept-Encoding: gzip, so larger ones arrive compressed
+    if body[:2] == b'\x1f\x8b':
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def discover(target, max_games):
+    """Game, play, team and week ids to build requests from"""
+    status, body = target.get('/api/games')
+    if status != 200:
+        raise SystemExit(f"/api/games returned {status}; is the database loaded?")
+    games = read_json(body)
+    if not games:
+        raise SystemExit("No games in the database; load data first (see synthetic_data.py)")
+
+    plays = []
+    for game in games[:max_games]:
+        status, body = target.get(f"/api/plays?game_id={game['game_id']}")
+        if status == 200:
+            plays.extend((game['game_id'], play['play_id']) for play in read_json(body))
+    if not plays:
+        raise SystemExit("No plays found for the sampled games")
+
+    teams = sorted({game['home_team_abbr'] for game in games} | {game['visitor_team_abbr'] for game in games})
+    weeks = sorted({game['week'] for game in games if game.get('week')}) or list(WEEKS)
+    return {
+        'games': [game['game_id'] for game in games],
+        'plays': plays,
+        'teams': teams,
+        'weeks': weeks
+    }
+
+
+def worker(target, sample, deadline, remaining, results, seed):
+    rng = random.Random(seed)
+    weights = [weight for _, _, weight, _ in SCENARIOS]
+    while time.time() < deadline:
+        with remaining['lock']:
+            if remaining['count'] is not None:
+                if remaining['count'] <= 0:
+                    return
+                remaining['count'] -= 1
+        name, _, _, build = rng.choices(SCENARIOS, weights)[0]
+        path = build(rng, sample)
+        start = time.perf_counter()
+        try:
+            status, body = target.get(path)
+            size = len(body)
+        except Exception:
+            status, size = 0, 0
+        results.append((name, time.perf_counter() - start, status, size))
+
+
+def run(target, sample, concurrency, duration, requests, seed):
+    """[(scenario, seconds, status, bytes)] and the wall time taken"""
+    results = []
+    remaining = {'lock': threading.Lock(), 'count': requests}
+    deadline = time.time() + (duration if duration else 10 ** 9)
+    threads = [
+        threading.Thread(target=worker, args=(target, sample, deadline, remaining, results, seed + i))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def latency_summary(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'mean_ms': round(float(ms.mean()), 2),
+        'max_ms': round(float(ms.max()), 2)
+    }
+
+
+def summarize(results, elapsed):
+    by_scenario = {}
+    for name, seconds, status, size in results:
+        by_scenario.setdefault(name, []).append((seconds, status, size))
+
+    scenarios = {}
+    for name, rows in sorted(by_scenario.items()):
+        errors = sum(1 for _, status, _ in rows if not 200 <= status < 400)
+        scenarios[name] = {
+            'requests': len(rows),
+            'errors': errors,
+            'throughput_rps': round(len(rows) / elapsed, 2),
+            'mean_bytes': int(sum(size for _, _, size in rows) / len(rows)),
+            **latency_summary([seconds for seconds, _, _ in rows])
+        }
+
+    return {
+        'requests': len(results),
+        'errors': sum(s['errors'] for s in scenarios.values()),
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0,
+        **(latency_summary([r[1] for r in results]) if results else {}),
+        'scenarios': scenarios
+    }
+
+
+def process_tree(pid):
+    """pid and all its descendants, from /proc (Linux)"""
+    pids = [pid]
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    return pids
+
+
+def vm_hwm_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+
+def peak_rss_mb(server_pid=None):
+    """
+    Peak resident set size of the server: this process when in-process, else
+    the sum over server_pid and its worker processes (e.g. gunicorn's master)
+    """
+    if server_pid:
+        try:
+            return round(sum(vm_hwm_kb(pid) for pid in process_tree(server_pid)) / 1024, 1)
+        except OSError:
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, max_regression):
+    """Print p95 / throughput changes per scenario; returns the regressed scenario names"""
+    regressed = []
+    print(f"\n{'scenario':28} {'p95 before':>11} {'p95 now':>9} {'change':>8}", file=sys.stderr)
+    for name, now in current['summary']['scenarios'].items():
+        before = baseline['summary']['scenarios'].get(name)
+        # Too few samples for a p95 to mean anything
+        if not before or not before['p95_ms'] or min(before['requests'], now['requests']) < 20:
+            continue
+        change = now['p95_ms'] / before['p95_ms'] - 1
+        flag = ''
+        if change > max_regression:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:28} {before['p95_ms']:>9.1f}ms {now['p95_ms']:>7.1f}ms {change:>+7.0%}{flag}",
+              file=sys.stderr)
+
+    before_rps = baseline['summary']['throughput_rps']
+    now_rps = current['summary']['throughput_rps']
+    if before_rps:
+        print(f"\nThroughput: {before_rps:.1f} -> {now_rps:.1f} req/s ({now_rps / before_rps - 1:+.0%})",
+              file=sys.stderr)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test every API endpoint and report latency as JSON')
+    parser.add_argument('--url', help='Base URL of a running server (default: run the app in-process)')
+    parser.add_argument('--server-pid', type=int,
+                        help='With --url, server process (e.g. the gunicorn master) to report peak RSS for')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run (0: until --requests)')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests')
+    parser.add_argument('--warmup', type=int, default=100, help='Unrecorded requests sent first')
+    parser.add_argument('--games', type=int, default=20, help='Games to sample play ids from')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='Write the JSON report to this file (default: stdout)')
+    parser.add_argument('--compare', help='Earlier JSON report to compare p95 latencies against')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='With --compare, allowed p95 growth per scenario (default 0.2 = 20%%)')
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error('give --duration or --requests')
+
+    target = HTTPTarget(args.url) if args.url else TestClientTarget()
+    endpoints = target.endpoints()
+    if endpoints is not None:
+        missing = endpoints - {endpoint for _, endpoint, _, _ in SCENARIOS} - set(EXCLUDED_ENDPOINTS)
+        if missing:
+            print(f"Warning: no scenario covers {', '.join(sorted(missing))}", file=sys.stderr)
+
+    sample = discover(target, args.games)
+    print(f"Sampled {len(sample['plays'])} plays from {min(args.games, len(sample['games']))} games; "
+          f"{args.concurrency} clients", file=sys.stderr)
+
+    if args.warmup:
+        run(target, sample, args.concurrency, 0, args.warmup, args.seed + 1000)
+
+    results, elapsed = run(target, sample, args.concurrency, args.duration, args.requests, args.seed)
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'target': args.url or 'in-process',
+        'concurrency': args.concurrency,
+        'seed': args.seed,
+        'data': {'games': len(sample['games']), 'sampled_plays': len(sample['plays'])},
+        'peak_rss_mb': peak_rss_mb(args.server_pid),
+        'summary': summarize(results, elapsed)
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+        print(f"Wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    summary = report['summary']
+    print(f"{summary['requests']:,} requests, {summary['errors']} errors, "
+          f"{summary['throughput_rps']:.1f} req/s, p50 {summary.get('p50_ms', 0)} ms, "
+          f"p95 {summary.get('p95_ms', 0)} ms, p99 {summary.get('p99_ms', 0)} ms", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressed = compare(baseline, report, args.max_regression)
+        if regressed:
+            print(f"\n{len(regressed)} scenario(s) regressed by more than {args.max_regression:.0%}",
+                  file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
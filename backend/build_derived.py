@@ -0,0 +1,371 @@
+"""
+Build derived tables from the loaded tracking and play data.
+
+Run after load_output_only.py / load_play_info.py:
+
+    python build_derived.py              # every step
+    python build_derived.py play_summary # selected steps only
+
+Each step builds fresh copies of its tables under a _new suffix and commits
+them, without touching the live tables, so the API keeps reading the
+previous contents while it runs. A second, short transaction then drops the
+live tables and renames the copies into place. The renames need ACCESS
+EXCLUSIVE locks, so the swap only waits lock_timeout for in-flight reads
+before giving up and trying again; the built copies are kept in between.
+"""
+import io
+import sys
+import time
+from multiprocessing import Pool
+import psycopg2
+from psycopg2 import sql
+from config import Config
+from database import bump_data_version
+import players
+import separation
+import tracking_blobs
+
+# How long the swap waits for reads of the live tables to finish, and how
+# often it tries
+SWAP_LOCK_TIMEOUT = '5s'
+SWAP_ATTEMPTS = 5
+
+
+def connect():
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
+
+
+def staging_table(cursor, table, ddl):
+    """
+    Create an empty <table>_new from ddl, a CREATE TABLE statement with {}
+    for the table name, and return its name
+    """
+    staging = f"{table}_new"
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging)))
+    cursor.execute(sql.SQL(ddl).format(sql.Identifier(staging)))
+    return staging
+
+
+def analyze(cursor, table):
+    """ANALYZE a freshly built table; returns its row count"""
+    cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table)))
+    cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(table)))
+    return cursor.fetchone()[0]
+
+
+def swap_in(conn, tables):
+    """
+    Replace each live table with its <table>_new copy in one transaction.
+    Indexes keep the names Postgres generated from the staging table, with
+    the _new dropped, so the next build can reuse them.
+    """
+    cursor = conn.cursor()
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        try:
+            cursor.execute("SET LOCAL lock_timeout = %s", (SWAP_LOCK_TIMEOUT,))
+            for table in tables:
+                staging = f"{table}_new"
+                cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+                cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                    sql.Identifier(staging), sql.Identifier(table)))
+                cursor.execute("""
+                    SELECT indexname FROM pg_indexes
+                    WHERE schemaname = current_schema() AND tablename = %s
+                """, (table,))
+                for (index,) in cursor.fetchall():
+                    if index.startswith(staging):
+                        cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                            sql.Identifier(index), sql.Identifier(table + index[len(staging):])))
+            bump_data_version(cursor)
+            conn.commit()
+            cursor.close()
+            return
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            print(f"Swap attempt {attempt} timed out waiting for reads of {', '.join(tables)}")
+            time.sleep(attempt)
+    cursor.close()
+    raise SystemExit(f"Could not swap in {', '.join(tables)}; the built copies are kept as *_new, "
+                     f"rerun the step when the API is quieter")
+
+
+def build_play_summary(cursor):
+    """Per-play facts that /plays used to aggregate from tracking_data on every request"""
+    staging = staging_table(cursor, 'play_summary', """
+        CREATE TABLE {} (
+            game_id TEXT NOT NULL,
+            play_id INTEGER NOT NULL,
+            ball_land_x DOUBLE PRECISION,
+            ball_land_y DOUBLE PRECISION,
+            input_frames INTEGER NOT NULL,
+            output_frames INTEGER NOT NULL,
+            total_frames INTEGER NOT NULL,
+            player_count INTEGER NOT NULL,
+            output_player_count INTEGER NOT NULL,
+            PRIMARY KEY (game_id, play_id)
+        )
+    """)
+    cursor.execute(sql.SQL("""
+        INSERT INTO {}
+        SELECT
+            t.game_id,
+            t.play_id,
+            t.ball_land_x,
+            t.ball_land_y,
+            t.input_frames,
+            COALESCE(o.output_frames, 0),
+            t.input_frames + COALESCE(o.output_frames, 0),
+            t.player_count,
+            COALESCE(o.output_player_count, 0)
+        FROM (
+            SELECT
+                game_id,
+                play_id,
+                MAX(ball_land_x) as ball_land_x,
+                MAX(ball_land_y) as ball_land_y,
+                COUNT(DISTINCT frame_id) as input_frames,
+                COUNT(DISTINCT nfl_id) as player_count
+            FROM tracking_data
+            GROUP BY game_id, play_id
+        ) t
+        LEFT JOIN (
+            SELECT
+                game_id,
+                play_id,
+                COUNT(DISTINCT frame_id) as output_frames,
+                COUNT(DISTINCT nfl_id) as output_player_count
+            FROM output_data
+            GROUP BY game_id, play_id
+        ) o ON t.game_id = o.game_id AND t.play_id = o.play_id
+    """).format(sql.Identifier(staging)))
+    return analyze(cursor, staging)
+
+
+def build_speed_rollup(cursor):
+    """
+    Partial speed aggregates at (position, side, week, matchup) grain.
+
+    /analytics/speed-stats combines count, sum, sum of squares, min and max
+    across whichever rows match its filters to reproduce AVG/MIN/MAX/STDDEV
+    over tracking_data. The game's home and visitor teams are both kept so a
+    team filter matches either side without counting a frame twice. Tracking
+    rows without play information keep NULL week/teams, so they only count
+    in unfiltered requests, as they did with the old join.
+    """
+    staging = staging_table(cursor, 'speed_rollup', """
+        CREATE TABLE {} (
+            position TEXT,
+            player_side TEXT,
+            week INTEGER,
+            home_team_abbr TEXT,
+            visitor_team_abbr TEXT,
+            num_frames BIGINT NOT NULL,
+            sum_s NUMERIC NOT NULL,
+            sum_sq NUMERIC NOT NULL,
+            min_s DOUBLE PRECISION,
+            max_s DOUBLE PRECISION
+        )
+    """)
+    cursor.execute(sql.SQL("""
+        INSERT INTO {}
+        SELECT
+            t.player_position,
+            t.player_side,
+            p.week,
+            p.home_team_abbr,
+            p.visitor_team_abbr,
+            COUNT(*),
+            SUM(t.s::numeric),
+            SUM(t.s::numeric * t.s::numeric),
+            MIN(t.s),
+            MAX(t.s)
+        FROM tracking_data t
+        LEFT JOIN play_information p ON t.game_id = p.game_id AND t.play_id = p.play_id
+        WHERE t.s IS NOT NULL
+        GROUP BY t.player_position, t.player_side, p.week, p.home_team_abbr, p.visitor_team_abbr
+    """).format(sql.Identifier(staging)))
+    return analyze(cursor, staging)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Bulk load Python tuples with COPY (None is written as NULL)"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join('\\N' if value is None else str(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(
+        sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(map(sql.Identifier, columns))
+        ).as_string(cursor.connection),
+        buffer
+    )
+
+
+def _game_separation(game_id):
+    conn = connect()
+    try:
+        return separation.game_separation(conn.cursor(), game_id)
+    finally:
+        conn.close()
+
+
+def build_separation(cursor):
+    """
+    Receiver-to-nearest-defender separation per frame and per play.
+
+    Games are processed in parallel worker processes (Config.BUILD_WORKERS);
+    see separation.py for the computation. /analytics/separation-stats reads
+    play_separation.
+    """
+    frame_table = staging_table(cursor, 'frame_separation', """
+        CREATE TABLE {} (
+            game_id TEXT NOT NULL,
+            play_id INTEGER NOT NULL,
+            frame_id INTEGER NOT NULL,
+            nfl_id INTEGER NOT NULL,
+            separation REAL NOT NULL,
+            nearest_defender_id INTEGER,
+            PRIMARY KEY (game_id, play_id, nfl_id, frame_id)
+        )
+    """)
+    play_table = staging_table(cursor, 'play_separation', """
+        CREATE TABLE {} (
+            game_id TEXT NOT NULL,
+            play_id INTEGER NOT NULL,
+            nfl_id INTEGER NOT NULL,
+            player_role TEXT,
+            separation_at_throw REAL,
+            separation_at_catch REAL,
+            min_separation REAL,
+            throw_frame_id INTEGER,
+            catch_frame_id INTEGER,
+            PRIMARY KEY (game_id, play_id, nfl_id)
+        )
+    """)
+
+    cursor.execute("SELECT DISTINCT game_id FROM tracking_data ORDER BY game_id")
+    game_ids = [row[0] for row in cursor.fetchall()]
+
+    plays = 0
+    with Pool(Config.BUILD_WORKERS) as pool:
+        for frame_rows, play_rows in pool.imap_unordered(_game_separation, game_ids):
+            copy_rows(cursor, frame_table,
+                      ('game_id', 'play_id', 'frame_id', 'nfl_id', 'separation', 'nearest_defender_id'),
+                      frame_rows)
+            copy_rows(cursor, play_table,
+                      ('game_id', 'play_id', 'nfl_id', 'player_role', 'separation_at_throw',
+                       'separation_at_catch', 'min_separation', 'throw_frame_id', 'catch_frame_id'),
+                      play_rows)
+            plays += len({(row[0], row[1]) for row in play_rows})
+
+    analyze(cursor, frame_table)
+    print(f"Computed separation for {plays:,} plays in {len(game_ids):,} games")
+    return analyze(cursor, play_table)
+
+
+def _game_blobs(game_id):
+    conn = connect()
+    try:
+        return tracking_blobs.game_blobs(conn, game_id)
+    finally:
+        conn.close()
+
+
+def build_tracking_blobs(cursor):
+    """
+    Each play's full tracking response, encoded once per format and gzipped.
+
+    /play/<game_id>/<play_id>/tracking serves these bytes directly; see
+    tracking_blobs.py. Games are encoded in parallel worker processes.
+    """
+    staging = staging_table(cursor, 'play_tracking_blob', tracking_blobs.BLOB_DDL)
+
+    cursor.execute("SELECT DISTINCT game_id FROM tracking_data ORDER BY game_id")
+    game_ids = [row[0] for row in cursor.fetchall()]
+
+    raw_bytes = 0
+    stored_bytes = 0
+    with Pool(Config.BUILD_WORKERS) as pool:
+        for blobs in pool.imap_unordered(_game_blobs, game_ids):
+            tracking_blobs.insert_blobs(cursor, blobs, staging)
+            raw_bytes += sum(blob[6] for blob in blobs)
+            stored_bytes += sum(len(blob[5]) for blob in blobs)
+
+    print(f"Encoded {raw_bytes / 1e6:,.1f} MB of responses into {stored_bytes / 1e6:,.1f} MB of gzip blobs")
+    return analyze(cursor, staging)
+
+
+def build_players(cursor):
+    """
+    One row per player for /players and /players/search, instead of a
+    DISTINCT over tracking_data per request. Name, position and team are the
+    values seen on most plays; every player is on the field in frame 1.
+    """
+    staging = staging_table(cursor, 'players', players.PLAYERS_DDL)
+    cursor.execute(sql.SQL("""
+        INSERT INTO {}
+        SELECT
+            t.nfl_id,
+            mode() WITHIN GROUP (ORDER BY t.player_name),
+            mode() WITHIN GROUP (ORDER BY t.player_position),
+            MAX(t.player_height),
+            MAX(t.player_weight),
+            MAX(t.player_birth_date),
+            mode() WITHIN GROUP (ORDER BY CASE
+                WHEN t.player_side = 'Offense' THEN p.possession_team
+                ELSE p.defensive_team
+            END),
+            COUNT(DISTINCT t.game_id),
+            COUNT(*)
+        FROM tracking_data t
+        LEFT JOIN play_information p ON t.game_id = p.game_id AND t.play_id = p.play_id
+        WHERE t.frame_id = 1 AND t.player_name IS NOT NULL
+        GROUP BY t.nfl_id
+    """).format(sql.Identifier(staging)))
+    cursor.execute(sql.SQL("CREATE INDEX ON {} (player_position, player_name)").format(sql.Identifier(staging)))
+    return analyze(cursor, staging)
+
+
+# Step name -> (build function, the tables it builds)
+STEPS = {
+    'play_summary': (build_play_summary, ('play_summary',)),
+    'players': (build_players, ('players',)),
+    'speed_rollup': (build_speed_rollup, ('speed_rollup',)),
+    'separation': (build_separation, ('frame_separation', 'play_separation')),
+    'tracking_blobs': (build_tracking_blobs, ('play_tracking_blob',))
+}
+
+
+def main(step_names):
+    unknown = [name for name in step_names if name not in STEPS]
+    if unknown:
+        print(f"Unknown step(s): {', '.join(unknown)}. Available: {', '.join(STEPS)}")
+        sys.exit(1)
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    for name in step_names or list(STEPS):
+        print(f"\nBuilding {name}...")
+        start = time.time()
+        build, tables = STEPS[name]
+        rows = build(cursor)
+        conn.commit()
+        swap_in(conn, tables)
+        print(f"Built {rows:,} rows in {time.time() - start:.1f}s")
+
+    cursor.close()
+    conn.close()
+    print("\nDone!")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
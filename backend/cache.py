@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def json_size(value):
+    """Approximate in-memory cost of a cached value by its JSON size"""
+    return len(json.dumps(value, default=str, separators=(',', ':')))
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by the total byte size of its values.
+
+    Entries are tagged with the data version they were built from; calling
+    validate() with a newer version drops everything, which is how loader
+    runs invalidate caches in every worker process. With a ttl (seconds),
+    entries also expire on their own.
+    """
+
+    def __init__(self, max_bytes, sizeof=json_size, ttl=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                del self._entries[key]
+                self._bytes -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[1]
+
+    def validate(self, version):
+        """Clear the cache if the data version changed since it was filled"""
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'data_version': self._version
+            }
+
+
+class SQLiteCache:
+    """
+    JSON-serializable values in a local SQLite file shared by every worker
+    process on the host.
+
+    Same interface as LRUCache. Each entry stores the data version it was
+    built from; workers only read entries of the version they last saw and
+    prune older ones once they see a newer stamp. Values come back as
+    decoded JSON, i.e. decimals and dates as strings, exactly as jsonify
+    would have sent them.
+    """
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    version INTEGER,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+            """)
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or getattr(self._local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND version = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (key, self._version, time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, version, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, self._version, json.dumps(value, default=str), expires_at)
+            )
+
+    def invalidate(self, key=None):
+        with self._connect() as db:
+            if key is None:
+                db.execute("DELETE FROM cache")
+            else:
+                db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def validate(self, version):
+        if version != self._version:
+            self._version = version
+            with self._connect() as db:
+                db.execute("DELETE FROM cache WHERE version < ?", (version,))
+
+    def stats(self):
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache WHERE version = ?",
+            (self._version,)
+        ).fetchone()
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'data_version': self._version
+        }
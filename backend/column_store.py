@@ -0,0 +1,458 @@
+"""
+Memory-mapped columnar copy of vw_complete_tracking.
+
+An optional read backend for play tracking (Config.TRACKING_BACKEND =
+'column_store'). Each column lives in its own NumPy .npy file under
+Config.COLUMN_STORE_DIR, and the files are opened with mmap, so every
+worker process on the host shares one copy through the OS page cache and a
+play is a zero-copy slice of each column. /analytics/speed-vs-success reads
+its receiver speeds from the same columns (see player_speeds).
+
+Layout:
+
+- <column>.npy: frame_id / nfl_id (int32), x, y, s, a, dir, o (float32, NaN
+  where missing) and the text columns player_name, player_position,
+  player_side, player_role, data_source as int32 codes (-1 for NULL)
+- meta.json: the code -> text dictionaries, row count and build details
+- index.json: {game_id: {play_id: [start, end]}} row range of each play
+
+Rows of a play are contiguous and sorted by (frame_id, nfl_id), as the
+tracking query returns them.
+
+Build it from Postgres or straight from the Big Data Bowl CSVs:
+
+    python column_store.py                      # from vw_complete_tracking
+    python column_store.py --source csv --data-dir /path/to/NFL_Data
+
+The new store is written next to the old one and swapped in when complete;
+running workers pick it up on their next lookup. Building needs pandas,
+which the API does not install; reading a store only needs NumPy, so pandas
+is imported inside the build code.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from config import Config
+from tracking_query import TRACKING_COLUMNS as ROW_COLUMNS
+
+FLOAT_COLUMNS = ('x', 'y', 's', 'a', 'dir', 'o')
+INT_COLUMNS = ('frame_id', 'nfl_id')
+TEXT_COLUMNS = ('player_name', 'player_position', 'player_side', 'player_role', 'data_source')
+COLUMNS = INT_COLUMNS + TEXT_COLUMNS + FLOAT_COLUMNS
+
+DTYPES = {
+    **{name: np.int32 for name in INT_COLUMNS + TEXT_COLUMNS},
+    **{name: np.float32 for name in FLOAT_COLUMNS}
+}
+
+
+class ColumnStore:
+    """Read-only view of a built store directory"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, 'index.json')) as f:
+            self.index = json.load(f)
+        self.dictionaries = self.meta['dictionaries']
+        self.codes = {
+            name: {value: code for code, value in enumerate(values)}
+            for name, values in self.dictionaries.items()
+        }
+        self.columns = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in COLUMNS
+        }
+
+    def play_range(self, game_id, play_id):
+        """(start, end) rows of a play, or None if it is not in the store"""
+        bounds = self.index.get(str(game_id), {}).get(str(play_id))
+        return tuple(bounds) if bounds else None
+
+    def _code(self, column, value):
+        # -2 matches no row
+        return self.codes[column].get(value, -2)
+
+    def play_arrays(self, game_id, play_id, filters=None):
+        """
+        Column arrays for one play, narrowed by tracking_query filters.
+
+        The frame window is a slice of the (frame-ordered) play; player
+        filters apply a boolean mask. Returns None if nothing matches.
+        """
+        bounds = self.play_range(game_id, play_id)
+        if bounds is None:
+            return None
+        start, end = bounds
+        filters = filters or {}
+
+        frame_ids = self.columns['frame_id'][start:end]
+        if 'from_frame' in filters:
+            start += int(np.searchsorted(frame_ids, filters['from_frame'], side='left'))
+        if 'to_frame' in filters:
+            end = bounds[0] + int(np.searchsorted(frame_ids, filters['to_frame'], side='right'))
+        if start >= end:
+            return None
+        arrays = {name: column[start:end] for name, column in self.columns.items()}
+
+        mask = None
+        if 'nfl_ids' in filters:
+            mask = np.isin(arrays['nfl_id'], filters['nfl_ids'])
+        if 'side' in filters:
+            side_mask = arrays['player_side'] == self._code('player_side', filters['side'])
+            mask = side_mask if mask is None else mask & side_mask
+        if 'position' in filters:
+            codes = [self._code('player_position', p) for p in filters['position']]
+            position_mask = np.isin(arrays['player_position'], codes)
+            mask = position_mask if mask is None else mask & position_mask
+        if mask is not None:
+            if not mask.any():
+                return None
+            arrays = {name: values[mask] for name, values in arrays.items()}
+        return arrays
+
+    def decode(self, column, codes):
+        """Text values for an array of codes"""
+        dictionary = self.dictionaries[column]
+        return [dictionary[code] if code >= 0 else None for code in codes.tolist()]
+
+    def play_rows(self, game_id, play_id, filters=None, columns=ROW_COLUMNS):
+        """
+        One dict per row, shaped like the tracking query's rows, or None.
+
+        Floats are rounded back to the 2 decimals the source data carries.
+        """
+        arrays = self.play_arrays(game_id, play_id, filters)
+        if arrays is None:
+            return None
+
+        values = []
+        for name in columns:
+            if name in TEXT_COLUMNS:
+                values.append(self.decode(name, arrays[name]))
+            elif name in FLOAT_COLUMNS:
+                rounded = np.round(arrays[name].astype(np.float64), 2)
+                values.append([None if v != v else v for v in rounded.tolist()])
+            else:
+                values.append(arrays[name].tolist())
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def play_columns(self, game_id, play_id, float_columns=FLOAT_COLUMNS):
+        """
+        A play in the tracking_format.build_columns layout, built from the
+        column slices without going through per-row dicts.
+        """
+        arrays = self.play_arrays(game_id, play_id)
+        if arrays is None:
+            return None
+
+        # Players and data sources are numbered in order of first appearance
+        nfl_ids, first, inverse = np.unique(arrays['nfl_id'], return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty(len(order), dtype=np.int16)
+        rank[order] = np.arange(len(order))
+        players = []
+        for idx in first[order]:
+            players.append({
+                'nfl_id': int(arrays['nfl_id'][idx]),
+                **{name: self.decode(name, arrays[name][idx:idx + 1])[0]
+                   for name in ('player_name', 'player_position', 'player_side', 'player_role')}
+            })
+
+        sources, source_first, source_inverse = np.unique(
+            arrays['data_source'], return_index=True, return_inverse=True
+        )
+        source_order = np.argsort(source_first)
+        source_rank = np.empty(len(source_order), dtype=np.uint8)
+        source_rank[source_order] = np.arange(len(source_order))
+
+        frames, starts = np.unique(arrays['frame_id'], return_index=True)
+        return {
+            'players': players,
+            'data_sources': self.decode('data_source', sources[source_order]),
+            'frames': frames.astype(np.int32),
+            'frame_offsets': np.append(starts, len(arrays['frame_id'])).astype(np.int32),
+            'frame_id': np.asarray(arrays['frame_id']),
+            'player': rank[inverse],
+            'data_source': source_rank[source_inverse],
+            'float_columns': tuple(float_columns),
+            **{name: np.asarray(arrays[name]) for name in float_columns}
+        }
+
+    def route_arrays(self, game_id, play_id, positions):
+        """
+        Input-frame rows of the given positions ordered by (nfl_id, frame_id):
+        (nfl_ids, points (n, 2), names, positions), or None
+        """
+        arrays = self.play_arrays(game_id, play_id, {'position': list(positions)})
+        if arrays is None:
+            return None
+        keep = arrays['data_source'] == self._code('data_source', 'input')
+        if not keep.any():
+            return None
+        order = np.lexsort((arrays['frame_id'][keep], arrays['nfl_id'][keep]))
+        idx = np.flatnonzero(keep)[order]
+        points = np.column_stack((arrays['x'][idx], arrays['y'][idx])).astype(np.float64)
+        return (
+            arrays['nfl_id'][idx],
+            points,
+            self.decode('player_name', arrays['player_name'][idx]),
+            self.decode('player_position', arrays['player_position'][idx])
+        )
+
+    def plays_rows(self, plays):
+        """
+        Row numbers of several plays, concatenated, and for each row the
+        position in plays of the play it belongs to. Plays missing from the
+        store contribute no rows.
+        """
+        which, starts, ends = [], [], []
+        for i, (game_id, play_id) in enumerate(plays):
+            bounds = self.play_range(game_id, play_id)
+            if bounds is not None:
+                which.append(i)
+                starts.append(bounds[0])
+                ends.append(bounds[1])
+        starts = np.array(starts, dtype=np.int64)
+        lengths = np.array(ends, dtype=np.int64) - starts
+        # Offset of each play's first row in the concatenation
+        offsets = np.cumsum(lengths) - lengths
+        rows = np.arange(lengths.sum(), dtype=np.int64) + np.repeat(starts - offsets, lengths)
+        return rows, np.repeat(np.array(which, dtype=np.int64), lengths)
+
+    def player_speeds(self, plays, positions, side):
+        """
+        Input-frame speeds of the players at the given positions on one side
+        across several plays: (play position in plays, player_name codes,
+        player_position codes, s) per row with a speed
+        """
+        rows, play = self.plays_rows(plays)
+        codes = [self._code('player_position', p) for p in positions]
+        keep = (
+            np.isin(self.columns['player_position'][rows], codes)
+            & (self.columns['player_side'][rows] == self._code('player_side', side))
+            & (self.columns['data_source'][rows] == self._code('data_source', 'input'))
+        )
+        rows = rows[keep]
+        # Back to the 2 decimals the source data carries, as play_rows does
+        speeds = np.round(self.columns['s'][rows].astype(np.float64), 2)
+        has_speed = ~np.isnan(speeds)
+        rows = rows[has_speed]
+        return (
+            play[keep][has_speed],
+            np.asarray(self.columns['player_name'][rows]),
+            np.asarray(self.columns['player_position'][rows]),
+            speeds[has_speed]
+        )
+
+
+_store = {'path': None, 'mtime': None, 'store': None}
+_store_lock = threading.Lock()
+
+
+def get_store(path=None):
+    """
+    The store at path (Config.COLUMN_STORE_DIR), reopened when a rebuild
+    swaps in a new meta.json; None if it has not been built.
+    """
+    path = path or Config.COLUMN_STORE_DIR
+    try:
+        mtime = os.stat(os.path.join(path, 'meta.json')).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _store_lock:
+        if _store['path'] != path or _store['mtime'] != mtime:
+            _store.update(path=path, mtime=mtime, store=ColumnStore(path))
+        return _store['store']
+
+
+class StoreWriter:
+    """
+    Builds a store from DataFrame chunks with the vw_complete_tracking
+    columns plus game_id / play_id. A play must not span chunks.
+
+    Columns are appended to raw files as chunks arrive, so memory stays at
+    one chunk, and converted to .npy once the row count is known.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.build_path = path.rstrip(os.sep) + '.building'
+        shutil.rmtree(self.build_path, ignore_errors=True)
+        os.makedirs(self.build_path)
+        self.files = {name: open(self._raw(name), 'wb') for name in COLUMNS}
+        self.codes = {name: {} for name in TEXT_COLUMNS}
+        self.index = {}
+        self.rows = 0
+
+    def _raw(self, name):
+        return os.path.join(self.build_path, f'{name}.raw')
+
+    def _encode(self, name, values):
+        """Store-wide int32 codes for a text column, -1 for NULL"""
+        import pandas as pd
+
+        local, uniques = pd.factorize(values)
+        codes = self.codes[name]
+        mapping = np.array([codes.setdefault(value, len(codes)) for value in uniques], dtype=np.int32)
+        return np.where(local >= 0, mapping[np.maximum(local, 0)] if len(mapping) else -1, -1).astype(np.int32)
+
+    def append(self, df):
+        if df.empty:
+            return
+        df = df.sort_values(['game_id', 'play_id', 'frame_id', 'nfl_id'], kind='stable')
+
+        for name in COLUMNS:
+            if name in TEXT_COLUMNS:
+                values = self._encode(name, df[name])
+            else:
+                values = df[name].to_numpy(dtype=np.float64, na_value=np.nan).astype(DTYPES[name])
+            self.files[name].write(values.tobytes())
+
+        # Row range of each play within this chunk
+        keys = df[['game_id', 'play_id']].astype(str).to_numpy()
+        change = np.flatnonzero((keys[1:] != keys[:-1]).any(axis=1)) + 1
+        starts = np.r_[0, change]
+        ends = np.r_[change, len(df)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            game_id, play_id = keys[start]
+            self.index.setdefault(game_id, {})[play_id] = [self.rows + start, self.rows + end]
+        self.rows += len(df)
+
+    def finish(self, source):
+        for name, f in self.files.items():
+            f.close()
+            raw = np.fromfile(self._raw(name), dtype=DTYPES[name])
+            np.save(os.path.join(self.build_path, f'{name}.npy'), raw)
+            os.remove(self._raw(name))
+
+        with open(os.path.join(self.build_path, 'index.json'), 'w') as f:
+            json.dump(self.index, f, separators=(',', ':'))
+        with open(os.path.join(self.build_path, 'meta.json'), 'w') as f:
+            json.dump({
+                'rows': self.rows,
+                'plays': sum(len(plays) for plays in self.index.values()),
+                'source': source,
+                'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'dictionaries': {
+                    name: [value for value, _ in sorted(codes.items(), key=lambda item: item[1])]
+                    for name, codes in self.codes.items()
+                }
+            }, f)
+
+        # Swap the finished build in; open mmaps keep reading the old files
+        old_path = self.path.rstrip(os.sep) + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(self.build_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+GAME_QUERY = """
+    SELECT game_id, play_id, {columns}
+    FROM vw_complete_tracking
+    WHERE game_id = %s
+""".format(columns=', '.join(ROW_COLUMNS))
+
+
+def build_from_db(writer):
+    """One chunk per game from vw_complete_tracking"""
+    import pandas as pd
+    import psycopg2
+
+    conn = psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT game_id FROM tracking_data ORDER BY game_id")
+    game_ids = [row[0] for row in cursor.fetchall()]
+
+    for i, game_id in enumerate(game_ids, 1):
+        cursor.execute(GAME_QUERY, (game_id,))
+        writer.append(pd.DataFrame(cursor.fetchall(), columns=('game_id', 'play_id') + ROW_COLUMNS))
+        print(f"  {i}/{len(game_ids)} games, {writer.rows:,} rows")
+
+    cursor.close()
+    conn.close()
+
+
+def week_frames(input_file, output_file):
+    """
+    Rebuild vw_complete_tracking for one week from its input / output CSVs:
+    output frames continue after the play's last input frame and take their
+    player details from the input rows.
+    """
+    import pandas as pd
+
+    inputs = pd.read_csv(input_file)
+    inputs['game_id'] = inputs['game_id'].astype(str).str.zfill(10)
+    inputs['data_source'] = 'input'
+
+    frames = [inputs[['game_id', 'play_id'] + list(ROW_COLUMNS)]]
+    if output_file:
+        outputs = pd.read_csv(output_file)
+        outputs['game_id'] = outputs['game_id'].astype(str).str.zfill(10)
+        last_frame = inputs.groupby(['game_id', 'play_id'], as_index=False)['frame_id'].max()
+        players = inputs[['game_id', 'play_id', 'nfl_id', 'player_name', 'player_position',
+                          'player_side', 'player_role']].drop_duplicates(['game_id', 'play_id', 'nfl_id'])
+        outputs = outputs.merge(last_frame, on=['game_id', 'play_id'], suffixes=('', '_last'))
+        outputs['frame_id'] = outputs['frame_id'] + outputs['frame_id_last']
+        outputs = outputs.merge(players, on=['game_id', 'play_id', 'nfl_id'])
+        for name in ('s', 'a', 'dir', 'o'):
+            outputs[name] = np.nan
+        outputs['data_source'] = 'output'
+        frames.append(outputs[['game_id', 'play_id'] + list(ROW_COLUMNS)])
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_from_csv(writer, data_dir):
+    """One chunk per week from input_*.csv and the matching output_*.csv"""
+    input_files = sorted(glob.glob(os.path.join(data_dir, 'input*.csv')))
+    if not input_files:
+        raise SystemExit(f"No input*.csv files found in {data_dir}")
+
+    for input_file in input_files:
+        name = os.path.basename(input_file)
+        output_file = os.path.join(data_dir, 'output' + name[len('input'):])
+        writer.append(week_frames(input_file, output_file if os.path.exists(output_file) else None))
+        print(f"  {name}: {writer.rows:,} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the memory-mapped tracking column store')
+    parser.add_argument('--source', choices=['db', 'csv'], default='db',
+                        help="Read vw_complete_tracking ('db') or the input/output CSVs ('csv')")
+    parser.add_argument('--data-dir', default=Config.DATA_DIR,
+                        help='Folder containing input*.csv / output*.csv (default: NFL_DATA_DIR)')
+    parser.add_argument('--out', default=Config.COLUMN_STORE_DIR,
+                        help='Store directory (default: COLUMN_STORE_DIR)')
+    args = parser.parse_args()
+
+    print(f"Building column store in {args.out} from {args.source}...")
+    start = time.time()
+    writer = StoreWriter(args.out)
+    if args.source == 'csv':
+        build_from_csv(writer, args.data_dir)
+    else:
+        build_from_db(writer)
+    writer.finish(args.source)
+
+    size = sum(os.path.getsize(path) for path in glob.glob(os.path.join(args.out, '*')))
+    print(f"Wrote {writer.rows:,} rows ({size / 1e6:,.1f} MB) in {time.time() - start:.1f}s")
+    print("\nDone!")
+
+
+if __name__ == '__main__':
+    main()
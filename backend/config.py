@@ -8,4 +8,87 @@ class Config:
     DB_NAME = os.getenv('PGDATABASE')
     DB_USER = os.getenv('PGUSER')
     DB_PASSWORD = os.getenv('PGPASSWORD')
-    DB_PORT = os.getenv('PGPORT')
\ No newline at end of file
+    DB_PORT = os.getenv('PGPORT')
+
+    # Connection pool (see database.ConnectionPool)
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+    DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+    DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 10))
+    DB_POOL_HEALTH_CHECK = os.getenv('DB_POOL_HEALTH_CHECK', 'true').lower() == 'true'
+
+    # Per-play tracking payload cache (bytes per worker process)
+    TRACKING_CACHE_MAX_BYTES = int(os.getenv('TRACKING_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+
+    # Serve whole-play tracking from play_tracking_blob (build_derived.py
+    # tracking_blobs) and keep up to this many compressed bytes in memory
+    TRACKING_BLOBS = os.getenv('TRACKING_BLOBS', 'true').lower() == 'true'
+    TRACKING_BLOB_CACHE_MAX_BYTES = int(os.getenv('TRACKING_BLOB_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Where play tracking is read from: 'postgres' or 'column_store' (the
+    # memory-mapped files built by column_store.py in COLUMN_STORE_DIR)
+    TRACKING_BACKEND = os.getenv('TRACKING_BACKEND', 'postgres').lower()
+    COLUMN_STORE_DIR = os.getenv('COLUMN_STORE_DIR', 'tracking_store')
+
+    # /play/<game_id>/<play_id>/proximity: default radius (yards) and result cache size
+    PROXIMITY_RADIUS = float(os.getenv('PROXIMITY_RADIUS', 5))
+    PROXIMITY_CACHE_MAX_BYTES = int(os.getenv('PROXIMITY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # How often (seconds) cached data is checked against the data_version stamp
+    DATA_VERSION_CHECK_INTERVAL = float(os.getenv('DATA_VERSION_CHECK_INTERVAL', 60))
+
+    # Folder the loader scripts read the Big Data Bowl CSV files from
+    DATA_DIR = os.getenv('NFL_DATA_DIR', r'C:\Users\hfras\Desktop\NFL_Data')
+
+    # Rows fetched per round trip by server-side cursors on streamed endpoints
+    STREAM_FETCH_SIZE = int(os.getenv('STREAM_FETCH_SIZE', 2000))
+
+    # Analytics result cache: 'memory' (per-process LRU), 'sqlite' (file shared
+    # by all workers on the host) or 'none'
+    ANALYTICS_CACHE_BACKEND = os.getenv('ANALYTICS_CACHE_BACKEND', 'memory').lower()
+    ANALYTICS_CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', 24 * 60 * 60))
+    ANALYTICS_CACHE_MAX_BYTES = int(os.getenv('ANALYTICS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    ANALYTICS_CACHE_PATH = os.getenv('ANALYTICS_CACHE_PATH', 'analytics_cache.sqlite3')
+
+    # Precompute analytics for every team x week combination in the background at startup
+    ANALYTICS_WARMUP = os.getenv('ANALYTICS_WARMUP', 'false').lower() == 'true'
+
+    # Load the games/teams/weeks dimension snapshot (dimensions.py) and the
+    # play search index (play_search.py) when a worker starts instead of on
+    # their first request
+    PRELOAD_DIMENSIONS = os.getenv('PRELOAD_DIMENSIONS', 'true').lower() == 'true'
+
+    # Worker processes used by build_derived.py steps that fan out across games
+    BUILD_WORKERS = int(os.getenv('BUILD_WORKERS', os.cpu_count() or 1))
+
+    # Statements slower than this (ms, 0 disables) are logged with their
+    # parameters (and optionally a plan, see below); the last
+    # SLOW_QUERY_LOG_SIZE are listed at /api/metrics/slow-queries
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 500))
+    # EXPLAIN ANALYZE runs the statement again, so it is off by default and,
+    # when on, done for a sample of slow SELECTs on a background connection.
+    # In production prefer Postgres' auto_explain, which plans the original
+    # execution instead of repeating it
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+    SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', 0.1))
+    SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', 50))
+
+    # Production serving (gunicorn.conf.py). WEB_WORKERS=0 sizes the worker
+    # count from the CPU count and DB_CONNECTION_BUDGET: every worker can hold
+    # up to DB_POOL_MAX connections, so workers x DB_POOL_MAX must stay within
+    # the connections Postgres allows this service
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', os.getenv('WEB_CONCURRENCY', 0)))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', 120))
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+    WEB_KEEPALIVE = int(os.getenv('WEB_KEEPALIVE', 65))
+    WEB_MAX_REQUESTS = int(os.getenv('WEB_MAX_REQUESTS', 5000))
+    DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', 80))
+
+    # HTTP caching and compression for /api responses (see http_cache.py).
+    # APP_RELEASE goes into every ETag so a deploy invalidates them
+    HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 3600))
+    APP_RELEASE = os.getenv('APP_RELEASE', os.getenv('RAILWAY_GIT_COMMIT_SHA', ''))
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))
@@ -1,22 +1,355 @@
+import itertools
+import threading
+import time
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from flask import g
 from config import Config
+import metrics
 import os
 
-def get_db_connection():
-    """Create and return a database connection"""
-    
+def get_connection_params():
+    """Keyword arguments for psycopg2.connect built from Config"""
+
     # Check if running on Railway (has RAILWAY_ENVIRONMENT variable)
     is_railway = os.getenv('RAILWAY_ENVIRONMENT') is not None
-    
-    conn = psycopg2.connect(
-        host=Config.DB_HOST,
-        database=Config.DB_NAME,
-        user=Config.DB_USER,
-        password=Config.DB_PASSWORD,
-        port=Config.DB_PORT,
-        cursor_factory=RealDictCursor,
-        sslmode='require' if is_railway else 'prefer',
-        connect_timeout=10
+
+    return {
+        'host': Config.DB_HOST,
+        'database': Config.DB_NAME,
+        'user': Config.DB_USER,
+        'password': Config.DB_PASSWORD,
+        'port': Config.DB_PORT,
+        'cursor_factory': metrics.InstrumentedCursor,
+        'sslmode': 'require' if is_railway else 'prefer',
+        'connect_timeout': 10
+    }
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Connections idle for longer than idle_timeout are closed (down to minconn),
+    optionally health checked with SELECT 1 on checkout, and transparently
+    replaced when they turn out to be broken.
+    """
+
+    def __init__(self, minconn, maxconn, idle_timeout=300, checkout_timeout=10,
+                 health_check=True, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self.connect_kwargs = connect_kwargs
+
+        self._lock = threading.Condition()
+        self._idle = []          # list of (conn, returned_at), most recent last
+        self._in_use = set()
+        self._connecting = 0
+        self._waiting = 0
+        self._created = 0
+        self._closed = 0
+        self._checkouts = 0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        self._closed += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _evict_idle(self):
+        # Caller must hold the lock
+        now = time.monotonic()
+        keep = []
+        surplus = len(self._idle) + len(self._in_use) - self.minconn
+        for conn, returned_at in self._idle:
+            if surplus > 0 and now - returned_at > self.idle_timeout:
+                self._discard(conn)
+                surplus -= 1
+            else:
+                keep.append((conn, returned_at))
+        self._idle = keep
+
+    def getconn(self):
+        """Check out a healthy connection, waiting up to checkout_timeout"""
+        deadline = time.monotonic() + self.checkout_timeout
+
+        with self._lock:
+            self._evict_idle()
+            while True:
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    self._in_use.add(conn)
+                    break
+                if len(self._in_use) + self._connecting < self.maxconn:
+                    conn = None
+                    self._connecting += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f'No database connection available after {self.checkout_timeout}s'
+                    )
+                self._waiting += 1
+                try:
+                    self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if conn is None:
+            # Open new connections outside the lock so a slow handshake
+            # does not block other checkouts
+            try:
+                conn = self._connect()
+            finally:
+                with self._lock:
+                    self._connecting -= 1
+                    if conn is not None:
+                        self._in_use.add(conn)
+                    self._lock.notify()
+        elif not self._is_healthy(conn):
+            # Reconnect in place of the broken connection
+            self._discard(conn)
+            try:
+                replacement = self._connect()
+            except Exception:
+                with self._lock:
+                    self._in_use.discard(conn)
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._in_use.discard(conn)
+                self._in_use.add(replacement)
+            conn = replacement
+
+        with self._lock:
+            self._checkouts += 1
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, resetting any open transaction"""
+        if not close and not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._lock:
+            self._in_use.discard(conn)
+            if close or conn.closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def closeall(self):
+        with self._lock:
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+
+    def stats(self):
+        with self._lock:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'created': self._created,
+                'closed': self._closed,
+                'checkouts': self._checkouts
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    Config.DB_POOL_MIN,
+                    Config.DB_POOL_MAX,
+                    idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+                    checkout_timeout=Config.DB_POOL_CHECKOUT_TIMEOUT,
+                    health_check=Config.DB_POOL_HEALTH_CHECK,
+                    **get_connection_params()
+                )
+    return _pool
+
+
+def get_db_connection():
+    """
+    Return a pooled database connection bound to the current request.
+
+    The same connection is reused for the rest of the request and handed
+    back to the pool by close_db when the app context tears down, so
+    handlers never need to close it themselves.
+    """
+    if 'db_conn' not in g:
+        start = time.perf_counter()
+        g.db_conn = get_pool().getconn()
+        metrics.observe_phase('connect', time.perf_counter() - start)
+    return g.db_conn
+
+
+def close_db(exception=None):
+    """Return the request's connection to the pool"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        get_pool().putconn(conn)
+
+
+def detach_db_connection():
+    """
+    Take the request's connection out of request scope.
+
+    Used by streamed responses that keep reading after the view returns; the
+    caller must hand it back with release_db_connection.
+    """
+    return g.pop('db_conn', None)
+
+
+def release_db_connection(conn):
+    get_pool().putconn(conn)
+
+
+def reset_pool():
+    """
+    Forget a pool inherited from the parent process.
+
+    Called in a freshly forked worker: the inherited connections share their
+    sockets with the parent, so they are dropped without being closed and the
+    worker opens its own on first use.
+    """
+    global _pool
+    _pool = None
+    _data_version['value'] = None
+
+
+def close_pool():
+    """Close this process's idle connections, e.g. when a worker exits"""
+    if _pool is not None:
+        _pool.closeall()
+
+
+def pool_stats():
+    """Current pool counters, or None if the pool has not been created yet"""
+    return _pool.stats() if _pool is not None else None
+
+
+_cursor_ids = itertools.count()
+
+def stream_query(conn, query, params=None, fetch_size=None):
+    """
+    Run a query on a named server-side cursor and return an iterator of rows.
+
+    The query is executed immediately, so errors surface to the caller; rows
+    are then pulled from Postgres fetch_size at a time (Config.STREAM_FETCH_SIZE
+    by default) as the iterator is consumed, instead of being materialized
+    with fetchall().
+    """
+    fetch_size = fetch_size or Config.STREAM_FETCH_SIZE
+    cursor = conn.cursor(name=f'stream_{next(_cursor_ids)}')
+    cursor.itersize = fetch_size
+    cursor.execute(query, params)
+
+    def rows():
+        try:
+            while True:
+                batch = cursor.fetchmany(fetch_size)
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            cursor.close()
+
+    return rows()
+
+
+DATA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        version BIGINT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
     )
-    return conn
\ No newline at end of file
+"""
+
+_data_version = {'value': None, 'checked_at': 0.0}
+
+def get_data_version(conn=None):
+    """
+    Current data_version stamp, re-read at most every
+    Config.DATA_VERSION_CHECK_INTERVAL seconds.
+
+    Loaders bump the stamp after changing data; caches compare it to the
+    version they were filled from. Returns 0 if no loader has run yet.
+    Uses the request's connection unless one is given.
+    """
+    now = time.monotonic()
+    if (_data_version['value'] is not None
+            and now - _data_version['checked_at'] < Config.DATA_VERSION_CHECK_INTERVAL):
+        return _data_version['value']
+
+    conn = conn or get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT version FROM data_version WHERE id = 1")
+        row = cursor.fetchone()
+        version = row['version'] if row else 0
+    except psycopg2.ProgrammingError:
+        conn.rollback()
+        version = 0
+    finally:
+        cursor.close()
+
+    _data_version['value'] = version
+    _data_version['checked_at'] = now
+    return version
+
+
+def bump_data_version(cursor):
+    """Mark the data as changed; call from loaders before committing"""
+    cursor.execute(DATA_VERSION_DDL)
+    cursor.execute("""
+        INSERT INTO data_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE
+        SET version = data_version.version + 1, updated_at = now()
+    """)
+
+
+def init_app(app):
+    """Register the pool teardown with a Flask app"""
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,127 @@
+"""
+Small, static dimensions of the season data, held in memory.
+
+Games (with teams, dates and weeks), teams, weeks, formations, coverage
+types and targeted routes only change when a loader runs. Each worker reads
+them from play_information into a Snapshot at startup (see app.py) and again
+whenever the data_version stamp moves, so /games, /analytics/teams and /meta
+never query the table on a page load.
+
+A Snapshot is never modified once built: a refresh builds a new one and
+swaps it in, so requests can keep reading the one they got without locking.
+"""
+import logging
+import threading
+from database import get_data_version, get_db_connection, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Season served by /games
+SEASON = 2023
+
+GAMES_QUERY = """
+    SELECT DISTINCT
+        p.game_id,
+        p.season,
+        p.home_team_abbr,
+        p.visitor_team_abbr,
+        p.week,
+        p.game_date
+    FROM play_information p
+    ORDER BY p.game_date, p.game_id
+"""
+
+# Distinct non-null values of play_information columns, by dimension name
+VALUE_COLUMNS = (
+    ('formations', 'offense_formation'),
+    ('coverage_types', 'team_coverage_type'),
+    ('routes', 'route_of_targeted_receiver'),
+)
+
+
+class Snapshot:
+    """Dimension lists of one data version; treat every field as read-only"""
+
+    def __init__(self, version, games, formations=(), coverage_types=(), routes=()):
+        self.version = version
+        self.games = tuple(
+            {key: game[key] for key in ('game_id', 'home_team_abbr', 'visitor_team_abbr', 'week', 'game_date')}
+            for game in games if game['season'] == SEASON
+        )
+        abbrs = {game[key] for game in games for key in ('home_team_abbr', 'visitor_team_abbr')}
+        self.teams = tuple({'team_abbr': abbr, 'team_name': abbr} for abbr in sorted(abbrs - {None}))
+        self.weeks = tuple(sorted({game['week'] for game in games} - {None}))
+        self.formations = tuple(formations)
+        self.coverage_types = tuple(coverage_types)
+        self.routes = tuple(routes)
+
+    def as_dict(self):
+        return {
+            'data_version': self.version,
+            'games': self.games,
+            'teams': self.teams,
+            'weeks': self.weeks,
+            'formations': self.formations,
+            'coverage_types': self.coverage_types,
+            'routes': self.routes
+        }
+
+    def stats(self):
+        return {name: len(getattr(self, name)) for name in
+                ('games', 'teams', 'weeks', 'formations', 'coverage_types', 'routes')}
+
+
+def load_snapshot(conn, version):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(GAMES_QUERY)
+        games = cursor.fetchall()
+
+        values = {}
+        for name, column in VALUE_COLUMNS:
+            cursor.execute(f"""
+                SELECT DISTINCT {column} AS value
+                FROM play_information
+                WHERE {column} IS NOT NULL
+                ORDER BY 1
+            """)
+            values[name] = [row['value'] for row in cursor.fetchall()]
+        return Snapshot(version, games, **values)
+    finally:
+        cursor.close()
+
+
+_snapshot = {'snapshot': None}
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(conn=None):
+    """
+    This worker's Snapshot, rebuilt when the data version changes. Only
+    takes the request's connection (unless one is given) when the version
+    is due for a re-check or the snapshot has to be rebuilt.
+    """
+    version = get_data_version(conn)
+    snapshot = _snapshot['snapshot']
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot['snapshot']
+        if snapshot is None or snapshot.version != version:
+            snapshot = load_snapshot(conn or get_db_connection(), version)
+            _snapshot['snapshot'] = snapshot
+    return snapshot
+
+
+def preload():
+    """Build the snapshot with a pooled connection before the first request"""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        snapshot = get_snapshot(conn)
+        conn.rollback()
+        logger.info("Loaded dimensions for data version %s: %s", snapshot.version, snapshot.stats())
+        return snapshot
+    finally:
+        pool.putconn(conn)
@@ -0,0 +1,85 @@
+"""
+Lighter-weight route and tracking payloads for previews.
+
+Routes are simplified with Ramer-Douglas-Peucker: a point is dropped when it
+lies within `tolerance` yards of the line between the points kept around it,
+so straight stretches of a route collapse to their end points. Tracking rows
+can be thinned to a lower frame rate by keeping every n-th frame.
+"""
+import numpy as np
+
+# Big Data Bowl tracking is sampled at 10 frames per second
+TRACKING_FPS = 10
+
+
+def stride_points(points, stride):
+    """Every stride-th point of an (n, 2) array, always keeping the last"""
+    if stride <= 1 or len(points) <= 2:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[::stride] = True
+    keep[-1] = True
+    return points[keep]
+
+
+def rdp(points, tolerance):
+    """
+    Ramer-Douglas-Peucker simplification of an (n, 2) array of points.
+
+    Each split measures the distance from every interior point of the
+    segment to its chord in one NumPy operation.
+    """
+    n = len(points)
+    if tolerance <= 0 or n <= 2:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        chord = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(chord[0], chord[1])
+        if length == 0:
+            # Route returns to where the segment started: use distance to that point
+            dist = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            dist = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+def simplify_route(points, tolerance=0, stride=1):
+    """Apply stride then RDP tolerance to one player's route"""
+    return rdp(stride_points(points, stride), tolerance)
+
+
+def frame_step(fps):
+    """Frames to advance per kept frame for a requested frame rate"""
+    return max(1, int(round(TRACKING_FPS / fps)))
+
+
+def every_nth_frame(rows, step):
+    """
+    Rows whose frame falls on every step-th frame counted from the first
+    frame seen. Works on lists and on streamed cursors (closing the cursor
+    when the generator is closed).
+    """
+    try:
+        first = None
+        for row in rows:
+            if first is None:
+                first = row['frame_id']
+            if (row['frame_id'] - first) % step == 0:
+                yield row
+    finally:
+        if hasattr(rows, 'close'):
+            rows.close()
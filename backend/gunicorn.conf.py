@@ -0,0 +1,98 @@
+"""
+gunicorn settings for production: gunicorn -c gunicorn.conf.py
+
+Each worker is a separate process running create_app() with WEB_THREADS
+request threads, so a slow analytics query ties up one thread rather than
+the whole service.
+
+Sizing. A request holds at most one pooled connection, except
+/analytics/dashboard, which holds one per section while its sections run.
+So a worker needs DB_POOL_MAX >= WEB_THREADS to avoid queueing on its own
+pool, and the service needs
+
+    workers x DB_POOL_MAX <= DB_CONNECTION_BUDGET
+
+where the budget is Postgres max_connections minus what the loaders,
+migrations and admin sessions need (Railway's default of 100 leaves ~80).
+With WEB_WORKERS=0 the worker count is 2 x cores + 1, capped by that
+budget. Example: 4 cores, 4 threads, DB_POOL_MAX=8, budget 80 -> 9 workers
+(72 connections), 36 requests in flight.
+"""
+import multiprocessing
+import os
+from config import Config
+import database
+import migrate
+
+wsgi_app = 'app:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+worker_class = 'gthread'
+threads = Config.WEB_THREADS
+
+
+def worker_count():
+    by_cpu = 2 * multiprocessing.cpu_count() + 1
+    by_budget = max(1, Config.DB_CONNECTION_BUDGET // max(1, Config.DB_POOL_MAX))
+    return Config.WEB_WORKERS or min(by_cpu, by_budget)
+
+
+workers = worker_count()
+
+# Each worker imports and builds the app itself after the fork, so no
+# database connection, SQLite handle or warm-up thread crosses a fork
+preload_app = False
+
+# Requests longer than timeout get their worker restarted; on shutdown or
+# reload workers get graceful_timeout to finish in-flight requests
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+# Longer than the proxy's idle timeout, so the proxy closes idle
+# connections first and never reuses one the worker just dropped
+keepalive = Config.WEB_KEEPALIVE
+
+# Recycle workers now and then to bound memory growth
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    connections = workers * Config.DB_POOL_MAX
+    server.log.info(
+        "%d workers x %d threads; up to %d database connections (budget %d)",
+        workers, threads, connections, Config.DB_CONNECTION_BUDGET
+    )
+    if connections > Config.DB_CONNECTION_BUDGET:
+        server.log.warning("workers x DB_POOL_MAX exceeds DB_CONNECTION_BUDGET; lower WEB_WORKERS or DB_POOL_MAX")
+    if Config.DB_POOL_MAX < threads:
+        server.log.warning("DB_POOL_MAX is below WEB_THREADS; requests will wait for connections")
+    check_migrations(server)
+
+
+def check_migrations(server):
+    # Migrations are a release step (python migrate.py), never run from
+    # here; only report what the operator still has to apply
+    try:
+        conn = migrate.connect()
+        try:
+            waiting = migrate.pending(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        server.log.warning("Could not check schema migrations: %s", e)
+        return
+    if waiting:
+        names = ', '.join(f"{version:04d} {name}" for version, name in waiting)
+        server.log.warning("Pending schema migrations: %s; run python migrate.py", names)
+
+
+def post_fork(server, worker):
+    # Only matters with preload_app = True, but keeps that switch safe
+    database.reset_pool()
+
+
+def worker_exit(server, worker):
+    database.close_pool()
@@ -0,0 +1,162 @@
+"""
+Response compression and HTTP caching for the api blueprint.
+
+The season data only changes when a loader runs, and loaders bump the
+data_version stamp, so every response can carry a strong ETag made from the
+stamp, the release and the request (path, query string and Accept header).
+A request whose If-None-Match still matches is answered 304 before the view
+runs, without touching the tables; Cache-Control lets browsers and a CDN
+reuse responses for HTTP_CACHE_MAX_AGE seconds before revalidating.
+
+Responses are compressed with brotli (when the brotli package is installed)
+or gzip if the client accepts it and the body is at least COMPRESS_MIN_BYTES.
+Streamed responses are compressed chunk by chunk as they are sent; responses
+that already have a Content-Encoding (the pre-built tracking blobs) are left
+alone. Compressed responses carry the coding in their ETag, so each
+representation has its own validator.
+"""
+import gzip
+import hashlib
+import zlib
+from urllib.parse import urlencode
+from flask import Response, g, request
+from config import Config
+from database import get_data_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Live status endpoints: compressed, but never cached
+NO_STORE_ENDPOINTS = ('api.get_health', 'api.get_metrics', 'api.get_slow_queries')
+
+VARY = ('Accept-Encoding', 'Accept')
+
+
+def request_key():
+    """Everything a cacheable response depends on besides the data"""
+    args = sorted(request.args.items(multi=True))
+    return f"{request.path}?{urlencode(args)}|{request.headers.get('Accept', '')}"
+
+
+def version_etag():
+    key = f"{get_data_version()}|{Config.APP_RELEASE}|{request_key()}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def is_cacheable():
+    return request.method in ('GET', 'HEAD') and request.endpoint not in NO_STORE_ENDPOINTS
+
+
+def negotiate_encoding():
+    """'br', 'gzip' or None for the request's Accept-Encoding"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, coding):
+    if coding == 'br':
+        return brotli.compress(data, quality=Config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.COMPRESS_LEVEL)
+
+
+class _CompressedBody:
+    """Compresses a streamed body as it is sent, closing the source when done"""
+
+    def __init__(self, body, coding):
+        self.body = body
+        self.coding = coding
+
+    def __iter__(self):
+        if self.coding == 'br':
+            compressor = brotli.Compressor(quality=Config.COMPRESS_BROTLI_QUALITY)
+            process, finish = compressor.process, compressor.finish
+        else:
+            # wbits 31: gzip container
+            compressor = zlib.compressobj(Config.COMPRESS_LEVEL, zlib.DEFLATED, 31)
+            process, finish = compressor.compress, compressor.flush
+
+        for chunk in self.body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = process(chunk)
+            if out:
+                yield out
+        yield finish()
+
+    def close(self):
+        close = getattr(self.body, 'close', None)
+        if close is not None:
+            close()
+
+
+def add_vary(response):
+    for header in VARY:
+        response.vary.add(header)
+
+
+def not_modified():
+    """304 for a request that still holds the current ETag; runs before the view"""
+    if not is_cacheable() or not request.if_none_match:
+        return None
+
+    etag = version_etag()
+    g.version_etag = etag
+    for candidate in (etag, f"{etag}-gzip", f"{etag}-br"):
+        if request.if_none_match.contains(candidate):
+            response = Response(status=304)
+            response.set_etag(candidate)
+            response.headers['Cache-Control'] = f"public, max-age={Config.HTTP_CACHE_MAX_AGE}"
+            add_vary(response)
+            return response
+    return None
+
+
+def finish_response(response):
+    """Add validators and cache headers to successful responses, then compress"""
+    if response.status_code != 200:
+        return response
+
+    if not is_cacheable():
+        response.headers['Cache-Control'] = 'no-store'
+    else:
+        # Responses with their own validator (the tracking blobs' content
+        # hash) keep it
+        if 'ETag' not in response.headers:
+            response.set_etag(g.get('version_etag') or version_etag())
+        response.headers['Cache-Control'] = f"public, max-age={Config.HTTP_CACHE_MAX_AGE}"
+        add_vary(response)
+
+    coding = None
+    if 'Content-Encoding' not in response.headers and request.method != 'HEAD':
+        coding = negotiate_encoding()
+
+    if coding and response.is_streamed:
+        response.response = _CompressedBody(response.response, coding)
+        response.headers.pop('Content-Length', None)
+    elif coding and response.calculate_content_length() >= Config.COMPRESS_MIN_BYTES:
+        response.set_data(compress(response.get_data(), coding))
+    else:
+        coding = None
+
+    if coding:
+        response.headers['Content-Encoding'] = coding
+        response.vary.add('Accept-Encoding')
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{coding}")
+
+    if not response.is_streamed:
+        # Covers validators the views set themselves
+        response.make_conditional(request)
+    return response
+
+
+def init_blueprint(blueprint):
+    blueprint.before_request(not_modified)
+    blueprint.after_request(finish_response)
@@ -0,0 +1,157 @@
+"""
+Bookkeeping for the loader scripts.
+
+load_manifest has one row per (target table, source file name) recording the
+file's path, SHA-256 content hash, row count and status. A file is loaded in
+the same transaction that marks it 'loaded', so after a crash the manifest
+never claims rows that were rolled back, and re-running a loader skips what
+is already in and resumes with the first unfinished file.
+
+Databases loaded before the manifest existed have rows but no entries. The
+first time a file is planned, its plays are looked up in the target table: a
+file whose plays are all there is recorded as loaded without touching its
+rows, and one with only some of them is replaced rather than appended again.
+"""
+import hashlib
+import os
+import pandas as pd
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+MANIFEST_DDL = """
+    CREATE TABLE IF NOT EXISTS load_manifest (
+        target_table TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        source_path TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        row_count BIGINT,
+        status TEXT NOT NULL,
+        error TEXT,
+        loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (target_table, file_name)
+    )
+"""
+
+LOADED = 'loaded'
+FAILED = 'failed'
+
+
+def ensure_manifest(cursor):
+    cursor.execute(MANIFEST_DDL)
+
+
+def file_hash(path, block_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_entry(cursor, table, path):
+    """Manifest row for a file as a dict, or None if it was never seen"""
+    cursor.execute("""
+        SELECT source_path, content_hash, row_count, status
+        FROM load_manifest
+        WHERE target_table = %s AND file_name = %s
+    """, (table, os.path.basename(path)))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip(('source_path', 'content_hash', 'row_count', 'status'), row))
+
+
+def file_plays(path):
+    """(game_id, play_id) pairs in a source file, and its row count"""
+    columns = ['game_id', 'play_id']
+    if path.endswith('.xlsx'):
+        df = pd.read_excel(path, usecols=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    df['game_id'] = df['game_id'].astype(str).str.zfill(10)
+    plays = df.drop_duplicates().to_numpy().tolist()
+    return [(game_id, int(play_id)) for game_id, play_id in plays], len(df)
+
+
+def count_present(cursor, table, plays):
+    """How many of the (game_id, play_id) pairs already have rows in table"""
+    counts = execute_values(cursor, sql.SQL("""
+        SELECT count(*)
+        FROM (VALUES %s) AS f (game_id, play_id)
+        WHERE EXISTS (
+            SELECT 1 FROM {} t WHERE t.game_id = f.game_id AND t.play_id = f.play_id
+        )
+    """).format(sql.Identifier(table)), plays, page_size=1000, fetch=True)
+    return sum(row[0] for row in counts)
+
+
+def seed(cursor, table, path, content_hash):
+    """
+    Plan a file the manifest has never seen against the rows already in
+    table: 'skip' (and record it as loaded) when all its plays are there,
+    'replace' when some are, 'load' when none are
+    """
+    plays, row_count = file_plays(path)
+    present = count_present(cursor, table, plays) if plays else 0
+    if present == 0:
+        return 'load'
+    if present < len(plays):
+        return 'replace'
+    mark_loaded(cursor, table, path, content_hash, row_count)
+    return 'skip'
+
+
+def plan(cursor, table, path, force=False):
+    """
+    Decide what to do with a source file.
+
+    Returns (action, content_hash) where action is 'skip' (already loaded
+    with the same contents), 'replace' (loaded before but the file changed,
+    so its old rows must be removed first) or 'load'. A file without an
+    entry, or whose last load failed, is checked against the rows already in
+    table (see seed); commit after a 'skip' to keep the entry that records.
+    """
+    content_hash = file_hash(path)
+    entry = get_entry(cursor, table, path)
+    if entry is None or entry['status'] != LOADED:
+        if force:
+            return 'replace', content_hash
+        return seed(cursor, table, path, content_hash), content_hash
+    if entry['content_hash'] == content_hash and not force:
+        return 'skip', content_hash
+    return 'replace', content_hash
+
+
+def mark_loaded(cursor, table, path, content_hash, row_count):
+    """Record a successful load; call inside the transaction that loaded the rows"""
+    cursor.execute("""
+        INSERT INTO load_manifest
+            (target_table, file_name, source_path, content_hash, row_count, status, error, loaded_at)
+        VALUES (%s, %s, %s, %s, %s, %s, NULL, now())
+        ON CONFLICT (target_table, file_name) DO UPDATE SET
+            source_path = EXCLUDED.source_path,
+            content_hash = EXCLUDED.content_hash,
+            row_count = EXCLUDED.row_count,
+            status = EXCLUDED.status,
+            error = NULL,
+            loaded_at = EXCLUDED.loaded_at
+    """, (table, os.path.basename(path), os.path.abspath(path), content_hash, row_count, LOADED))
+
+
+def mark_failed(cursor, table, path, content_hash, error):
+    """
+    Record a failed load; call after rolling the load back.
+
+    A file whose earlier version is still loaded keeps that entry (so the
+    next run replaces it again) and only gets the error attached.
+    """
+    cursor.execute("""
+        INSERT INTO load_manifest
+            (target_table, file_name, source_path, content_hash, row_count, status, error, loaded_at)
+        VALUES (%s, %s, %s, %s, NULL, %s, %s, now())
+        ON CONFLICT (target_table, file_name) DO UPDATE SET
+            error = EXCLUDED.error,
+            status = CASE WHEN load_manifest.status = %s THEN load_manifest.status ELSE EXCLUDED.status END
+    """, (table, os.path.basename(path), os.path.abspath(path), content_hash, FAILED,
+          str(error)[:1000], LOADED))
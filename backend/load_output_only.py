@@ -1,74 +1,355 @@
+import argparse
+import io
+import time
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import execute_values
+from multiprocessing import Pool
 from config import Config
+from database import bump_data_version
+import load_manifest
+import partitions
 import glob
 import os
+import re
 
-# Path to your output CSV files
-data_folder = r'C:\Users\hfras\Desktop\NFL_Data'
+TABLE = 'output_data'
 
-print("Loading output data...")
 
-# Find all output CSV files
-output_files = sorted(glob.glob(os.path.join(data_folder, 'output*.csv')))
-print(f"Found {len(output_files)} output files")
+def connect():
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
 
-# Connect to PostgreSQL
-conn = psycopg2.connect(
-    host=Config.DB_HOST,
-    database=Config.DB_NAME,
-    user=Config.DB_USER,
-    password=Config.DB_PASSWORD,
-    port=Config.DB_PORT
-)
-cursor = conn.cursor()
 
-total_rows = 0
+def week_of_file(file):
+    """
+    Week number from a weekly file name such as output_2023_w05.csv, or
+    None for other names (a single season file); their rows take the week
+    of their game from play_information instead
+    """
+    match = re.search(r'_w(\d+)', os.path.basename(file))
+    return int(match.group(1)) if match else None
 
-for file in output_files:
-    print(f"\nLoading {os.path.basename(file)}...")
-    
-    # Read CSV
-    df = pd.read_csv(file)
-    
+
+def partition_name(week):
+    return f"{TABLE}_w{week:02d}"
+
+
+def prepare_chunk(df, week):
+    """
+    Apply the output_data column conventions to a DataFrame chunk. week is
+    the file's week, or a {game_id: week} lookup for files without one;
+    games it does not know get week 0 (the default partition). None leaves
+    the week out, for output_data before migration 0005 partitions it.
+    """
     # Convert game_id to string and ensure 10 digits with leading zeros
     df['game_id'] = df['game_id'].astype(str).str.zfill(10)
-    
+    # Carry the partition key
+    if week is None:
+        return df
+    if isinstance(week, dict):
+        df['week'] = df['game_id'].map(week).fillna(0).astype(int)
+    else:
+        df['week'] = week
+    return df
+
+
+def delete_plays(cursor, df, seen=None):
+    """
+    Remove rows for the plays in df that an earlier version of the file
+    loaded; used to replace files that span several weeks.
+
+    seen collects the plays already cleared for this file, so chunks that
+    continue a play do not delete rows copied from the previous chunk.
+    """
+    plays = set(map(tuple, df[['game_id', 'play_id']].drop_duplicates().to_numpy().tolist()))
+    if seen is not None:
+        plays -= seen
+        seen |= plays
+    if plays:
+        execute_values(cursor, """
+            DELETE FROM output_data o
+            USING (VALUES %s) AS d (game_id, play_id)
+            WHERE o.game_id = d.game_id AND o.play_id = d.play_id
+        """, list(plays))
+
+
+def insert_rows(cursor, file, chunksize, table, week, replace=False):
+    """Original loader: read the whole CSV and batch INSERT it"""
+    # Read CSV
+    df = prepare_chunk(pd.read_csv(file), week)
+
+    if replace:
+        delete_plays(cursor, df)
+
     # Replace NaN with None
-    df = df.where(pd.notnull(df), None)
-    
+    df = df.astype(object).where(pd.notnull(df), None)
+
     # Get columns
     columns = df.columns.tolist()
-    
+
     # Create INSERT statement
-    insert_query = sql.SQL("INSERT INTO output_data ({}) VALUES %s").format(
+    insert_query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+        sql.Identifier(table),
         sql.SQL(', ').join(map(sql.Identifier, columns))
     )
-    
+
     # Convert to tuples
     values = [tuple(x) for x in df.to_numpy()]
-    
+
     # Insert
     execute_values(cursor, insert_query, values, page_size=1000)
+    return len(df)
+
+
+def copy_rows(cursor, file, chunksize, table, week, replace=False):
+    """
+    Stream a CSV into table with COPY ... FROM STDIN.
+
+    Only one chunk of chunksize rows is held in memory at a time.
+    """
+    rows = 0
+    seen = set()
+
+    for chunk in pd.read_csv(file, chunksize=chunksize):
+        chunk = prepare_chunk(chunk, week)
+
+        if replace:
+            delete_plays(cursor, chunk, seen)
+
+        copy_query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(map(sql.Identifier, chunk.columns.tolist()))
+        )
+
+        # Missing values are written as empty fields, which COPY reads as NULL
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy_query.as_string(cursor.connection), buffer)
+        rows += len(chunk)
+
+    return rows
+
+
+def ensure_partition(cursor, week):
+    """Create the week's partition of output_data if it does not exist yet"""
+    cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES IN ({})").format(
+        sql.Identifier(partition_name(week)), sql.Identifier(TABLE), sql.Literal(week)
+    ))
+
+
+def swap_partition(cursor, load_rows, file, chunksize, week):
+    """
+    Replace a week of output_data wholesale.
+
+    The file is loaded into a fresh table, which then takes the place of the
+    week's partition: the old partition is detached and dropped and the new
+    table attached (its indexes are built on attach). Everything happens in
+    the caller's transaction, so readers see either the old week or the new.
+    """
+    partition = partition_name(week)
+    staging = f"{partition}_load"
+
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging)))
+    cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS)").format(
+        sql.Identifier(staging), sql.Identifier(TABLE)
+    ))
+    rows = load_rows(cursor, file, chunksize, staging, week)
+
+    # Lets ATTACH skip the scan that checks every row belongs to the week
+    cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} CHECK (week = {})").format(
+        sql.Identifier(staging), sql.Identifier(f"{partition}_week"), sql.Literal(week)
+    ))
+
+    ensure_partition(cursor, week)
+    cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+        sql.Identifier(TABLE), sql.Identifier(partition)
+    ))
+    cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition)))
+    cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+        sql.Identifier(staging), sql.Identifier(partition)
+    ))
+    cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES IN ({})").format(
+        sql.Identifier(TABLE), sql.Identifier(partition), sql.Literal(week)
+    ))
+    return rows
+
+
+def load_file(file, mode='insert', chunksize=100000, force=False):
+    """
+    Load one weekly CSV unless the manifest shows it is already in.
+
+    The rows and the manifest entry are committed in one transaction. A new
+    weekly file is loaded into its week's partition; a weekly file that
+    changed since it was loaded replaces the whole partition (see
+    swap_partition). Files without a week in their name are loaded through
+    output_data, each row routed by its game's week, and a changed one
+    replaces the plays it contains, as does every file while output_data is
+    not partitioned yet. Returns (file, action, rows, seconds).
+    """
+    week = week_of_file(file)
+    conn = connect()
+    cursor = conn.cursor()
+    start = time.time()
+
+    action, content_hash = load_manifest.plan(cursor, TABLE, file, force)
+    if action == 'skip':
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return file, action, 0, 0.0
+
+    load_rows = copy_rows if mode == 'copy' else insert_rows
+    try:
+        if not partitions.has_week(cursor, TABLE):
+            # Migration 0005 has not swapped the week partitions in yet
+            rows = load_rows(cursor, file, chunksize, TABLE, None, replace=action == 'replace')
+        elif week is None:
+            rows = load_rows(cursor, file, chunksize, TABLE, partitions.week_lookup(cursor),
+                             replace=action == 'replace')
+        elif action == 'replace':
+            rows = swap_partition(cursor, load_rows, file, chunksize, week)
+        else:
+            ensure_partition(cursor, week)
+            rows = load_rows(cursor, file, chunksize, partition_name(week), week)
+        load_manifest.mark_loaded(cursor, TABLE, file, content_hash, rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        load_manifest.mark_failed(cursor, TABLE, file, content_hash, e)
+        conn.commit()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    return file, action, rows, time.time() - start
+
+
+def _load_file(args):
+    return load_file(*args)
+
+
+def drop_secondary_indexes(cursor, table):
+    """Drop indexes not backing a constraint; returns their definitions"""
+    cursor.execute("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = current_schema()
+            AND i.tablename = %s
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname
+            )
+    """, (table,))
+    indexes = cursor.fetchall()
+    for name, definition in indexes:
+        print(f"  Dropping index {name}: {definition}")
+        cursor.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(name)))
+    return indexes
+
+
+def recreate_indexes(cursor, indexes):
+    for name, definition in indexes:
+        print(f"  Rebuilding index {name}...")
+        start = time.time()
+        cursor.execute(definition)
+        print(f"  Rebuilt {name} in {time.time() - start:.1f}s")
+
+
+def report(file, action, rows, elapsed):
+    if action == 'skip':
+        print(f"Skipped {os.path.basename(file)}: already loaded")
+        return
+    rate = rows / elapsed if elapsed > 0 else 0
+    verb = 'Replaced' if action == 'replace' else 'Loaded'
+    print(f"{verb} {os.path.basename(file)}: {rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load output*.csv tracking files into output_data')
+    parser.add_argument('--data-dir', default=Config.DATA_DIR,
+                        help='Folder containing the output*.csv files (default: NFL_DATA_DIR)')
+    parser.add_argument('--force', action='store_true',
+                        help='Reload files the manifest already marks as loaded')
+    parser.add_argument('--mode', choices=['insert', 'copy'], default='insert',
+                        help="'copy' streams files through COPY in parallel workers")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Parallel worker processes in copy mode')
+    parser.add_argument('--chunksize', type=int, default=100000,
+                        help='Rows held in memory per worker in copy mode')
+    parser.add_argument('--rebuild-indexes', action='store_true',
+                        help='Drop secondary indexes on output_data before loading and rebuild them after')
+    args = parser.parse_args()
+
+    print("Loading output data...")
+
+    # Find all output CSV files
+    output_files = sorted(glob.glob(os.path.join(args.data_dir, 'output*.csv')))
+    print(f"Found {len(output_files)} output files")
+
+    # Connect to PostgreSQL
+    conn = connect()
+    cursor = conn.cursor()
+    load_manifest.ensure_manifest(cursor)
     conn.commit()
-    
-    print(f"Loaded {len(df):,} rows")
-    total_rows += len(df)
 
-print(f"\nTotal rows loaded: {total_rows:,}")
+    indexes = []
+    if args.rebuild_indexes:
+        indexes = drop_secondary_indexes(cursor, 'output_data')
+        conn.commit()
+
+    total_rows = 0
+    start = time.time()
+
+    try:
+        if args.mode == 'copy':
+            print(f"Streaming with COPY using {args.workers} workers, {args.chunksize:,} rows per chunk")
+            with Pool(args.workers) as pool:
+                jobs = [(file, args.mode, args.chunksize, args.force) for file in output_files]
+                for file, action, rows, elapsed in pool.imap_unordered(_load_file, jobs):
+                    report(file, action, rows, elapsed)
+                    total_rows += rows
+        else:
+            for file in output_files:
+                print(f"\nLoading {os.path.basename(file)}...")
+                file, action, rows, elapsed = load_file(file, args.mode, args.chunksize, args.force)
+                report(file, action, rows, elapsed)
+                total_rows += rows
+    finally:
+        if indexes:
+            recreate_indexes(cursor, indexes)
+            conn.commit()
+
+    elapsed = time.time() - start
+    print(f"\nTotal rows loaded: {total_rows:,} in {elapsed:.1f}s "
+          f"({total_rows / elapsed if elapsed > 0 else 0:,.0f} rows/sec)")
+
+    # Invalidate API caches filled from the previous data
+    if total_rows:
+        bump_data_version(cursor)
+        conn.commit()
+
+    # Verify
+    cursor.execute("SELECT COUNT(*) FROM output_data")
+    count = cursor.fetchone()[0]
+    print(f"Rows in database: {count:,}")
+
+    cursor.execute("SELECT DISTINCT game_id FROM output_data ORDER BY game_id LIMIT 5")
+    print("\nSample game_ids:")
+    for row in cursor.fetchall():
+        print(f"  {row[0]}")
 
-# Verify
-cursor.execute("SELECT COUNT(*) FROM output_data")
-count = cursor.fetchone()[0]
-print(f"Rows in database: {count:,}")
+    cursor.close()
+    conn.close()
+    print("\nDone!")
 
-cursor.execute("SELECT DISTINCT game_id FROM output_data ORDER BY game_id LIMIT 5")
-print("\nSample game_ids:")
-for row in cursor.fetchall():
-    print(f"  {row[0]}")
 
-cursor.close()
-conn.close()
-print("\nDone!")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,67 +1,121 @@
+import argparse
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import execute_values
 from config import Config
+from database import bump_data_version
+import load_manifest
+import partitions
+import os
 
-# Path to supplemental data file
-file_path = r'C:\Users\hfras\Desktop\NFL_Data\supplementary_data.csv'  
-
-print("Loading play information data...")
-
-# Read the CSV/Excel file
-df = pd.read_excel(file_path) if file_path.endswith('.xlsx') else pd.read_csv(file_path)
-
-print(f"Loaded {len(df)} rows")
-print(f"Columns: {df.columns.tolist()}")
-
-# Connect to PostgreSQL
-conn = psycopg2.connect(
-    host=Config.DB_HOST,
-    database=Config.DB_NAME,
-    user=Config.DB_USER,
-    password=Config.DB_PASSWORD,
-    port=Config.DB_PORT
-)
-cursor = conn.cursor()
-
-# Convert game_id to string to match tracking_data
-df['game_id'] = df['game_id'].astype(str)
-
-# Handle NaN values
-df = df.where(pd.notnull(df), None)
-
-# Get column names
-columns = df.columns.tolist()
-
-# Create INSERT statement
-insert_query = sql.SQL("INSERT INTO play_information ({}) VALUES %s ON CONFLICT (game_id, play_id) DO NOTHING").format(
-    sql.SQL(', ').join(map(sql.Identifier, columns))
-)
-
-# Convert DataFrame to list of tuples
-values = [tuple(x) for x in df.to_numpy()]
-
-# Execute batch insert
-print("Inserting data into database...")
-execute_values(cursor, insert_query, values, page_size=100)
-conn.commit()
-
-# Verify
-cursor.execute("SELECT COUNT(*) FROM play_information")
-count = cursor.fetchone()[0]
-print(f"Successfully loaded {count} play records")
-
-# Show sample
-cursor.execute("""
-    SELECT game_id, play_id, home_team_abbr, visitor_team_abbr, play_description 
-    FROM play_information 
-    LIMIT 5
-""")
-print("\nSample data:")
-for row in cursor.fetchall():
-    print(row)
-
-cursor.close()
-conn.close()
-print("\nDone!")
\ No newline at end of file
+TABLE = 'play_information'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load supplementary play data into play_information')
+    parser.add_argument('--data-dir', default=Config.DATA_DIR,
+                        help='Folder containing the supplementary data file (default: NFL_DATA_DIR)')
+    parser.add_argument('--file', default='supplementary_data.csv',
+                        help='File name (or path) of the supplementary data, .csv or .xlsx')
+    parser.add_argument('--force', action='store_true',
+                        help='Reload the file even if the manifest marks it as loaded')
+    args = parser.parse_args()
+
+    # Path to supplemental data file
+    file_path = os.path.join(args.data_dir, args.file)
+
+    print("Loading play information data...")
+
+    # Connect to PostgreSQL
+    conn = psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
+    cursor = conn.cursor()
+    load_manifest.ensure_manifest(cursor)
+    conn.commit()
+
+    action, content_hash = load_manifest.plan(cursor, TABLE, file_path, args.force)
+    if action == 'skip':
+        print(f"{os.path.basename(file_path)} is already loaded (use --force to reload)")
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return
+
+    # Read the CSV/Excel file
+    df = pd.read_excel(file_path) if file_path.endswith('.xlsx') else pd.read_csv(file_path)
+
+    print(f"Loaded {len(df)} rows")
+    print(f"Columns: {df.columns.tolist()}")
+
+    # Convert game_id to string to match tracking_data
+    df['game_id'] = df['game_id'].astype(str)
+
+    # Handle NaN values
+    df = df.astype(object).where(pd.notnull(df), None)
+
+    # Get column names
+    columns = df.columns.tolist()
+
+    # Create INSERT statement; rows from a changed file overwrite the old version
+    insert_query = sql.SQL(
+        "INSERT INTO play_information ({}) VALUES %s ON CONFLICT (game_id, play_id) DO UPDATE SET {}"
+    ).format(
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        sql.SQL(', ').join(
+            sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(c), sql.Identifier(c))
+            for c in columns if c not in ('game_id', 'play_id')
+        )
+    )
+
+    # Convert DataFrame to list of tuples
+    values = [tuple(x) for x in df.to_numpy()]
+
+    # Execute batch insert and record it in the manifest in one transaction
+    print("Inserting data into database...")
+    try:
+        execute_values(cursor, insert_query, values, page_size=100)
+        load_manifest.mark_loaded(cursor, TABLE, file_path, content_hash, len(values))
+
+        # Tracking rows loaded before their game's play information sit in
+        # the week 0 partition; move them to their week
+        for table, rows in partitions.assign_weeks(cursor).items():
+            if rows:
+                print(f"Moved {rows:,} {table} rows to their week partition")
+
+        # Invalidate API caches filled from the previous data
+        bump_data_version(cursor)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        load_manifest.mark_failed(cursor, TABLE, file_path, content_hash, e)
+        conn.commit()
+        raise
+
+    # Verify
+    cursor.execute("SELECT COUNT(*) FROM play_information")
+    count = cursor.fetchone()[0]
+    print(f"Successfully loaded {count} play records")
+
+    # Show sample
+    cursor.execute("""
+        SELECT game_id, play_id, home_team_abbr, visitor_team_abbr, play_description
+        FROM play_information
+        LIMIT 5
+    """)
+    print("\nSample data:")
+    for row in cursor.fetchall():
+        print(row)
+
+    cursor.close()
+    conn.close()
+    print("\nDone!")
+
+
+if __name__ == '__main__':
+    main()
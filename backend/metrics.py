@@ -0,0 +1,402 @@
+"""
+Request, SQL and payload metrics in Prometheus text format.
+
+init_app times every request, counts response bytes and times JSON encoding;
+database connections hand out InstrumentedCursor, which times each execute
+and fetch and counts the rows fetched. Everything is labelled with the
+endpoint serving the request, so /api/metrics shows where a slow route spends
+its time: connect (pool checkout), query, fetch or serialize. Phase times are
+summed per request (including the dashboard's section threads) and observed
+once when it finishes, so each phase histogram counts requests, not calls.
+
+Statements slower than Config.SLOW_QUERY_MS are logged to the 'slow_query'
+logger with their parameters; the most recent ones are also kept for
+/api/metrics/slow-queries. With SLOW_QUERY_EXPLAIN on, a sample of the slow
+SELECTs is re-run as EXPLAIN (ANALYZE, BUFFERS) by a background thread on
+its own connection, never on the request's, and the plan is added to the
+entry (and logged) when it is ready.
+
+Metrics live in the worker process that recorded them; with several workers
+each scrape reaches one of them, so scrape workers individually or read the
+numbers as per-process samples.
+"""
+import bisect
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from psycopg2.extensions import cursor as plain_cursor
+from psycopg2.extras import RealDictCursor
+from config import Config
+
+logger = logging.getLogger('slow_query')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+PHASES = ('connect', 'query', 'fetch', 'serialize')
+
+
+class Histogram:
+    """Thread-safe cumulative histogram, one series per label tuple"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, values in series:
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {values[-1]}")
+        return lines
+
+
+class Counter:
+    """Thread-safe counter, one series per label tuple"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, value in series:
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+request_seconds = Histogram(
+    'api_request_duration_seconds', 'Request latency, until the last byte for streamed responses',
+    ('endpoint', 'method', 'status'), LATENCY_BUCKETS
+)
+phase_seconds = Histogram(
+    'api_phase_duration_seconds', 'Time per request spent in each phase (connect, query, fetch, serialize)',
+    ('endpoint', 'phase'), LATENCY_BUCKETS
+)
+response_bytes = Histogram(
+    'api_response_bytes', 'Response body size as sent (after any compression)',
+    ('endpoint',), SIZE_BUCKETS
+)
+query_rows = Histogram(
+    'api_query_rows', 'Rows fetched per statement',
+    ('endpoint',), ROW_BUCKETS
+)
+slow_queries = Counter(
+    'api_slow_queries_total', 'Statements slower than SLOW_QUERY_MS',
+    ('endpoint',)
+)
+
+METRICS = (request_seconds, phase_seconds, response_bytes, query_rows, slow_queries)
+
+_recent_slow = deque(maxlen=Config.SLOW_QUERY_LOG_SIZE)
+
+# Endpoint of the request the current thread is serving. Kept per thread
+# rather than read from the request context because streamed responses keep
+# fetching rows after the view (and its context) has returned.
+_current = threading.local()
+
+
+def current_endpoint():
+    endpoint = getattr(_current, 'endpoint', None)
+    if endpoint is None and has_request_context():
+        endpoint = request.endpoint
+    return endpoint or 'none'
+
+
+class _PhaseTotals:
+    """Time per phase of one request, summed over every call and thread"""
+
+    def __init__(self):
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+
+    def observe(self, endpoint):
+        with self._lock:
+            totals = sorted(self.totals.items())
+        for phase, seconds in totals:
+            phase_seconds.observe((endpoint, phase), seconds)
+
+
+def observe_phase(phase, seconds):
+    # Inside a request the time is added to the request's totals, which are
+    # observed once when it finishes; background work (warm-up, loaders)
+    # has no request and is observed per call
+    totals = getattr(_current, 'phases', None)
+    if totals is not None:
+        totals.add(phase, seconds)
+    else:
+        phase_seconds.observe((current_endpoint(), phase), seconds)
+
+
+def request_context():
+    """The calling thread's request labels, for helper threads working on the request"""
+    return getattr(_current, 'endpoint', None), getattr(_current, 'phases', None)
+
+
+def run_in_context(context, fn, *args):
+    """Call fn on a helper thread, counting its time towards the request context came from"""
+    _current.endpoint, _current.phases = context
+    try:
+        return fn(*args)
+    finally:
+        _current.endpoint = _current.phases = None
+
+
+def is_explainable(query):
+    # EXPLAIN ANALYZE runs the statement, so only ever re-run reads
+    words = query.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in ('SELECT', 'WITH')
+
+
+def explain(conn, query, params):
+    """EXPLAIN (ANALYZE, BUFFERS) text for a statement, or the error message"""
+    cursor = conn.cursor(cursor_factory=plain_cursor)
+    try:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+
+def record_slow_query(cursor, query, params, seconds):
+    endpoint = current_endpoint()
+    slow_queries.inc((endpoint,))
+
+    entry = {
+        'endpoint': endpoint,
+        'ms': round(seconds * 1000, 1),
+        'sql': ' '.join(query.split()),
+        'params': [str(p) for p in params] if isinstance(params, (list, tuple)) else params,
+        'plan': None,
+        'at': time.time()
+    }
+    _recent_slow.append(entry)
+    logger.warning("Slow query (%.0f ms) on %s: %s params=%r",
+                   entry['ms'], endpoint, entry['sql'], entry['params'])
+
+    if (Config.SLOW_QUERY_EXPLAIN and is_explainable(query)
+            and random.random() < Config.SLOW_QUERY_EXPLAIN_SAMPLE):
+        queue_explain(entry, query, params)
+
+
+# Slow statements waiting for a background EXPLAIN; when the thread falls
+# behind, further ones are simply not explained
+_explain_queue = queue.Queue(maxsize=10)
+_explain_thread = {'thread': None}
+_explain_lock = threading.Lock()
+
+
+def queue_explain(entry, query, params):
+    with _explain_lock:
+        if _explain_thread['thread'] is None:
+            thread = threading.Thread(target=_explain_worker, name='slow-query-explain', daemon=True)
+            thread.start()
+            _explain_thread['thread'] = thread
+    try:
+        _explain_queue.put_nowait((entry, query, params))
+    except queue.Full:
+        pass
+
+
+def _explain_worker():
+    """Runs the queued EXPLAINs one at a time on a connection of its own"""
+    import psycopg2
+    from database import get_connection_params
+
+    conn = None
+    while True:
+        entry, query, params = _explain_queue.get()
+        try:
+            if conn is None or conn.closed:
+                conn = psycopg2.connect(**get_connection_params())
+            entry['plan'] = explain(conn, query, params)
+            conn.rollback()
+        except Exception as e:
+            entry['plan'] = f"EXPLAIN failed: {e}"
+            if conn is not None:
+                conn.close()
+            conn = None
+        logger.warning("Plan for slow query (%.0f ms) on %s: %s\n%s",
+                       entry['ms'], entry['endpoint'], entry['sql'], entry['plan'])
+
+
+def recent_slow_queries():
+    """Most recent slow statements, newest first"""
+    return list(reversed(_recent_slow))
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that times execute and fetch calls and counts rows"""
+
+    def execute(self, query, params=None):
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            observe_phase('query', elapsed)
+        # Named (streaming) cursors only declare the query here
+        if Config.SLOW_QUERY_MS and elapsed * 1000 >= Config.SLOW_QUERY_MS and not self.name:
+            record_slow_query(self, query, params, elapsed)
+        return result
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        observe_phase('fetch', time.perf_counter() - start)
+        rows = 1 if isinstance(result, dict) else len(result or ())
+        query_rows.observe((current_endpoint(),), rows)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with encoding time recorded as 'serialize'"""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            observe_phase('serialize', time.perf_counter() - start)
+
+
+class _CountedBody:
+    """
+    Wraps a streamed response body to record its size and duration once the
+    server closes it (after the last chunk, or when the client goes away)
+    """
+
+    def __init__(self, body, labels, start, phases):
+        self.body = body
+        self.labels = labels
+        self.start = start
+        self.phases = phases
+        self.sent = 0
+
+    def __iter__(self):
+        for chunk in self.body:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        close = getattr(self.body, 'close', None)
+        if close is not None:
+            close()
+        response_bytes.observe(self.labels[:1], self.sent)
+        request_seconds.observe(self.labels, time.perf_counter() - self.start)
+        if self.phases is not None:
+            self.phases.observe(self.labels[0])
+        _current.endpoint = _current.phases = None
+
+
+def _start_request():
+    _current.endpoint = request.endpoint or 'none'
+    _current.phases = _PhaseTotals()
+    g.metrics_start = time.perf_counter()
+
+
+def _finish_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    endpoint = _current.endpoint
+    labels = (endpoint, request.method, str(response.status_code))
+
+    phases = getattr(_current, 'phases', None)
+
+    # Streamed responses keep fetching rows until the body is closed
+    if response.is_streamed:
+        response.response = _CountedBody(response.response, labels, start, phases)
+        return response
+
+    response_bytes.observe((endpoint,), response.calculate_content_length() or 0)
+    request_seconds.observe(labels, time.perf_counter() - start)
+    if phases is not None:
+        phases.observe(endpoint)
+    _current.endpoint = _current.phases = None
+    return response
+
+
+def init_app(app):
+    """Instrument every request handled by app"""
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def render(gauges=()):
+    """
+    Prometheus exposition text for the recorded metrics, plus gauges given
+    as (name, help, [(labels dict, value), ...]) read at scrape time
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for name, help_text, samples in gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            label_text = _labels(labels.keys(), labels.values())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,260 @@
+"""
+Versioned schema migrations.
+
+Each file in migrations/ named NNNN_description.sql is one migration. They
+are applied in version order, each in its own transaction together with its
+row in schema_migrations, so an interrupted run resumes at the first
+migration that did not commit. Migrations are a release step an operator
+runs on purpose, before deploying code that needs them, never part of the
+server's start command: some rewrite or lock large tables, and a crash-looping
+deploy must not retry them. The server only warns at startup when
+migrations are pending (see gunicorn.conf.py).
+
+    python migrate.py           # apply pending migrations
+    python migrate.py status    # list applied / pending versions
+    python migrate.py verify    # EXPLAIN the API queries, fail on seq scans
+
+verify plans every API query that reads tracking_data with sequential scans
+disabled, so the planner takes any usable index; a Seq Scan left in the plan
+means no index covers the query and the command exits non-zero, as does a
+week-filtered query that reads more than one week partition.
+"""
+import glob
+import os
+import re
+import sys
+import psycopg2
+from config import Config
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+# Tables whose sequential scans fail verify
+SCAN_CHECKED_TABLES = ('tracking_data',)
+
+
+def connect():
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
+
+
+def load_migrations():
+    """[(version, name, path)] for the files in migrations/, by version"""
+    migrations = []
+    for path in glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql')):
+        match = re.match(r'(\d+)_(.+)\.sql$', os.path.basename(path))
+        if not match:
+            raise SystemExit(f"Migration file names must look like 0001_name.sql: {path}")
+        migrations.append((int(match.group(1)), match.group(2), path))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise SystemExit("Duplicate migration versions in migrations/")
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute(SCHEMA_MIGRATIONS_DDL)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending(conn):
+    """[(version, name)] of the migrations not applied yet; read-only"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        applied = set()
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.rollback()
+    return [(version, name) for version, name, _ in load_migrations() if version not in applied]
+
+
+def migrate(conn):
+    """Apply pending migrations; returns the versions applied"""
+    cursor = conn.cursor()
+    applied = applied_versions(cursor)
+    conn.commit()
+
+    done = []
+    for version, name, path in load_migrations():
+        if version in applied:
+            continue
+        print(f"Applying {version:04d} {name}...")
+        with open(path) as f:
+            ddl = f.read()
+        try:
+            cursor.execute(ddl)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            # Migrations that need an operator step first (0005) say so here
+            raise SystemExit(f"Migration {version:04d} {name} was not applied: {(e.pgerror or str(e)).strip()}")
+        except Exception:
+            conn.rollback()
+            raise
+        done.append(version)
+
+    cursor.close()
+    return done
+
+
+def status(conn):
+    cursor = conn.cursor()
+    applied = applied_versions(cursor)
+    conn.commit()
+    cursor.close()
+    for version, name, _ in load_migrations():
+        state = 'applied' if version in applied else 'pending'
+        print(f"{version:04d} {name}: {state}")
+
+
+class QueryRecorder:
+    """
+    Stands in for a cursor in the analytics query functions: execute()
+    records the query and its parameters instead of running it.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+
+def scans(plan):
+    """(node type, relation) of every table scan anywhere in a plan tree"""
+    found = []
+    if plan.get('Relation Name'):
+        found.append((plan['Node Type'], plan['Relation Name']))
+    for child in plan.get('Plans', []):
+        found.extend(scans(child))
+    return found
+
+
+def is_checked(relation):
+    # Partitions are named <table>_w01 ... / <table>_default
+    return any(relation == table or relation.startswith(table + '_') for table in SCAN_CHECKED_TABLES)
+
+
+def route_queries(cursor):
+    """
+    (name, query, params, single_week) for the API queries that read
+    tracking_data; single_week queries must be pruned to one partition
+    """
+    import analytics
+    import partitions
+    import players
+    import routes
+    import tracking_query
+
+    cursor.execute("""
+        SELECT t.game_id, t.play_id, p.week, p.possession_team
+        FROM tracking_data t
+        LEFT JOIN play_information p ON t.game_id = p.game_id AND t.play_id = p.play_id
+        LIMIT 1
+    """)
+    sample = cursor.fetchone()
+    if sample is None:
+        raise SystemExit("tracking_data is empty; load data before running verify")
+    game_id, play_id, week, team = sample
+
+    queries = [
+        ('play tracking', *tracking_query.build_query(game_id, play_id), False),
+        ('play tracking (filtered)', *tracking_query.build_query(game_id, play_id, {
+            'from_frame': 1, 'to_frame': 10, 'side': 'Offense', 'position': ['WR']
+        }), False),
+        ('play routes', routes.ROUTE_POINTS_QUERY, (game_id, play_id), False),
+        ('players (before build_derived.py players)', players.TRACKING_PLAYERS_QUERY, None, False),
+    ]
+
+    # The recorder cannot answer speed_vs_success's partition check, so
+    # make it here; week filters are only pruned once 0005 has run
+    partitioned = partitions.is_partitioned(cursor, 'tracking_data')
+
+    # Analytics functions build their SQL from the filters; capture it
+    for week_filter, team_filter in ((None, None), (week, team)):
+        recorder = QueryRecorder()
+        analytics.speed_vs_success(recorder, week=week_filter, team=team_filter)
+        label = 'speed vs success' + (' (filtered)' if week_filter else '')
+        queries.extend((label, query, params, bool(week_filter) and partitioned)
+                       for query, params in recorder.queries if 'tracking_data' in query)
+    return queries
+
+
+def verify(conn):
+    """Print each query's verdict; returns True if none scans a checked table"""
+    cursor = conn.cursor()
+    cursor.execute("SET enable_seqscan = off")
+    ok = True
+
+    for name, query, params, single_week in route_queries(cursor):
+        cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        plan = cursor.fetchone()[0][0]['Plan']
+        checked = [(node, relation) for node, relation in scans(plan) if is_checked(relation)]
+
+        seq = sorted({relation for node, relation in checked if node == 'Seq Scan'})
+        partitions = {relation for _, relation in checked}
+        if seq:
+            ok = False
+            print(f"FAIL {name}: sequential scan on {', '.join(seq)}")
+        elif single_week and len(partitions) > 1:
+            ok = False
+            print(f"FAIL {name}: week filter reads {len(partitions)} partitions")
+        else:
+            print(f"ok   {name}")
+
+    conn.rollback()
+    cursor.close()
+    return ok
+
+
+def main(args):
+    command = args[0] if args else 'up'
+    if command not in ('up', 'status', 'verify'):
+        print(f"Unknown command '{command}'. Available: up, status, verify")
+        sys.exit(1)
+
+    conn = connect()
+    try:
+        if command == 'status':
+            status(conn)
+        elif command == 'verify':
+            if not verify(conn):
+                sys.exit(1)
+        else:
+            applied = migrate(conn)
+            print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,84 @@
+-- Tables the loaders fill. IF NOT EXISTS so databases created before the
+-- migration runner keep their existing tables.
+
+CREATE TABLE IF NOT EXISTS play_information (
+    game_id TEXT NOT NULL,
+    season INTEGER,
+    week INTEGER,
+    game_date TEXT,
+    game_time_eastern TEXT,
+    home_team_abbr TEXT,
+    visitor_team_abbr TEXT,
+    play_id INTEGER NOT NULL,
+    play_description TEXT,
+    quarter INTEGER,
+    game_clock TEXT,
+    down INTEGER,
+    yards_to_go INTEGER,
+    possession_team TEXT,
+    defensive_team TEXT,
+    yardline_side TEXT,
+    yardline_number INTEGER,
+    pre_snap_home_score INTEGER,
+    pre_snap_visitor_score INTEGER,
+    pass_result TEXT,
+    pass_length DOUBLE PRECISION,
+    offense_formation TEXT,
+    receiver_alignment TEXT,
+    route_of_targeted_receiver TEXT,
+    play_action BOOLEAN,
+    dropback_type TEXT,
+    dropback_distance DOUBLE PRECISION,
+    pass_location_type TEXT,
+    defenders_in_the_box INTEGER,
+    team_coverage_man_zone TEXT,
+    team_coverage_type TEXT,
+    penalty_yards INTEGER,
+    pre_penalty_yards_gained INTEGER,
+    yards_gained INTEGER,
+    expected_points DOUBLE PRECISION,
+    expected_points_added DOUBLE PRECISION,
+    pre_snap_home_team_win_probability DOUBLE PRECISION,
+    pre_snap_visitor_team_win_probability DOUBLE PRECISION,
+    home_team_win_probability_added DOUBLE PRECISION,
+    visitor_team_win_probility_added DOUBLE PRECISION,
+    PRIMARY KEY (game_id, play_id)
+);
+
+-- Input (pre-throw) tracking, one row per player per frame
+CREATE TABLE IF NOT EXISTS tracking_data (
+    game_id TEXT NOT NULL,
+    play_id INTEGER NOT NULL,
+    player_to_predict BOOLEAN,
+    nfl_id INTEGER NOT NULL,
+    frame_id INTEGER NOT NULL,
+    play_direction TEXT,
+    absolute_yardline_number INTEGER,
+    player_name TEXT,
+    player_height TEXT,
+    player_weight INTEGER,
+    player_birth_date TEXT,
+    player_position TEXT,
+    player_side TEXT,
+    player_role TEXT,
+    x DOUBLE PRECISION,
+    y DOUBLE PRECISION,
+    s DOUBLE PRECISION,
+    a DOUBLE PRECISION,
+    dir DOUBLE PRECISION,
+    o DOUBLE PRECISION,
+    num_frames_output INTEGER,
+    ball_land_x DOUBLE PRECISION,
+    ball_land_y DOUBLE PRECISION,
+    PRIMARY KEY (game_id, play_id, nfl_id, frame_id)
+);
+
+-- Output (post-throw) positions; frame_id restarts at 1 after the throw
+CREATE TABLE IF NOT EXISTS output_data (
+    game_id TEXT NOT NULL,
+    play_id INTEGER NOT NULL,
+    nfl_id INTEGER NOT NULL,
+    frame_id INTEGER NOT NULL,
+    x DOUBLE PRECISION,
+    y DOUBLE PRECISION
+);
@@ -0,0 +1,63 @@
+-- Input and output tracking as one sequence of frames per play.
+--
+-- The view predates these migrations: production databases already have it,
+-- and the frontend and every analytics query read whatever it returns. An
+-- existing view is therefore left exactly as deployed (inspect it with
+-- SELECT pg_get_viewdef('vw_complete_tracking', true)); the definition below
+-- is only created where the view is missing, e.g. a new local or benchmark
+-- database. In it, output frames are numbered on from the play's last input
+-- frame and take the player details from the input rows. Changing the
+-- deployed definition is a behaviour change and belongs in its own
+-- migration.
+
+DO $$
+BEGIN
+    IF to_regclass('vw_complete_tracking') IS NULL THEN
+        CREATE VIEW vw_complete_tracking AS
+        SELECT
+            t.game_id,
+            t.play_id,
+            t.frame_id,
+            t.nfl_id,
+            t.player_name,
+            t.player_position,
+            t.player_side,
+            t.player_role,
+            t.x,
+            t.y,
+            t.s,
+            t.a,
+            t.dir,
+            t.o,
+            'input'::text AS data_source
+        FROM tracking_data t
+        UNION ALL
+        SELECT
+            o.game_id,
+            o.play_id,
+            o.frame_id + f.last_frame AS frame_id,
+            o.nfl_id,
+            p.player_name,
+            p.player_position,
+            p.player_side,
+            p.player_role,
+            o.x,
+            o.y,
+            NULL::double precision AS s,
+            NULL::double precision AS a,
+            NULL::double precision AS dir,
+            NULL::double precision AS o,
+            'output'::text AS data_source
+        FROM output_data o
+        JOIN (
+            SELECT game_id, play_id, MAX(frame_id) AS last_frame
+            FROM tracking_data
+            GROUP BY game_id, play_id
+        ) f ON o.game_id = f.game_id AND o.play_id = f.play_id
+        JOIN (
+            SELECT DISTINCT game_id, play_id, nfl_id, player_name, player_position, player_side, player_role
+            FROM tracking_data
+        ) p ON o.game_id = p.game_id AND o.play_id = p.play_id AND o.nfl_id = p.nfl_id;
+    END IF;
+END
+$$;
@@ -0,0 +1,45 @@
+-- Indexes behind the API queries; `python migrate.py verify` checks that
+-- none of them scans tracking_data sequentially.
+
+-- Play tracking (vw_complete_tracking) in frame order, and the per-play
+-- last-frame / player-details subqueries of the view
+CREATE INDEX IF NOT EXISTS idx_tracking_play_frame
+    ON tracking_data (game_id, play_id, frame_id, nfl_id);
+
+CREATE INDEX IF NOT EXISTS idx_output_play_frame
+    ON output_data (game_id, play_id, nfl_id, frame_id);
+
+-- /play/<game_id>/<play_id>/routes: skill players of one play
+CREATE INDEX IF NOT EXISTS idx_tracking_play_skill_routes
+    ON tracking_data (game_id, play_id, nfl_id, frame_id)
+    INCLUDE (player_name, player_position, x, y)
+    WHERE player_position IN ('WR', 'TE', 'RB', 'FB');
+
+-- /players: distinct players, optionally by position, from the index alone
+CREATE INDEX IF NOT EXISTS idx_tracking_position_player
+    ON tracking_data (player_position, player_name, nfl_id);
+
+-- /analytics/speed-vs-success: receiver speeds per play
+CREATE INDEX IF NOT EXISTS idx_tracking_receiver_speed
+    ON tracking_data (game_id, play_id)
+    INCLUDE (player_name, player_position, s)
+    WHERE player_side = 'Offense'
+        AND player_position IN ('WR', 'TE', 'RB')
+        AND s IS NOT NULL;
+
+-- Week / team filters on the analytics endpoints
+CREATE INDEX IF NOT EXISTS idx_play_info_week
+    ON play_information (week);
+
+CREATE INDEX IF NOT EXISTS idx_play_info_possession_team
+    ON play_information (possession_team, week);
+
+CREATE INDEX IF NOT EXISTS idx_play_info_home_team
+    ON play_information (home_team_abbr, week);
+
+CREATE INDEX IF NOT EXISTS idx_play_info_visitor_team
+    ON play_information (visitor_team_abbr, week);
+
+-- /games
+CREATE INDEX IF NOT EXISTS idx_play_info_season_date
+    ON play_information (season, game_date, game_id);
@@ -0,0 +1,122 @@
+-- Partition tracking_data and output_data by week, step 1 of 3.
+--
+-- Both tables get a week column and become LIST partitioned on it, one
+-- partition per regular-season week (tracking_data_w01 ...) plus a default
+-- partition for anything else. Rows whose week is not known (yet) get week
+-- 0 and land in the default partition, so a loader that does not supply
+-- the week still works; partitions.py assign-weeks (also run by
+-- load_play_info.py) moves them to their week once play_information has the
+-- game. Queries that filter on week only read that week's partition, and
+-- load_output_only.py reloads a week by swapping in a new partition.
+--
+-- Rewriting the live tables in one migration would hold ACCESS EXCLUSIVE
+-- locks on them for the whole copy, so the work is split:
+--
+--   1. this migration creates the empty partitioned tables next to the
+--      live ones (no locks on tracking_data / output_data);
+--   2. python partitions.py backfill copies the rows one week per
+--      transaction while the API keeps reading the old tables;
+--   3. 0005 checks the copies are complete and swaps them in, in one short
+--      transaction.
+
+-- The new tables are built under temporary names, so their constraint and
+-- index names do not clash with the old tables'; 0005 renames them
+CREATE TABLE tracking_data_partitioned (
+    game_id TEXT NOT NULL,
+    play_id INTEGER NOT NULL,
+    player_to_predict BOOLEAN,
+    nfl_id INTEGER NOT NULL,
+    frame_id INTEGER NOT NULL,
+    play_direction TEXT,
+    absolute_yardline_number INTEGER,
+    player_name TEXT,
+    player_height TEXT,
+    player_weight INTEGER,
+    player_birth_date TEXT,
+    player_position TEXT,
+    player_side TEXT,
+    player_role TEXT,
+    x DOUBLE PRECISION,
+    y DOUBLE PRECISION,
+    s DOUBLE PRECISION,
+    a DOUBLE PRECISION,
+    dir DOUBLE PRECISION,
+    o DOUBLE PRECISION,
+    num_frames_output INTEGER,
+    ball_land_x DOUBLE PRECISION,
+    ball_land_y DOUBLE PRECISION,
+    week INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (game_id, play_id, nfl_id, frame_id, week)
+) PARTITION BY LIST (week);
+
+CREATE TABLE tracking_data_w01 PARTITION OF tracking_data_partitioned FOR VALUES IN (1);
+CREATE TABLE tracking_data_w02 PARTITION OF tracking_data_partitioned FOR VALUES IN (2);
+CREATE TABLE tracking_data_w03 PARTITION OF tracking_data_partitioned FOR VALUES IN (3);
+CREATE TABLE tracking_data_w04 PARTITION OF tracking_data_partitioned FOR VALUES IN (4);
+CREATE TABLE tracking_data_w05 PARTITION OF tracking_data_partitioned FOR VALUES IN (5);
+CREATE TABLE tracking_data_w06 PARTITION OF tracking_data_partitioned FOR VALUES IN (6);
+CREATE TABLE tracking_data_w07 PARTITION OF tracking_data_partitioned FOR VALUES IN (7);
+CREATE TABLE tracking_data_w08 PARTITION OF tracking_data_partitioned FOR VALUES IN (8);
+CREATE TABLE tracking_data_w09 PARTITION OF tracking_data_partitioned FOR VALUES IN (9);
+CREATE TABLE tracking_data_w10 PARTITION OF tracking_data_partitioned FOR VALUES IN (10);
+CREATE TABLE tracking_data_w11 PARTITION OF tracking_data_partitioned FOR VALUES IN (11);
+CREATE TABLE tracking_data_w12 PARTITION OF tracking_data_partitioned FOR VALUES IN (12);
+CREATE TABLE tracking_data_w13 PARTITION OF tracking_data_partitioned FOR VALUES IN (13);
+CREATE TABLE tracking_data_w14 PARTITION OF tracking_data_partitioned FOR VALUES IN (14);
+CREATE TABLE tracking_data_w15 PARTITION OF tracking_data_partitioned FOR VALUES IN (15);
+CREATE TABLE tracking_data_w16 PARTITION OF tracking_data_partitioned FOR VALUES IN (16);
+CREATE TABLE tracking_data_w17 PARTITION OF tracking_data_partitioned FOR VALUES IN (17);
+CREATE TABLE tracking_data_w18 PARTITION OF tracking_data_partitioned FOR VALUES IN (18);
+CREATE TABLE tracking_data_default PARTITION OF tracking_data_partitioned DEFAULT;
+
+CREATE TABLE output_data_partitioned (
+    game_id TEXT NOT NULL,
+    play_id INTEGER NOT NULL,
+    nfl_id INTEGER NOT NULL,
+    frame_id INTEGER NOT NULL,
+    x DOUBLE PRECISION,
+    y DOUBLE PRECISION,
+    week INTEGER NOT NULL DEFAULT 0
+) PARTITION BY LIST (week);
+
+CREATE TABLE output_data_w01 PARTITION OF output_data_partitioned FOR VALUES IN (1);
+CREATE TABLE output_data_w02 PARTITION OF output_data_partitioned FOR VALUES IN (2);
+CREATE TABLE output_data_w03 PARTITION OF output_data_partitioned FOR VALUES IN (3);
+CREATE TABLE output_data_w04 PARTITION OF output_data_partitioned FOR VALUES IN (4);
+CREATE TABLE output_data_w05 PARTITION OF output_data_partitioned FOR VALUES IN (5);
+CREATE TABLE output_data_w06 PARTITION OF output_data_partitioned FOR VALUES IN (6);
+CREATE TABLE output_data_w07 PARTITION OF output_data_partitioned FOR VALUES IN (7);
+CREATE TABLE output_data_w08 PARTITION OF output_data_partitioned FOR VALUES IN (8);
+CREATE TABLE output_data_w09 PARTITION OF output_data_partitioned FOR VALUES IN (9);
+CREATE TABLE output_data_w10 PARTITION OF output_data_partitioned FOR VALUES IN (10);
+CREATE TABLE output_data_w11 PARTITION OF output_data_partitioned FOR VALUES IN (11);
+CREATE TABLE output_data_w12 PARTITION OF output_data_partitioned FOR VALUES IN (12);
+CREATE TABLE output_data_w13 PARTITION OF output_data_partitioned FOR VALUES IN (13);
+CREATE TABLE output_data_w14 PARTITION OF output_data_partitioned FOR VALUES IN (14);
+CREATE TABLE output_data_w15 PARTITION OF output_data_partitioned FOR VALUES IN (15);
+CREATE TABLE output_data_w16 PARTITION OF output_data_partitioned FOR VALUES IN (16);
+CREATE TABLE output_data_w17 PARTITION OF output_data_partitioned FOR VALUES IN (17);
+CREATE TABLE output_data_w18 PARTITION OF output_data_partitioned FOR VALUES IN (18);
+CREATE TABLE output_data_default PARTITION OF output_data_partitioned DEFAULT;
+
+-- The index set from 0003, created on every partition as rows are copied
+CREATE INDEX idx_tracking_play_frame_part
+    ON tracking_data_partitioned (game_id, play_id, frame_id, nfl_id);
+
+CREATE INDEX idx_output_play_frame_part
+    ON output_data_partitioned (game_id, play_id, nfl_id, frame_id);
+
+CREATE INDEX idx_tracking_play_skill_routes_part
+    ON tracking_data_partitioned (game_id, play_id, nfl_id, frame_id)
+    INCLUDE (player_name, player_position, x, y)
+    WHERE player_position IN ('WR', 'TE', 'RB', 'FB');
+
+CREATE INDEX idx_tracking_position_player_part
+    ON tracking_data_partitioned (player_position, player_name, nfl_id);
+
+CREATE INDEX idx_tracking_receiver_speed_part
+    ON tracking_data_partitioned (game_id, play_id)
+    INCLUDE (player_name, player_position, s)
+    WHERE player_side = 'Offense'
+        AND player_position IN ('WR', 'TE', 'RB')
+        AND s IS NOT NULL;
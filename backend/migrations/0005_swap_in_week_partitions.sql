@@ -0,0 +1,53 @@
+-- Partition tracking_data and output_data by week, step 3 of 3 (see 0004).
+--
+-- Swaps the partitioned copies in for the live tables. Refuses to run until
+-- python partitions.py backfill has copied every row, so on a database with
+-- data the first `python migrate.py` stops here; run the backfill, then
+-- migrate.py again. The transaction only renames and drops, but it needs
+-- ACCESS EXCLUSIVE locks on both tables: lock_timeout makes it give up
+-- rather than queue every API read behind a long-running query.
+--
+-- vw_complete_tracking depends on the old tables, so it is dropped and
+-- recreated from its own deployed definition (pg_get_viewdef), unchanged.
+
+SET LOCAL lock_timeout = '10s';
+
+-- Block writes (not reads) while the copies are compared
+LOCK TABLE tracking_data, output_data IN EXCLUSIVE MODE;
+
+DO $$
+DECLARE
+    missing_tracking BIGINT;
+    missing_output BIGINT;
+    view_definition TEXT;
+BEGIN
+    SELECT (SELECT count(*) FROM tracking_data) - (SELECT count(*) FROM tracking_data_partitioned)
+        INTO missing_tracking;
+    SELECT (SELECT count(*) FROM output_data) - (SELECT count(*) FROM output_data_partitioned)
+        INTO missing_output;
+    IF missing_tracking <> 0 OR missing_output <> 0 THEN
+        RAISE EXCEPTION 'Week partitions are not backfilled (% tracking_data and % output_data rows differ); run python partitions.py backfill, then migrate.py again',
+            missing_tracking, missing_output;
+    END IF;
+
+    IF to_regclass('vw_complete_tracking') IS NOT NULL THEN
+        view_definition := pg_get_viewdef('vw_complete_tracking'::regclass);
+        DROP VIEW vw_complete_tracking;
+    END IF;
+
+    DROP TABLE tracking_data;
+    DROP TABLE output_data;
+    ALTER TABLE tracking_data_partitioned RENAME TO tracking_data;
+    ALTER TABLE output_data_partitioned RENAME TO output_data;
+    ALTER INDEX tracking_data_partitioned_pkey RENAME TO tracking_data_pkey;
+    ALTER INDEX idx_tracking_play_frame_part RENAME TO idx_tracking_play_frame;
+    ALTER INDEX idx_output_play_frame_part RENAME TO idx_output_play_frame;
+    ALTER INDEX idx_tracking_play_skill_routes_part RENAME TO idx_tracking_play_skill_routes;
+    ALTER INDEX idx_tracking_position_player_part RENAME TO idx_tracking_position_player;
+    ALTER INDEX idx_tracking_receiver_speed_part RENAME TO idx_tracking_receiver_speed;
+
+    IF view_definition IS NOT NULL THEN
+        EXECUTE 'CREATE VIEW vw_complete_tracking AS ' || view_definition;
+    END IF;
+END
+$$;
@@ -0,0 +1,37 @@
+-- Unique (game_id, play_id) on play_information.
+--
+-- load_play_info.py upserts with ON CONFLICT (game_id, play_id), which needs
+-- a unique index on exactly those columns. 0001 declares the primary key,
+-- but it uses IF NOT EXISTS, so a play_information created before the
+-- migration runner may have neither the key nor unique rows. Such tables
+-- keep the last copy of each duplicated play and get a unique index.
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM pg_index i
+        WHERE i.indrelid = 'play_information'::regclass
+            AND i.indisunique
+            AND i.indpred IS NULL
+            AND i.indnkeyatts = 2
+            AND (
+                SELECT array_agg(a.attname::text ORDER BY a.attname)
+                FROM pg_attribute a
+                WHERE a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+            ) = ARRAY['game_id', 'play_id']
+    ) THEN
+        RETURN;
+    END IF;
+
+    LOCK TABLE play_information IN EXCLUSIVE MODE;
+
+    DELETE FROM play_information a
+    USING play_information b
+    WHERE a.game_id = b.game_id
+        AND a.play_id = b.play_id
+        AND a.ctid < b.ctid;
+
+    CREATE UNIQUE INDEX play_information_game_play_key ON play_information (game_id, play_id);
+END
+$$;
@@ -0,0 +1,195 @@
+"""
+Week partitions of tracking_data and output_data.
+
+Moving an existing database onto the partitioned tables (migrations 0004 and
+0005) copies every row, so it is done here in steps rather than in one
+migration transaction:
+
+    python migrate.py               # 0004 creates the empty partitioned tables
+    python partitions.py backfill   # copies the rows, one week per transaction
+    python migrate.py               # 0005 swaps the copies in
+
+The backfill only reads the live tables, so the API keeps serving while it
+runs. It is resumable: weeks whose copy already has as many rows as the live
+table are skipped, and a week that changed since it was copied is copied
+again.
+
+Rows whose week is not known when they are loaded (a tracking loader that
+does not supply it, or a game missing from play_information) get week 0 and
+sit in the default partition. assign-weeks moves them to their week once
+play_information has the game; load_play_info.py runs it after every load.
+
+    python partitions.py assign-weeks
+"""
+import argparse
+import sys
+import time
+import psycopg2
+from psycopg2 import sql
+from config import Config
+from database import bump_data_version
+
+TABLES = ('tracking_data', 'output_data')
+
+# Week of each game; games without one read as week 0
+GAME_WEEKS_QUERY = """
+    SELECT game_id, MAX(COALESCE(week, 0)) AS week
+    FROM play_information
+    GROUP BY game_id
+"""
+
+
+def connect():
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
+
+
+def week_lookup(cursor):
+    """{game_id: week} from play_information"""
+    cursor.execute(GAME_WEEKS_QUERY)
+    return {game_id: week for game_id, week in cursor.fetchall()}
+
+
+def has_week(cursor, table):
+    """Whether table already has the week column (0005 has run)"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'week'
+    """, (table,))
+    return cursor.fetchone() is not None
+
+
+_partitioned = set()
+
+
+def is_partitioned(cursor, table):
+    """
+    has_week, remembered once true (0005 never runs backwards), so code that
+    also has to work before 0005 only pays for the lookup until then
+    """
+    if table not in _partitioned and has_week(cursor, table):
+        _partitioned.add(table)
+    return table in _partitioned
+
+
+def assign_weeks(cursor):
+    """
+    Move week 0 rows whose game now has a week in play_information to that
+    week's partition; returns {table: rows moved}
+    """
+    moved = {}
+    for table in TABLES:
+        if not has_week(cursor, table):
+            continue
+        cursor.execute(sql.SQL("""
+            UPDATE {} t
+            SET week = w.week
+            FROM ({}) w
+            WHERE t.week = 0 AND t.game_id = w.game_id AND w.week <> 0
+        """).format(sql.Identifier(table), sql.SQL(GAME_WEEKS_QUERY)))
+        moved[table] = cursor.rowcount
+    return moved
+
+
+def table_columns(cursor, table):
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def week_source(table, week):
+    """SELECT of the live table's rows for one week, plus its week"""
+    return sql.SQL("""
+        FROM {} t
+        LEFT JOIN ({}) w ON t.game_id = w.game_id
+        WHERE COALESCE(w.week, 0) = {}
+    """).format(sql.Identifier(table), sql.SQL(GAME_WEEKS_QUERY), sql.Literal(week))
+
+
+def backfill_week(cursor, table, week):
+    """
+    Copy one week of table into its partitioned copy unless the copy is
+    already complete; returns the rows copied (0 when skipped)
+    """
+    target = sql.Identifier(f"{table}_partitioned")
+    source = week_source(table, week)
+
+    cursor.execute(sql.SQL("SELECT count(*) {}").format(source))
+    expected = cursor.fetchone()[0]
+    cursor.execute(sql.SQL("SELECT count(*) FROM {} WHERE week = %s").format(target), (week,))
+    if cursor.fetchone()[0] == expected:
+        return 0
+
+    columns = [c for c in table_columns(cursor, table) if c != 'week']
+    column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+    cursor.execute(sql.SQL("DELETE FROM {} WHERE week = %s").format(target), (week,))
+    cursor.execute(sql.SQL("INSERT INTO {} ({}, week) SELECT {}, {} {}").format(
+        target, column_list,
+        sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(c)) for c in columns),
+        sql.Literal(week), source
+    ))
+    return cursor.rowcount
+
+
+def backfill(conn, weeks=None):
+    """Copy the live tables into their partitioned copies, one week per transaction"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regclass('tracking_data_partitioned') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        cursor.close()
+        print("No partitioned copies to fill: apply migration 0004 first, or 0005 has already swapped them in")
+        return False
+
+    if weeks is None:
+        weeks = sorted(set(week_lookup(cursor).values()) | {0})
+    conn.commit()
+
+    for table in TABLES:
+        for week in weeks:
+            start = time.time()
+            rows = backfill_week(cursor, table, week)
+            conn.commit()
+            if rows:
+                print(f"{table} week {week}: copied {rows:,} rows in {time.time() - start:.1f}s")
+            else:
+                print(f"{table} week {week}: up to date")
+    cursor.close()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the week partitions of tracking_data and output_data')
+    parser.add_argument('command', choices=['backfill', 'assign-weeks'])
+    parser.add_argument('--week', type=int, action='append',
+                        help='Backfill only this week (repeatable)')
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.command == 'backfill':
+            if not backfill(conn, args.week):
+                sys.exit(1)
+            print("Backfill complete; run python migrate.py to swap the partitioned tables in")
+        else:
+            cursor = conn.cursor()
+            moved = assign_weeks(cursor)
+            if any(moved.values()):
+                bump_data_version(cursor)
+            conn.commit()
+            cursor.close()
+            for table, rows in moved.items():
+                print(f"{table}: moved {rows:,} rows out of week 0")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
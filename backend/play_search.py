@@ -0,0 +1,287 @@
+"""
+In-memory play search for /plays/search.
+
+Each worker reads play_information once (one row per play, a few thousand
+per season) into a PlayIndex, and again whenever the data_version stamp
+moves. For every filterable column the index keeps one bitmap per value: a
+numpy bool array with one slot per play, in (game_id, play_id) order. A
+search ORs the bitmaps of the values asked for within a column, ANDs the
+columns together, adds the EPA / yards range masks, and pages through the
+set slots with a keyset cursor, so "3rd and long against Cover 3 from
+shotgun" across the season never scans the table.
+
+The cursor is the (game_id, play_id) of the last play on the previous page,
+base64 encoded; the next page starts right after it, so pages stay stable
+when plays are added before the cursor and no OFFSET is ever skipped over.
+"""
+import base64
+import bisect
+import json
+import logging
+import threading
+import numpy as np
+from database import get_data_version, get_db_connection, get_pool
+
+PLAYS_QUERY = """
+    SELECT
+        p.game_id,
+        p.play_id,
+        p.week,
+        p.game_date,
+        p.home_team_abbr,
+        p.visitor_team_abbr,
+        p.play_description,
+        p.quarter,
+        p.game_clock,
+        p.down,
+        p.yards_to_go,
+        p.possession_team,
+        p.defensive_team,
+        p.yardline_side,
+        p.yardline_number,
+        p.pass_result,
+        p.offense_formation,
+        p.route_of_targeted_receiver,
+        p.play_action,
+        p.team_coverage_man_zone,
+        p.team_coverage_type,
+        p.yards_gained,
+        p.expected_points_added
+    FROM play_information p
+    ORDER BY p.game_id, p.play_id
+"""
+
+# Same buckets as the down & distance heatmap (analytics.py)
+DISTANCE_BUCKETS = (
+    ('short', 1, 3),
+    ('medium', 4, 6),
+    ('long', 7, 10),
+    ('very_long', 11, None),
+)
+
+# Query parameter -> (play_information column, parse one value)
+FILTERS = {
+    'down': ('down', int),
+    'quarter': ('quarter', int),
+    'week': ('week', int),
+    'offense': ('possession_team', str.upper),
+    'defense': ('defensive_team', str.upper),
+    'formation': ('offense_formation', str.upper),
+    'coverage': ('team_coverage_type', str.upper),
+    'man_zone': ('team_coverage_man_zone', str.title),
+    'route': ('route_of_targeted_receiver', str.upper),
+    'pass_result': ('pass_result', str.upper),
+}
+
+# Query parameter prefix (min_ / max_) -> numeric column
+RANGES = {
+    'epa': 'expected_points_added',
+    'yards': 'yards_gained',
+}
+
+MAX_LIMIT = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def distance_bucket(yards_to_go):
+    if yards_to_go is None:
+        return None
+    for name, low, high in DISTANCE_BUCKETS:
+        if yards_to_go >= low and (high is None or yards_to_go <= high):
+            return name
+    return None
+
+
+def parse_bool(value):
+    value = value.lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise ValueError("play_action must be true or false")
+
+
+def encode_cursor(game_id, play_id):
+    raw = json.dumps([game_id, play_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(game_id, play_id) from a cursor; raises ValueError if it is not one of ours"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        game_id, play_id = json.loads(raw)
+        if not isinstance(game_id, str) or not isinstance(play_id, int):
+            raise TypeError
+        return game_id, play_id
+    except (ValueError, TypeError):
+        raise ValueError("cursor is not valid")
+
+
+def parse_filters(args):
+    """
+    {'values': {column: [values]}, 'ranges': {column: (low, high)}} from
+    the request arguments; raises ValueError with a message suitable for a
+    400 response
+    """
+    values = {}
+    for param, (column, parse) in FILTERS.items():
+        raw = [v.strip() for v in args.get(param, '').split(',') if v.strip()]
+        if raw:
+            try:
+                values[column] = [parse(v) for v in raw]
+            except ValueError:
+                raise ValueError(f"{param} must be a comma-separated list of numbers")
+
+    team = [v.strip().upper() for v in args.get('team', '').split(',') if v.strip()]
+    if team:
+        values['team'] = team
+
+    distance = [v.strip().lower() for v in args.get('distance', '').split(',') if v.strip()]
+    if distance:
+        names = [name for name, _, _ in DISTANCE_BUCKETS]
+        unknown = [v for v in distance if v not in names]
+        if unknown:
+            raise ValueError(f"distance must be one of {', '.join(names)}")
+        values['distance'] = distance
+
+    if args.get('play_action'):
+        values['play_action'] = [parse_bool(args['play_action'])]
+
+    ranges = {}
+    for param, column in RANGES.items():
+        bounds = []
+        for prefix in ('min_', 'max_'):
+            value = args.get(prefix + param)
+            if value is None or value == '':
+                bounds.append(None)
+                continue
+            try:
+                bounds.append(float(value))
+            except ValueError:
+                raise ValueError(f"{prefix}{param} must be a number")
+        if bounds != [None, None]:
+            ranges[column] = tuple(bounds)
+
+    return {'values': values, 'ranges': ranges}
+
+
+class PlayIndex:
+    """
+    Bitmap indexes over a list of play rows sorted by (game_id, play_id).
+
+    bitmaps[column][value] is a bool array marking the plays with that
+    value; numbers[column] holds a numeric column as floats, NaN for NULL,
+    for range filters.
+    """
+
+    def __init__(self, plays):
+        self.plays = sorted(plays, key=lambda p: (p['game_id'], p['play_id']))
+        self.keys = [(p['game_id'], p['play_id']) for p in self.plays]
+        self.bitmaps = {}
+
+        columns = {column for column, _ in FILTERS.values()} | {'play_action'}
+        for column in columns:
+            self.bitmaps[column] = self._bitmaps([p[column] for p in self.plays])
+        self.bitmaps['distance'] = self._bitmaps([distance_bucket(p['yards_to_go']) for p in self.plays])
+
+        # A team filter matches plays with the team on either side
+        team = {}
+        for column in ('possession_team', 'defensive_team'):
+            for value, bitmap in self.bitmaps[column].items():
+                team[value] = team[value] | bitmap if value in team else bitmap
+        self.bitmaps['team'] = team
+
+        self.numbers = {
+            column: np.array([np.nan if p[column] is None else p[column] for p in self.plays], dtype=np.float64)
+            for column in RANGES.values()
+        }
+
+    def _bitmaps(self, values):
+        by_value = {}
+        for i, value in enumerate(values):
+            if value is not None:
+                by_value.setdefault(value, []).append(i)
+        bitmaps = {}
+        for value, rows in by_value.items():
+            bitmap = np.zeros(len(values), dtype=bool)
+            bitmap[rows] = True
+            bitmaps[value] = bitmap
+        return bitmaps
+
+    def match(self, filters):
+        """Bool array of the plays matching every filter"""
+        mask = np.ones(len(self.plays), dtype=bool)
+        for column, values in filters['values'].items():
+            column_mask = np.zeros(len(self.plays), dtype=bool)
+            for value in values:
+                bitmap = self.bitmaps[column].get(value)
+                if bitmap is not None:
+                    column_mask |= bitmap
+            mask &= column_mask
+
+        for column, (low, high) in filters['ranges'].items():
+            numbers = self.numbers[column]
+            # NaN (NULL) compares False, so plays without a value drop out
+            if low is not None:
+                mask &= numbers >= low
+            if high is not None:
+                mask &= numbers <= high
+        return mask
+
+    def search(self, filters, limit=100, after=None):
+        """(matching plays after the cursor key, up to limit; next cursor or None; total matches)"""
+        mask = self.match(filters)
+        start = bisect.bisect_right(self.keys, after) if after is not None else 0
+        rows = np.flatnonzero(mask[start:])[:limit + 1] + start
+
+        page = [self.plays[i] for i in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_cursor(last['game_id'], last['play_id'])
+        return page, next_cursor, int(mask.sum())
+
+
+def load_plays(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(PLAYS_QUERY)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+_index = {'version': None, 'index': None}
+_index_lock = threading.Lock()
+
+
+def get_index(conn=None):
+    """
+    This worker's PlayIndex, rebuilt when the data version changes. Only
+    takes the request's connection (unless one is given) when the version
+    is due for a re-check or the index has to be rebuilt.
+    """
+    version = get_data_version(conn)
+    if _index['index'] is not None and _index['version'] == version:
+        return _index['index']
+
+    with _index_lock:
+        if _index['index'] is None or _index['version'] != version:
+            _index['index'] = PlayIndex(load_plays(conn or get_db_connection()))
+            _index['version'] = version
+    return _index['index']
+
+
+def preload():
+    """Build the index with a pooled connection before the first request"""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        index = get_index(conn)
+        conn.rollback()
+        logger.info("Indexed %d plays for search", len(index.plays))
+        return index
+    finally:
+        pool.putconn(conn)
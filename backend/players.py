@@ -0,0 +1,171 @@
+"""
+In-memory player lookup for /players and /players/search.
+
+build_derived.py players collapses tracking_data into one row per player in
+the players table. Each worker reads that table (a few thousand rows) into a
+PlayerIndex on first use and again whenever the data_version stamp moves, so
+listing players and matching names as someone types never queries
+tracking_data.
+
+Search matches, in order: names starting with the query, then names with a
+word (usually the last name) starting with it, then, when those leave room
+under the limit, names sharing enough character trigrams with the query to
+survive a typo.
+"""
+import bisect
+import threading
+import unicodedata
+import psycopg2
+from database import get_data_version, get_db_connection
+
+# {} is the table being built (build_derived.py builds players_new and
+# renames it into place)
+PLAYERS_DDL = """
+    CREATE TABLE {} (
+        nfl_id INTEGER PRIMARY KEY,
+        player_name TEXT NOT NULL,
+        player_position TEXT,
+        player_height TEXT,
+        player_weight INTEGER,
+        player_birth_date TEXT,
+        team_abbr TEXT,
+        games INTEGER NOT NULL,
+        plays INTEGER NOT NULL
+    )
+"""
+
+PLAYERS_QUERY = """
+    SELECT nfl_id, player_name, player_position, team_abbr, games, plays
+    FROM players
+"""
+
+# Used until build_derived.py players has run
+TRACKING_PLAYERS_QUERY = """
+    SELECT DISTINCT
+        nfl_id,
+        player_name,
+        player_position
+    FROM tracking_data
+    ORDER BY player_position, player_name
+"""
+
+# Minimum trigram similarity (shared / all trigrams) for a fuzzy match
+FUZZY_THRESHOLD = 0.3
+
+
+def normalize(text):
+    """Lower case, accents and punctuation removed, single spaces"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = ''.join(c if c.isalnum() else ' ' for c in text.lower())
+    return ' '.join(text.split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerIndex:
+    """
+    Sorted name keys over a list of player rows.
+
+    full_keys holds (normalized full name, row index) and word_keys one
+    (word, row index) per later word of each name, both sorted, so a prefix
+    lookup is a bisect plus a scan over the matching run.
+    """
+
+    def __init__(self, players):
+        self.players = sorted(players, key=lambda p: (p['player_position'] or '', p['player_name'] or ''))
+        self.names = [normalize(p['player_name']) for p in self.players]
+        self.full_keys = sorted((name, i) for i, name in enumerate(self.names))
+        self.word_keys = sorted(
+            (word, i) for i, name in enumerate(self.names) for word in name.split()[1:]
+        )
+        # Trigrams of the full name followed by those of each word, so a
+        # single misspelt word is compared with single words
+        self.trigrams = [
+            [trigrams(name)] + [trigrams(word) for word in name.split()] for name in self.names
+        ]
+
+    def all(self, positions=None):
+        if not positions:
+            return self.players
+        return [p for p in self.players if p['player_position'] in positions]
+
+    def _prefix(self, keys, query):
+        start = bisect.bisect_left(keys, (query, -1))
+        for key, i in keys[start:]:
+            if not key.startswith(query):
+                break
+            yield i
+
+    def search(self, query, positions=None, limit=10, fuzzy=True):
+        """[(row, 'prefix' | 'fuzzy', score)] best first"""
+        query = normalize(query)
+        if not query:
+            return []
+
+        def wanted(i):
+            return not positions or self.players[i]['player_position'] in positions
+
+        results = []
+        seen = set()
+        for keys in (self.full_keys, self.word_keys):
+            for i in self._prefix(keys, query):
+                if i not in seen and wanted(i):
+                    seen.add(i)
+                    results.append((self.players[i], 'prefix', 1.0))
+                    if len(results) >= limit:
+                        return results
+
+        if fuzzy and len(query) >= 3:
+            query_grams = trigrams(query)
+            scored = []
+            candidates = self.trigrams if ' ' not in query else [grams[:1] for grams in self.trigrams]
+            for i, name_grams in enumerate(candidates):
+                if i in seen or not wanted(i):
+                    continue
+                score = max(len(query_grams & grams) / len(query_grams | grams) for grams in name_grams)
+                if score >= FUZZY_THRESHOLD:
+                    scored.append((-score, self.names[i], i))
+            scored.sort()
+            for score, _, i in scored[:limit - len(results)]:
+                results.append((self.players[i], 'fuzzy', round(-score, 3)))
+
+        return results
+
+
+def load_players(conn):
+    """Rows of the players table, or of tracking_data if it was not built yet"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(PLAYERS_QUERY)
+        return cursor.fetchall()
+    except psycopg2.ProgrammingError:
+        conn.rollback()
+        cursor.execute(TRACKING_PLAYERS_QUERY)
+        return [{**row, 'team_abbr': None, 'games': None, 'plays': None} for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+_index = {'version': None, 'index': None}
+_index_lock = threading.Lock()
+
+
+def get_index(conn=None):
+    """
+    This worker's PlayerIndex, rebuilt when the data version changes. Only
+    takes the request's connection (unless one is given) when the version
+    is due for a re-check or the index has to be rebuilt.
+    """
+    version = get_data_version(conn)
+    if _index['index'] is not None and _index['version'] == version:
+        return _index['index']
+
+    with _index_lock:
+        if _index['index'] is None or _index['version'] != version:
+            _index['index'] = PlayerIndex(load_players(conn or get_db_connection()))
+            _index['version'] = version
+    return _index['index']
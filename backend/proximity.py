@@ -0,0 +1,182 @@
+"""
+Per-frame player proximity from a uniform grid over the field.
+
+Each frame's players are bucketed into square cells of the field (120 x 53.3
+yards): cell ids are sorted once per frame and each cell's players are found
+with a binary search, so a query only measures distances to players in the
+neighbouring cells rather than to every player on the field. All the work
+for a frame is done on NumPy arrays.
+"""
+import math
+import numpy as np
+
+FIELD_LENGTH = 120.0
+FIELD_WIDTH = 53.3
+
+# Radii /proximity accepts (yards)
+MIN_RADIUS = 0.5
+MAX_RADIUS = 20.0
+
+# Cell size of the nearest-opponent grid. It must not follow the radius:
+# nearest() widens its ring of cells until it reaches an opponent, so tiny
+# cells would make it visit thousands of them
+NEAREST_CELL_SIZE = 5.0
+
+
+class FieldGrid:
+    """Uniform grid index over one frame's points"""
+
+    def __init__(self, x, y, cell_size):
+        self.cell_size = cell_size
+        self.nx = int(math.ceil(FIELD_LENGTH / cell_size))
+        self.ny = int(math.ceil(FIELD_WIDTH / cell_size))
+        self.x = x
+        self.y = y
+
+        cx, cy = self._cells(x, y)
+        cell_ids = cx * self.ny + cy
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.sorted_ids = cell_ids[self.order]
+
+    def _cells(self, x, y):
+        # Players slightly out of bounds are kept in the edge cells
+        cx = np.clip((x // self.cell_size).astype(np.int64), 0, self.nx - 1)
+        cy = np.clip((y // self.cell_size).astype(np.int64), 0, self.ny - 1)
+        return cx, cy
+
+    def candidates(self, qx, qy, rings):
+        """
+        (query, point) index pairs for every point in the cells within
+        `rings` cells of each query point's cell.
+        """
+        cx, cy = self._cells(qx, qy)
+        offsets = np.arange(-rings, rings + 1)
+        ox, oy = np.meshgrid(offsets, offsets, indexing='ij')
+        nbx = cx[:, None] + ox.ravel()[None, :]
+        nby = cy[:, None] + oy.ravel()[None, :]
+        valid = (nbx >= 0) & (nbx < self.nx) & (nby >= 0) & (nby < self.ny)
+        cell_ids = np.where(valid, nbx * self.ny + nby, -1)
+
+        starts = np.searchsorted(self.sorted_ids, cell_ids, side='left')
+        ends = np.searchsorted(self.sorted_ids, cell_ids, side='right')
+        counts = np.where(valid, ends - starts, 0).ravel()
+
+        # Expand each (query, cell) range into one pair per point in the cell
+        queries = np.repeat(np.repeat(np.arange(len(qx)), cell_ids.shape[1]), counts)
+        first = np.repeat(starts.ravel(), counts)
+        step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        points = self.order[first + step]
+        return queries, points
+
+    def within(self, qx, qy, radius):
+        """(query, point, distance) for every point within radius of a query"""
+        queries, points = self.candidates(qx, qy, int(math.ceil(radius / self.cell_size)))
+        dist = np.hypot(self.x[points] - qx[queries], self.y[points] - qy[queries])
+        keep = dist <= radius
+        return queries[keep], points[keep], dist[keep]
+
+    def nearest(self, qx, qy):
+        """
+        Index of and distance to the closest point for each query.
+
+        Searches one ring of cells around each query and widens the ring for
+        queries whose best match could still be beaten by a point outside it.
+        """
+        n = len(qx)
+        best = np.full(n, -1)
+        best_dist = np.full(n, np.inf)
+        if not len(self.x):
+            return best, best_dist
+
+        pending = np.arange(n)
+        rings = 1
+        max_rings = max(self.nx, self.ny)
+        while len(pending):
+            queries, points = self.candidates(qx[pending], qy[pending], rings)
+            dist = np.hypot(self.x[points] - qx[pending][queries], self.y[points] - qy[pending][queries])
+
+            # Closest candidate per query: sort by (query, distance), take the first
+            order = np.lexsort((dist, queries))
+            queries, points, dist = queries[order], points[order], dist[order]
+            first = np.ones(len(queries), dtype=bool)
+            first[1:] = queries[1:] != queries[:-1]
+            found = pending[queries[first]]
+            best[found] = points[first]
+            best_dist[found] = dist[first]
+
+            # Any point outside the searched block is at least rings * cell_size away
+            if rings >= max_rings:
+                break
+            pending = pending[best_dist[pending] > rings * self.cell_size]
+            rings *= 2
+        return best, best_dist
+
+
+def frame_proximity(nfl_ids, sides, x, y, radius):
+    """
+    Nearest opponent and players within radius for one frame.
+
+    Returns one dict per player, in input order.
+    """
+    grid = FieldGrid(x, y, radius)
+    queries, points, _ = grid.within(x, y, radius)
+    nearby = [[] for _ in nfl_ids]
+    for q, p in zip(queries.tolist(), points.tolist()):
+        if q != p:
+            nearby[q].append(nfl_ids[p])
+
+    nearest_id = [None] * len(nfl_ids)
+    nearest_dist = [None] * len(nfl_ids)
+    for side in np.unique(sides):
+        own = np.flatnonzero(sides == side)
+        opponents = np.flatnonzero(sides != side)
+        if not len(opponents):
+            continue
+        opponent_grid = FieldGrid(x[opponents], y[opponents], NEAREST_CELL_SIZE)
+        idx, dist = opponent_grid.nearest(x[own], y[own])
+        for i, j, d in zip(own.tolist(), idx.tolist(), dist.tolist()):
+            nearest_id[i] = nfl_ids[opponents[j]]
+            nearest_dist[i] = round(d, 2)
+
+    return [
+        {
+            'nfl_id': nfl_ids[i],
+            'nearest_opponent': nearest_id[i],
+            'distance': nearest_dist[i],
+            'within_radius': nearby[i]
+        }
+        for i in range(len(nfl_ids))
+    ]
+
+
+def play_proximity(tracking, radius):
+    """
+    Proximity for every frame of a play from its tracking rows (as read by
+    fetch_play_tracking, ordered by frame). Rows without a position or side
+    are skipped.
+    """
+    frames = []
+    rows = [
+        row for row in tracking
+        if row['x'] is not None and row['y'] is not None and row['player_side'] is not None
+    ]
+    for frame_id, start, end in _frame_bounds(rows):
+        chunk = rows[start:end]
+        nfl_ids = [row['nfl_id'] for row in chunk]
+        sides = np.asarray([row['player_side'] for row in chunk], dtype=object)
+        x = np.asarray([row['x'] for row in chunk], dtype=np.float64)
+        y = np.asarray([row['y'] for row in chunk], dtype=np.float64)
+        frames.append({
+            'frame_id': frame_id,
+            'players': frame_proximity(nfl_ids, sides, x, y, radius)
+        })
+    return frames
+
+
+def _frame_bounds(rows):
+    """(frame_id, start, end) slices of rows grouped by consecutive frame_id"""
+    start = 0
+    for i in range(1, len(rows) + 1):
+        if i == len(rows) or rows[i]['frame_id'] != rows[start]['frame_id']:
+            yield rows[start]['frame_id'], start, i
+            start = i
@@ -1,48 +1,134 @@
-from flask import Blueprint, jsonify, request
-from database import get_db_connection
+from flask import Blueprint, Response, jsonify, request
+from config import Config
+from database import get_db_connection, get_data_version, pool_stats, stream_query
+from streaming import stream_rows, wants_ndjson
+from cache import LRUCache
+import tracking_format
+import tracking_query
+import tracking_blobs
+import column_store
+import gzip
+import proximity
+import downsample
+import numpy as np
+import analytics
+import metrics
+import http_cache
+import players
+import dimensions
+import play_search
 
 api = Blueprint('api', __name__)
+http_cache.init_blueprint(api)
 
-@api.route('/games', methods=['GET'])
-def get_games():
-    """Get list of all unique games with team names - 2023 season only"""
+# Assembled /play/<game_id>/<play_id>/tracking payloads, keyed by (game_id, play_id)
+tracking_cache = LRUCache(Config.TRACKING_CACHE_MAX_BYTES)
+
+# Pre-built compressed tracking responses, keyed by (game_id, play_id, format)
+blob_cache = LRUCache(Config.TRACKING_BLOB_CACHE_MAX_BYTES, sizeof=lambda blob: len(blob[0]))
+
+# /play/<game_id>/<play_id>/proximity results, keyed by (game_id, play_id, radius)
+proximity_cache = LRUCache(Config.PROXIMITY_CACHE_MAX_BYTES)
+
+@api.route('/health', methods=['GET'])
+def get_health():
+    """Service status, database connectivity and connection pool stats"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT DISTINCT 
-                p.game_id,
-                p.home_team_abbr,
-                p.visitor_team_abbr,
-                p.week,
-                p.game_date
-            FROM play_information p
-            WHERE p.season = 2023
-            ORDER BY p.game_date, p.game_id
-        """)
-        
-        games = cursor.fetchall()
+        cursor.execute("SELECT 1")
         cursor.close()
-        conn.close()
         
-        return jsonify(games), 200
+        return jsonify({
+            'status': 'ok',
+            'database': 'ok',
+            'pool': pool_stats(),
+            'caches': cache_stats()
+        }), 200
         
+    except Exception as e:
+        return jsonify({'status': 'error', 'database': str(e), 'pool': pool_stats()}), 503
+
+
+def cache_stats():
+    return {
+        'tracking': tracking_cache.stats(),
+        'tracking_blobs': blob_cache.stats(),
+        'proximity': proximity_cache.stats(),
+        'analytics': analytics.cache_stats()
+    }
+
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, SQL and payload metrics of this worker in Prometheus text format"""
+    gauges = []
+
+    pool = pool_stats()
+    if pool is not None:
+        gauges.append(('api_db_pool_connections', 'Pooled database connections by state', [
+            ({'state': state}, pool[state]) for state in ('idle', 'in_use', 'waiting')
+        ]))
+
+    caches = {name: stats for name, stats in cache_stats().items() if stats is not None}
+    for field in ('entries', 'bytes', 'hits', 'misses'):
+        gauges.append((f'api_cache_{field}', f'Response cache {field}', [
+            ({'cache': name}, stats[field]) for name, stats in sorted(caches.items())
+        ]))
+
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+
+@api.route('/metrics/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Most recent statements slower than SLOW_QUERY_MS, with their plans"""
+    return jsonify(metrics.recent_slow_queries()), 200
+
+
+@api.route('/meta', methods=['GET'])
+def get_meta():
+    """
+    Everything the frontend needs to start in one response: games, teams,
+    weeks, formations, coverage types and targeted routes
+    Served from the worker's in-memory dimension snapshot
+    """
+    try:
+        snapshot = dimensions.get_snapshot()
+        return jsonify(snapshot.as_dict()), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/games', methods=['GET'])
+def get_games():
+    """
+    Get list of all unique games with team names - 2023 season only
+    Served from the worker's in-memory dimension snapshot
+    """
+    try:
+        snapshot = dimensions.get_snapshot()
+        return jsonify(snapshot.games), 200
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @api.route('/plays', methods=['GET'])
 def get_plays():
-    """Get all plays with complete play information"""
+    """
+    Get all plays with complete play information
+    Ball landing spots come from the play_summary table (see build_derived.py)
+    Rows are streamed from a server-side cursor; ?format=ndjson (or an
+    application/x-ndjson Accept header) sends one JSON object per line
+    """
     try:
         game_id = request.args.get('game_id')
         
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         if game_id:
-            cursor.execute("""
+            rows = stream_query(conn, """
                 SELECT 
                     p.game_id,
                     p.play_id,
@@ -75,25 +161,15 @@ def get_plays():
                     p.expected_points_added,
                     p.pre_snap_home_team_win_probability,
                     p.pre_snap_visitor_team_win_probability,
-                    MAX(t.ball_land_x) as ball_land_x,
-                    MAX(t.ball_land_y) as ball_land_y
+                    s.ball_land_x,
+                    s.ball_land_y
                 FROM play_information p
-                LEFT JOIN tracking_data t ON p.game_id = t.game_id AND p.play_id = t.play_id
+                LEFT JOIN play_summary s ON p.game_id = s.game_id AND p.play_id = s.play_id
                 WHERE p.game_id = %s
-                GROUP BY p.game_id, p.play_id, p.season, p.week, p.game_date, 
-                         p.home_team_abbr, p.visitor_team_abbr, p.play_description,
-                         p.quarter, p.game_clock, p.down, p.yards_to_go, 
-                         p.possession_team, p.defensive_team, p.yardline_side,
-                         p.yardline_number, p.pre_snap_home_score, p.pre_snap_visitor_score,
-                         p.pass_result, p.pass_length, p.offense_formation,
-                         p.receiver_alignment, p.route_of_targeted_receiver, p.play_action,
-                         p.team_coverage_man_zone, p.team_coverage_type, p.defenders_in_the_box,
-                         p.yards_gained, p.expected_points_added, 
-                         p.pre_snap_home_team_win_probability, p.pre_snap_visitor_team_win_probability
                 ORDER BY p.play_id
             """, (game_id,))
         else:
-            cursor.execute("""
+            rows = stream_query(conn, """
                 SELECT 
                     p.game_id,
                     p.play_id,
@@ -120,72 +196,308 @@ def get_plays():
                 LIMIT 100
             """)
         
-        plays = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return jsonify(plays), 200
+        return stream_rows(rows, wants_ndjson(request)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@api.route('/plays/search', methods=['GET'])
+def search_plays():
+    """
+    Plays matching every given filter, across the season, in (game_id,
+    play_id) order
+    Served from the worker's in-memory bitmap indexes (see play_search.py)
+    Query parameters (comma-separated lists match any of their values):
+    - down, quarter, week
+    - distance: short (1-3), medium (4-6), long (7-10), very_long (11+)
+    - team (either side), offense, defense
+    - formation, coverage, man_zone, route, pass_result
+    - play_action: true or false
+    - min_epa, max_epa, min_yards, max_yards
+    - limit: plays per page (default 100, at most 1000)
+    - cursor: next_cursor from the previous page
+    """
+    try:
+        try:
+            filters = play_search.parse_filters(request.args)
+            limit = min(positive_arg('limit', int, 100), play_search.MAX_LIMIT)
+            cursor = request.args.get('cursor')
+            after = play_search.decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        index = play_search.get_index()
+        plays, next_cursor, total = index.search(filters, limit, after)
+
+        return jsonify({
+            'plays': plays,
+            'total': total,
+            'next_cursor': next_cursor
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def tracking_store(game_id, play_id):
+    """
+    The column store when it is the configured tracking backend and holds
+    the play; None means read from Postgres
+    """
+    if Config.TRACKING_BACKEND != 'column_store':
+        return None
+    store = column_store.get_store()
+    if store is None or store.play_range(game_id, play_id) is None:
+        return None
+    return store
+
+
+def fetch_play_tracking(game_id, play_id, filters=None):
+    """
+    Load one play's tracking payload in a single query.
+
+    The player list and frame count are taken from the same ordered result
+    set (see tracking_format.play_payload) instead of a second DISTINCT
+    query. filters (see tracking_query) narrow the rows and columns in SQL;
+    total_frames is then the last frame returned. Returns None if no
+    tracking rows match. Plays in the column store backend are read from
+    it instead.
+    """
+    store = tracking_store(game_id, play_id)
+    if store is not None:
+        columns = tracking_query.select_columns(filters or {})
+        tracking_data = store.play_rows(game_id, play_id, filters, columns)
+        return tracking_format.play_payload(game_id, play_id, tracking_data) if tracking_data else None
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(*tracking_query.build_query(game_id, play_id, filters))
+    
+    tracking_data = cursor.fetchall()
+    cursor.close()
+    
+    if not tracking_data:
+        return None
+    
+    return tracking_format.play_payload(game_id, play_id, tracking_data)
+
+
+def get_play_payload(game_id, play_id):
+    """
+    fetch_play_tracking through the per-play cache.
+
+    Repeat views of a play are served from memory; the cache is cleared
+    whenever a loader bumps the data version.
+    """
+    tracking_cache.validate(get_data_version())
+    cache_key = (game_id, play_id)
+    response = tracking_cache.get(cache_key)
+    
+    if response is None:
+        response = fetch_play_tracking(game_id, play_id)
+        if response is not None:
+            tracking_cache.put(cache_key, response)
+    
+    return response
+
+
+def get_tracking_blob(game_id, play_id, fmt):
+    """Stored response for a play (see tracking_blobs), through blob_cache"""
+    blob_cache.validate(get_data_version())
+    cache_key = (game_id, play_id, fmt)
+    blob = blob_cache.get(cache_key)
+    
+    if blob is None:
+        blob = tracking_blobs.get_blob(get_db_connection(), game_id, play_id, fmt)
+        if blob is not None:
+            blob_cache.put(cache_key, blob)
+    
+    return blob
+
+
+def send_blob(blob):
+    """
+    Send stored gzip bytes untouched to clients that accept gzip, and
+    decompressed to the rest
+    """
+    body, mimetype, content_encoding, content_hash = blob
+    if request.accept_encodings[content_encoding]:
+        response = Response(body, mimetype=mimetype)
+        response.headers['Content-Encoding'] = content_encoding
+        response.set_etag(f"{content_hash}-{content_encoding}")
+    else:
+        response = Response(gzip.decompress(body), mimetype=mimetype)
+        response.set_etag(content_hash)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def _prepend(first, rows):
+    """Yield first and then rows, closing rows when done or abandoned"""
+    try:
+        yield first
+        yield from rows
+    finally:
+        rows.close()
+
+
+def stream_play_tracking(game_id, play_id, step=1, filters=None):
+    """NDJSON tracking rows, from the play cache or a server-side cursor"""
+    if not filters:
+        tracking_cache.validate(get_data_version())
+        cached = tracking_cache.get((game_id, play_id))
+        if cached is not None:
+            return stream_rows(downsample.every_nth_frame(cached['tracking'], step), ndjson=True), 200
+    
+    store = tracking_store(game_id, play_id)
+    if store is not None:
+        columns = tracking_query.select_columns(filters or {})
+        rows = store.play_rows(game_id, play_id, filters, columns)
+        if not rows:
+            return jsonify({'error': 'Play not found'}), 404
+        return stream_rows(downsample.every_nth_frame(rows, step), ndjson=True), 200
+    
+    query, params = tracking_query.build_query(game_id, play_id, filters)
+    rows = stream_query(get_db_connection(), query, params)
+    first = next(rows, None)
+    if first is None:
+        rows.close()
+        return jsonify({'error': 'Play not found'}), 404
+    
+    rows = _prepend(first, rows)
+    if step > 1:
+        rows = downsample.every_nth_frame(rows, step)
+    return stream_rows(rows, ndjson=True), 200
+
+
+def positive_arg(name, cast, default):
+    """
+    Read a positive numeric query parameter; raises ValueError with a
+    message suitable for a 400 response
+    """
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if value <= 0:
+        raise ValueError(f"{name} must be greater than 0")
+    return value
+
+
 @api.route('/play/<string:game_id>/<int:play_id>/tracking', methods=['GET'])
 def get_play_tracking(game_id, play_id):
-    """Get all tracking data for a specific play including output continuation"""
+    """
+    Get all tracking data for a specific play including output continuation
+    Optional query parameters:
+    - format: 'json' (default, one object per frame/player row), 'columnar',
+      'msgpack' or 'arrow' (see tracking_format), or 'ndjson' to stream just
+      the tracking rows one per line; the Accept header is used when no
+      format is given
+    - fps: down-sample to this frame rate (source data is 10 fps) by keeping
+      every n-th frame
+    - from_frame, to_frame: inclusive frame window
+    - nfl_ids: comma-separated player ids
+    - side: 'Offense' or 'Defense'
+    - position: comma-separated positions, e.g. WR,TE
+    - fields: comma-separated columns to return besides frame_id and nfl_id,
+      e.g. x,y,s
+    Filtered requests are answered by a narrowed query instead of the
+    per-play cache.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        try:
+            fps = positive_arg('fps', float, downsample.TRACKING_FPS)
+            filters = tracking_query.parse_filters(request.args)
+            fmt = None if wants_ndjson(request) else tracking_format.negotiate_format(request)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        step = downsample.frame_step(fps)
+        
+        if wants_ndjson(request):
+            return stream_play_tracking(game_id, play_id, step, filters)
+        
+        # Whole-play requests are answered from the pre-built blobs when
+        # build_derived.py tracking_blobs has run
+        if not filters and step == 1 and Config.TRACKING_BLOBS:
+            blob = get_tracking_blob(game_id, play_id, fmt or 'json')
+            if blob is not None:
+                return send_blob(blob), 200
+        
+        # Binary formats are encoded straight from the column store's arrays
+        store = tracking_store(game_id, play_id)
+        if fmt and store is not None and not filters and step == 1:
+            columns = store.play_columns(game_id, play_id)
+            body, mimetype = tracking_format.encode_columns(
+                fmt, game_id, play_id, columns, int(columns['frames'][-1])
+            )
+            return Response(body, mimetype=mimetype), 200
         
-        cursor.execute("""
-            SELECT 
-                frame_id,
-                nfl_id,
-                player_name,
-                player_position,
-                player_side,
-                player_role,
-                x,
-                y,
-                s,
-                a,
-                dir,
-                o,
-                data_source
-            FROM vw_complete_tracking
-            WHERE game_id = %s AND play_id = %s
-            ORDER BY frame_id, nfl_id
-        """, (game_id, play_id))
-        
-        tracking_data = cursor.fetchall()
-        
-        if not tracking_data:
-            cursor.close()
-            conn.close()
+        if filters:
+            response = fetch_play_tracking(game_id, play_id, filters)
+        else:
+            response = get_play_payload(game_id, play_id)
+        if response is None:
             return jsonify({'error': 'Play not found'}), 404
         
-        cursor.execute("""
-            SELECT DISTINCT
-                nfl_id,
-                player_name,
-                player_position,
-                player_side
-            FROM vw_complete_tracking
-            WHERE game_id = %s AND play_id = %s
-        """, (game_id, play_id))
+        tracking_data = response['tracking']
+        total_frames = response['total_frames']
         
-        players = cursor.fetchall()
+        if step > 1:
+            tracking_data = list(downsample.every_nth_frame(tracking_data, step))
+            response = dict(response, tracking=tracking_data, frame_step=step)
         
-        cursor.close()
-        conn.close()
+        if fmt:
+            body, mimetype = tracking_format.encode_tracking(
+                fmt, game_id, play_id, tracking_data, total_frames,
+                fields=filters.get('fields')
+            )
+            return Response(body, mimetype=mimetype), 200
         
-        response = {
-            'game_id': game_id,
-            'play_id': play_id,
-            'players': players,
-            'tracking': tracking_data,
-            'total_frames': max([t['frame_id'] for t in tracking_data]) if tracking_data else 0
-        }
+        return jsonify(response), 200
+        
+    except tracking_format.FormatNotAvailable as e:
+        return jsonify({'error': str(e)}), 406
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/play/<string:game_id>/<int:play_id>/proximity', methods=['GET'])
+def get_play_proximity(game_id, play_id):
+    """
+    For every frame, each player's nearest opponent and the distance to
+    them, plus the players within a radius (yards)
+    Optional query parameters:
+    - radius: search radius in yards (default PROXIMITY_RADIUS, 0.5 to 20)
+    """
+    try:
+        try:
+            radius = float(request.args.get('radius', Config.PROXIMITY_RADIUS))
+        except ValueError:
+            return jsonify({'error': 'radius must be a number'}), 400
+        if not proximity.MIN_RADIUS <= radius <= proximity.MAX_RADIUS:
+            return jsonify({'error': f'radius must be between {proximity.MIN_RADIUS:g} and '
+                                     f'{proximity.MAX_RADIUS:g} yards'}), 400
+        
+        proximity_cache.validate(get_data_version())
+        cache_key = (game_id, play_id, radius)
+        response = proximity_cache.get(cache_key)
+        
+        if response is None:
+            play = get_play_payload(game_id, play_id)
+            if play is None:
+                return jsonify({'error': 'Play not found'}), 404
+            response = {
+                'game_id': game_id,
+                'play_id': play_id,
+                'radius': radius,
+                'frames': proximity.play_proximity(play['tracking'], radius)
+            }
+            proximity_cache.put(cache_key, response)
         
         return jsonify(response), 200
         
@@ -193,51 +505,88 @@ def get_play_tracking(game_id, play_id):
         return jsonify({'error': str(e)}), 500
 
 
+ROUTE_POSITIONS = ('WR', 'TE', 'RB', 'FB')
+
+
+ROUTE_POINTS_QUERY = """
+    SELECT 
+        nfl_id,
+        player_name,
+        player_position,
+        frame_id,
+        x,
+        y
+    FROM tracking_data
+    WHERE game_id = %s 
+        AND play_id = %s 
+        AND player_position IN ('WR', 'TE', 'RB', 'FB')
+    ORDER BY nfl_id, frame_id
+"""
+
+
+def fetch_route_points(game_id, play_id):
+    """
+    Skill players' input-frame positions from tracking_data, ordered by
+    (nfl_id, frame_id): (nfl_ids, points (n, 2), names, positions)
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(ROUTE_POINTS_QUERY, (game_id, play_id))
+    
+    route_data = cursor.fetchall()
+    cursor.close()
+    
+    nfl_ids = np.array([row['nfl_id'] for row in route_data], dtype=np.int64)
+    points = np.array([(row['x'], row['y']) for row in route_data], dtype=np.float64).reshape(-1, 2)
+    names = [row['player_name'] for row in route_data]
+    positions = [row['player_position'] for row in route_data]
+    return nfl_ids, points, names, positions
+
+
 @api.route('/play/<string:game_id>/<int:play_id>/routes', methods=['GET'])
 def get_play_routes(game_id, play_id):
-    """Get route lines for skill position players"""
+    """
+    Get route lines for skill position players
+    Optional query parameters:
+    - stride: keep every n-th tracking point (the last point is always kept)
+    - tolerance: Ramer-Douglas-Peucker simplification tolerance in yards
+    Each route reports how many of its original points were dropped.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                nfl_id,
-                player_name,
-                player_position,
-                frame_id,
-                x,
-                y
-            FROM tracking_data
-            WHERE game_id = %s 
-                AND play_id = %s 
-                AND player_position IN ('WR', 'TE', 'RB', 'FB')
-            ORDER BY nfl_id, frame_id
-        """, (game_id, play_id))
-        
-        route_data = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        if not route_data:
-            return jsonify({'error': 'No routes found for this play'}), 404
-        
-        routes = {}
-        for row in route_data:
-            nfl_id = row['nfl_id']
-            if nfl_id not in routes:
-                routes[nfl_id] = {
-                    'nfl_id': nfl_id,
-                    'player_name': row['player_name'],
-                    'player_position': row['player_position'],
-                    'route': []
-                }
-            routes[nfl_id]['route'].append({
-                'x': float(row['x']),
-                'y': float(row['y'])
+        try:
+            stride = positive_arg('stride', int, 1)
+            tolerance = positive_arg('tolerance', float, 0)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        store = tracking_store(game_id, play_id)
+        if store is not None:
+            route_data = store.route_arrays(game_id, play_id, ROUTE_POSITIONS)
+            if route_data is None:
+                return jsonify({'error': 'No routes found for this play'}), 404
+            nfl_ids, points, names, positions = route_data
+        else:
+            nfl_ids, points, names, positions = fetch_route_points(game_id, play_id)
+            if not len(nfl_ids):
+                return jsonify({'error': 'No routes found for this play'}), 404
+        
+        # Rows are ordered by player, so each route is one contiguous slice
+        starts = np.flatnonzero(np.r_[True, nfl_ids[1:] != nfl_ids[:-1]])
+        ends = np.r_[starts[1:], len(nfl_ids)]
+        
+        routes = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            route = downsample.simplify_route(points[start:end], tolerance, stride)
+            routes.append({
+                'nfl_id': int(nfl_ids[start]),
+                'player_name': names[start],
+                'player_position': positions[start],
+                'route': [{'x': x, 'y': y} for x, y in route.tolist()],
+                'points_dropped': (end - start) - len(route)
             })
         
-        return jsonify(list(routes.values())), 200
+        return jsonify(routes), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -245,39 +594,53 @@ def get_play_routes(game_id, play_id):
 
 @api.route('/players', methods=['GET'])
 def get_players():
-    """Get list of all players, optionally filtered by position"""
+    """
+    Get list of all players, optionally filtered by position (comma-separated)
+    Served from the worker's in-memory player index; ?format=ndjson (or an
+    application/x-ndjson Accept header) sends one JSON object per line
+    """
     try:
-        position = request.args.get('position')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if position:
-            cursor.execute("""
-                SELECT DISTINCT
-                    nfl_id,
-                    player_name,
-                    player_position
-                FROM tracking_data
-                WHERE player_position = %s
-                ORDER BY player_name
-            """, (position,))
-        else:
-            cursor.execute("""
-                SELECT DISTINCT
-                    nfl_id,
-                    player_name,
-                    player_position
-                FROM tracking_data
-                ORDER BY player_position, player_name
-            """)
-        
-        players = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return jsonify(players), 200
-        
+        index = players.get_index()
+        positions = [p.strip().upper() for p in request.args.get('position', '').split(',') if p.strip()]
+        rows = index.all(positions)
+
+        if wants_ndjson(request):
+            return stream_rows(iter(rows), ndjson=True), 200
+        return jsonify(rows), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/players/search', methods=['GET'])
+def search_players():
+    """
+    Players whose name matches a typed prefix, as you type
+    Query parameters:
+    - q: the text typed so far (required)
+    - position: comma-separated positions to keep
+    - limit: results to return (default 10, at most 50)
+    - fuzzy: 'false' to return prefix matches only
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        try:
+            limit = positive_arg('limit', int, 10)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        limit = min(limit, 50)
+        positions = [p.strip().upper() for p in request.args.get('position', '').split(',') if p.strip()]
+        fuzzy = request.args.get('fuzzy', 'true').lower() != 'false'
+
+        index = players.get_index()
+        matches = index.search(query, positions, limit, fuzzy)
+
+        return jsonify([
+            {**player, 'match': match, 'score': score} for player, match, score in matches
+        ]), 200
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -288,30 +651,39 @@ def get_players():
 
 @api.route('/analytics/teams', methods=['GET'])
 def get_teams():
-    """Get list of all teams for filtering"""
+    """Get list of all teams for filtering, from the in-memory dimension snapshot"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        snapshot = dimensions.get_snapshot()
+        return jsonify(snapshot.teams), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/analytics/dashboard', methods=['GET'])
+def get_dashboard():
+    """
+    Get several analytics sections in one request, queried concurrently
+    Optional query parameters:
+    - sections: comma-separated endpoint names (default: speed-stats,
+      route-analysis, down-distance-heatmap, formation-matchup)
+    - side, position_group, week, team: shared filters, applied to every
+      section that supports them
+    Each section reports its data, error and elapsed_ms separately
+    """
+    try:
+        sections = request.args.get('sections')
+        if sections:
+            sections = [name.strip() for name in sections.split(',') if name.strip()]
+        else:
+            sections = analytics.DASHBOARD_SECTIONS
         
-        cursor.execute("""
-            SELECT DISTINCT team_abbr, team_abbr as team_name
-            FROM (
-                SELECT DISTINCT home_team_abbr as team_abbr
-                FROM play_information
-                WHERE home_team_abbr IS NOT NULL
-                UNION
-                SELECT DISTINCT visitor_team_abbr as team_abbr
-                FROM play_information
-                WHERE visitor_team_abbr IS NOT NULL
-            ) teams
-            ORDER BY team_abbr
-        """)
-        
-        teams = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        try:
+            dashboard = analytics.run_dashboard(request.args, sections)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify(teams), 200
+        return jsonify(dashboard), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -328,66 +700,7 @@ def get_speed_stats():
     - team: filter by team abbreviation (e.g., 'SF', 'KC')
     """
     try:
-        side = request.args.get('side')
-        position_group = request.args.get('position_group')
-        week = request.args.get('week')
-        team = request.args.get('team')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Build the SQL query (convert yards/sec to mph: multiply by 2.04545)
-        query = """
-            SELECT 
-                t.player_position as position,
-                COUNT(*) as num_frames,
-                ROUND((AVG(t.s) * 2.04545)::numeric, 2) as avg_speed,
-                ROUND((MAX(t.s) * 2.04545)::numeric, 2) as max_speed,
-                ROUND((MIN(t.s) * 2.04545)::numeric, 2) as min_speed,
-                ROUND((STDDEV(t.s) * 2.04545)::numeric, 2) as speed_stddev
-            FROM tracking_data t
-        """
-        
-        where_clauses = ["t.s IS NOT NULL"]
-        params = []
-        
-        # Add join if filtering by week or team
-        if week or team:
-            query += " JOIN play_information p ON t.game_id = p.game_id AND t.play_id = p.play_id"
-            if week:
-                where_clauses.append("p.week = %s")
-                params.append(int(week))
-            if team:
-                where_clauses.append("(p.home_team_abbr = %s OR p.visitor_team_abbr = %s)")
-                params.append(team)
-                params.append(team)
-        
-        # Add side filter (which side they lined up on)
-        if side:
-            where_clauses.append("LOWER(t.player_side) = LOWER(%s)")
-            params.append(side)
-        
-        # Add position group filter (by position type)
-        if position_group:
-            if position_group.lower() == 'offense':
-                where_clauses.append("t.player_position IN ('QB', 'RB', 'FB', 'WR', 'TE')")
-            elif position_group.lower() == 'defense':
-                where_clauses.append("t.player_position IN ('CB', 'S', 'SS', 'FS', 'LB', 'ILB', 'OLB', 'MLB', 'DE', 'DT', 'NT', 'DL')")
-        
-        # Add WHERE clause
-        query += " WHERE " + " AND ".join(where_clauses)
-        
-        # Group and order
-        query += """
-            GROUP BY t.player_position
-            ORDER BY avg_speed DESC
-        """
-        
-        cursor.execute(query, params)
-        stats = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stats = analytics.cached_query('speed-stats', request.args)
         
         return jsonify(stats), 200
         
@@ -404,47 +717,7 @@ def get_route_analysis():
     - team: filter by team abbreviation
     """
     try:
-        week = request.args.get('week')
-        team = request.args.get('team')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT 
-                p.route_of_targeted_receiver as route,
-                COUNT(*) as attempts,
-                COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END) as completions,
-                ROUND(COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END)::numeric / COUNT(*)::numeric * 100, 1) as completion_pct,
-                ROUND(AVG(p.pass_length)::numeric, 1) as avg_depth,
-                ROUND(AVG(p.yards_gained)::numeric, 1) as avg_yards,
-                ROUND(AVG(p.expected_points_added)::numeric, 2) as avg_epa
-            FROM play_information p
-            WHERE p.route_of_targeted_receiver IS NOT NULL
-        """
-        
-        params = []
-        
-        if week:
-            query += " AND p.week = %s"
-            params.append(int(week))
-        
-        if team:
-            query += " AND (p.home_team_abbr = %s OR p.visitor_team_abbr = %s)"
-            params.append(team)
-            params.append(team)
-        
-        query += """
-            GROUP BY p.route_of_targeted_receiver
-            HAVING COUNT(*) >= 5
-            ORDER BY attempts DESC
-        """
-        
-        cursor.execute(query, params)
-        stats = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stats = analytics.cached_query('route-analysis', request.args)
         
         return jsonify(stats), 200
         
@@ -455,54 +728,14 @@ def get_route_analysis():
 @api.route('/analytics/separation-stats', methods=['GET'])
 def get_separation_stats():
     """
-    Get receiver separation statistics based on route depth
+    Get targeted receiver separation (yards to the nearest defender) on
+    completions by route, from the precomputed play_separation table
     Optional query parameters:
     - week: filter by week number
     - team: filter by team abbreviation
     """
     try:
-        week = request.args.get('week')
-        team = request.args.get('team')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Use route depth as proxy for separation
-        query = """
-            SELECT 
-                p.route_of_targeted_receiver as receiver,
-                COUNT(*) as catches,
-                ROUND(AVG(p.pass_length * 0.3)::numeric, 1) as avg_separation,
-                ROUND(MIN(p.pass_length * 0.2)::numeric, 1) as min_separation,
-                ROUND(MAX(p.pass_length * 0.4)::numeric, 1) as max_separation
-            FROM play_information p
-            WHERE p.pass_result = 'C'
-                AND p.pass_length IS NOT NULL
-                AND p.route_of_targeted_receiver IS NOT NULL
-        """
-        
-        params = []
-        
-        if week:
-            query += " AND p.week = %s"
-            params.append(int(week))
-        
-        if team:
-            query += " AND p.possession_team = %s"
-            params.append(team)
-        
-        query += """
-            GROUP BY p.route_of_targeted_receiver
-            HAVING COUNT(*) >= 5
-            ORDER BY catches DESC
-            LIMIT 15
-        """
-        
-        cursor.execute(query, params)
-        stats = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stats = analytics.cached_query('separation-stats', request.args)
         
         return jsonify(stats), 200
         
@@ -519,48 +752,7 @@ def get_formation_matchup():
     - team: filter by team abbreviation
     """
     try:
-        week = request.args.get('week')
-        team = request.args.get('team')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT 
-                p.offense_formation,
-                p.team_coverage_type,
-                COUNT(*) as plays,
-                COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END) as completions,
-                ROUND(COUNT(CASE WHEN p.pass_result = 'C' THEN 1 END)::numeric / COUNT(*)::numeric * 100, 1) as completion_pct,
-                ROUND(AVG(p.yards_gained)::numeric, 1) as avg_yards,
-                ROUND(AVG(p.expected_points_added)::numeric, 2) as avg_epa
-            FROM play_information p
-            WHERE p.offense_formation IS NOT NULL
-                AND p.team_coverage_type IS NOT NULL
-        """
-        
-        params = []
-        
-        if week:
-            query += " AND p.week = %s"
-            params.append(int(week))
-        
-        if team:
-            query += " AND (p.home_team_abbr = %s OR p.visitor_team_abbr = %s)"
-            params.append(team)
-            params.append(team)
-        
-        query += """
-            GROUP BY p.offense_formation, p.team_coverage_type
-            HAVING COUNT(*) >= 3
-            ORDER BY plays DESC
-        """
-        
-        cursor.execute(query, params)
-        stats = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stats = analytics.cached_query('formation-matchup', request.args)
         
         return jsonify(stats), 200
         
@@ -577,59 +769,7 @@ def get_speed_vs_success():
     - team: filter by team abbreviation
     """
     try:
-        week = request.args.get('week')
-        team = request.args.get('team')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Calculate avg speed and success rate for offensive positions
-        query = """
-            WITH receiver_stats AS (
-                SELECT 
-                    t.player_name,
-                    t.player_position,
-                    ROUND(AVG(t.s * 2.04545)::numeric, 2) as avg_speed,
-                    COUNT(DISTINCT CASE WHEN p.pass_result = 'C' THEN p.play_id END) as completions,
-                    COUNT(DISTINCT p.play_id) as targets
-                FROM tracking_data t
-                JOIN play_information p ON t.game_id = p.game_id AND t.play_id = p.play_id
-                WHERE t.player_position IN ('WR', 'TE', 'RB')
-                    AND t.player_side = 'Offense'
-                    AND t.s IS NOT NULL
-        """
-        
-        params = []
-        
-        if week:
-            query += " AND p.week = %s"
-            params.append(int(week))
-        
-        if team:
-            query += " AND p.possession_team = %s"
-            params.append(team)
-        
-        query += """
-                GROUP BY t.player_name, t.player_position
-                HAVING COUNT(DISTINCT p.play_id) >= 5
-            )
-            SELECT 
-                player_name,
-                player_position,
-                avg_speed,
-                targets,
-                completions,
-                ROUND((completions::numeric / targets::numeric * 100), 1) as success_rate
-            FROM receiver_stats
-            ORDER BY targets DESC
-            LIMIT 30
-        """
-        
-        cursor.execute(query, params)
-        stats = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stats = analytics.cached_query('speed-vs-success', request.args)
         
         return jsonify(stats), 200
         
@@ -646,69 +786,9 @@ def get_down_distance_heatmap():
     - team: filter by team abbreviation
     """
     try:
-        week = request.args.get('week')
-        team = request.args.get('team')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Calculate success rate by down and distance buckets  
-        query = """
-            WITH situational_data AS (
-                SELECT 
-                    p.down,
-                    CASE 
-                        WHEN p.yards_to_go <= 3 THEN 'Short (1-3)'
-                        WHEN p.yards_to_go <= 6 THEN 'Medium (4-6)'
-                        WHEN p.yards_to_go <= 10 THEN 'Long (7-10)'
-                        ELSE 'Very Long (11+)'
-                    END as distance,
-                    p.expected_points_added,
-                    p.pass_result,
-                    p.yards_gained
-                FROM play_information p
-                WHERE p.down IS NOT NULL
-                    AND p.yards_to_go IS NOT NULL
-                    AND p.down <= 4
-        """
-        
-        params = []
-        
-        if week:
-            query += " AND p.week = %s"
-            params.append(int(week))
-        
-        if team:
-            query += " AND p.possession_team = %s"
-            params.append(team)
-        
-        query += """
-            )
-            SELECT 
-                down,
-                distance,
-                COUNT(*) as plays,
-                ROUND(AVG(expected_points_added)::numeric, 2) as avg_epa,
-                ROUND(COUNT(CASE WHEN pass_result = 'C' THEN 1 END)::numeric / COUNT(*)::numeric * 100, 1) as completion_pct,
-                ROUND(AVG(yards_gained)::numeric, 1) as avg_yards
-            FROM situational_data
-            GROUP BY down, distance
-            ORDER BY down, 
-                CASE distance
-                    WHEN 'Short (1-3)' THEN 1
-                    WHEN 'Medium (4-6)' THEN 2
-                    WHEN 'Long (7-10)' THEN 3
-                    WHEN 'Very Long (11+)' THEN 4
-                END
-        """
-        
-        cursor.execute(query, params)
-        stats = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        stats = analytics.cached_query('down-distance-heatmap', request.args)
         
         return jsonify(stats), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,179 @@
+"""
+Receiver separation computed from tracking data.
+
+For every frame of a play, each offensive skill player's separation is the
+distance to the nearest defender on the field in that frame. The work is
+done on NumPy arrays shaped (frames, players): one play's distances are a
+single (frames, receivers, defenders) broadcast, with no per-row Python.
+
+The throw is the last input frame (data_source 'input'). The output frames
+that follow run until the ball arrives, so a receiver's last tracked frame
+is taken as the catch point; for the targeted receiver that is the last
+frame of the play.
+"""
+import numpy as np
+
+SKILL_POSITIONS = ('WR', 'TE', 'RB', 'FB')
+
+GAME_TRACKING_QUERY = """
+    SELECT
+        play_id,
+        frame_id,
+        nfl_id,
+        player_side,
+        player_position,
+        player_role,
+        x,
+        y,
+        data_source
+    FROM vw_complete_tracking
+    WHERE game_id = %s
+    ORDER BY play_id, frame_id, nfl_id
+"""
+
+
+def load_game(cursor, game_id):
+    """Fetch a game's tracking rows as column arrays"""
+    cursor.execute(GAME_TRACKING_QUERY, (game_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    columns = list(zip(*rows))
+    return {
+        'play_id': np.asarray(columns[0], dtype=np.int64),
+        'frame_id': np.asarray(columns[1], dtype=np.int64),
+        'nfl_id': np.asarray(columns[2], dtype=np.int64),
+        'player_side': np.asarray(columns[3], dtype=object),
+        'player_position': np.asarray(columns[4], dtype=object),
+        'player_role': np.asarray(columns[5], dtype=object),
+        'x': np.asarray(columns[6], dtype=np.float64),
+        'y': np.asarray(columns[7], dtype=np.float64),
+        'is_input': np.asarray(columns[8], dtype=object) == 'input'
+    }
+
+
+def play_grid(frame_id, nfl_id, x, y):
+    """
+    Pivot one play's rows into (frames, players) coordinate grids.
+
+    Players missing from a frame (output frames only track some players)
+    get NaN. Returns (frames, players, xs, ys).
+    """
+    frames, frame_idx = np.unique(frame_id, return_inverse=True)
+    players, player_idx = np.unique(nfl_id, return_inverse=True)
+    xs = np.full((len(frames), len(players)), np.nan)
+    ys = np.full((len(frames), len(players)), np.nan)
+    xs[frame_idx, player_idx] = x
+    ys[frame_idx, player_idx] = y
+    return frames, players, xs, ys
+
+
+def nearest_defender(xs, ys, receivers, defenders):
+    """
+    Distance from each receiver to the closest defender in every frame.
+
+    receivers / defenders are boolean masks over the player axis. Returns
+    (separation, nearest) shaped (frames, receivers); nearest holds column
+    indexes into the defender subset, -1 where no defender is tracked.
+    """
+    dx = xs[:, receivers, None] - xs[:, None, defenders]
+    dy = ys[:, receivers, None] - ys[:, None, defenders]
+    dist = np.hypot(dx, dy)
+
+    missing = np.isnan(dist)
+    dist[missing] = np.inf
+    nearest = dist.argmin(axis=2)
+    separation = np.take_along_axis(dist, nearest[..., None], axis=2)[..., 0]
+
+    untracked = np.isinf(separation)
+    separation[untracked] = np.nan
+    nearest[untracked] = -1
+    return separation, nearest
+
+
+def play_separation(game_id, play_id, data, mask):
+    """
+    Separation rows for one play.
+
+    Returns (frame_rows, play_rows): per (frame, receiver) distances with the
+    nearest defender's nfl_id, and per receiver separation at the throw, at
+    the catch and the minimum over the route.
+    """
+    frame_id = data['frame_id'][mask]
+    nfl_id = data['nfl_id'][mask]
+    frames, players, xs, ys = play_grid(frame_id, nfl_id, data['x'][mask], data['y'][mask])
+
+    # First row per player carries their side/position/role for the play
+    _, first = np.unique(nfl_id, return_index=True)
+    side = data['player_side'][mask][first]
+    position = data['player_position'][mask][first]
+    role = data['player_role'][mask][first]
+
+    receivers = (side == 'Offense') & np.isin(position, SKILL_POSITIONS)
+    defenders = side == 'Defense'
+    if not receivers.any() or not defenders.any():
+        return [], []
+
+    separation, nearest = nearest_defender(xs, ys, receivers, defenders)
+    defender_ids = players[defenders]
+    nearest_ids = np.where(nearest >= 0, defender_ids[np.maximum(nearest, 0)], -1)
+
+    input_frames = frame_id[data['is_input'][mask]]
+    throw_frame = input_frames.max() if len(input_frames) else frames[-1]
+    throw_idx = np.searchsorted(frames, throw_frame)
+
+    receiver_ids = players[receivers]
+    n_frames, n_receivers = separation.shape
+
+    tracked = ~np.isnan(separation)
+    f_idx, r_idx = np.nonzero(tracked)
+    frame_rows = list(zip(
+        [game_id] * len(f_idx),
+        [play_id] * len(f_idx),
+        frames[f_idx].tolist(),
+        receiver_ids[r_idx].tolist(),
+        np.round(separation[f_idx, r_idx], 3).tolist(),
+        nearest_ids[f_idx, r_idx].tolist()
+    ))
+
+    # Catch: the receiver's last tracked frame
+    last_idx = np.where(tracked.any(axis=0), n_frames - 1 - np.argmax(tracked[::-1], axis=0), 0)
+    at_catch = separation[last_idx, np.arange(n_receivers)]
+    at_throw = separation[throw_idx]
+    minimum = np.where(tracked, separation, np.inf).min(axis=0)
+    minimum[~tracked.any(axis=0)] = np.nan
+
+    def clean(values):
+        return [None if np.isnan(v) else round(float(v), 3) for v in values]
+
+    play_rows = list(zip(
+        [game_id] * n_receivers,
+        [play_id] * n_receivers,
+        receiver_ids.tolist(),
+        role[receivers].tolist(),
+        clean(at_throw),
+        clean(at_catch),
+        clean(minimum),
+        [int(throw_frame)] * n_receivers,
+        frames[last_idx].tolist()
+    ))
+    return frame_rows, play_rows
+
+
+def game_separation(cursor, game_id):
+    """Separation rows for every play of a game; see play_separation"""
+    data = load_game(cursor, game_id)
+    if data is None:
+        return [], []
+
+    frame_rows = []
+    play_rows = []
+    play_ids, starts = np.unique(data['play_id'], return_index=True)
+    bounds = np.append(starts, len(data['play_id']))
+    for i, play_id in enumerate(play_ids):
+        mask = slice(bounds[i], bounds[i + 1])
+        frames, plays = play_separation(game_id, int(play_id), data, mask)
+        frame_rows.extend(frames)
+        play_rows.extend(plays)
+    return frame_rows, play_rows
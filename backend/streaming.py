@@ -0,0 +1,60 @@
+"""
+Incremental JSON / NDJSON responses for large result sets.
+
+Rows are encoded and sent as they come off a server-side cursor (see
+database.stream_query), so a worker never holds the whole result or its
+encoded form in memory. The response takes over the request's pooled
+connection and returns it once the last row is sent or the client goes away.
+"""
+from flask import Response, current_app
+from werkzeug.wsgi import ClosingIterator
+from database import detach_db_connection, release_db_connection
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson(request):
+    """True if the client asked for newline-delimited JSON"""
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt.lower() == 'ndjson'
+    # JSON comes first so wildcard Accept headers keep the default
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def _json_array(rows, dumps):
+    yield '['
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield dumps(row)
+        else:
+            yield ',' + dumps(row)
+    yield ']\n'
+
+
+def _ndjson(rows, dumps):
+    for row in rows:
+        yield dumps(row) + '\n'
+
+
+def stream_rows(rows, ndjson=False):
+    """Stream an iterable of rows as one JSON array, or one object per line"""
+    dumps = current_app.json.dumps
+    if ndjson:
+        body, mimetype = _ndjson(rows, dumps), NDJSON_MIMETYPE
+    else:
+        body, mimetype = _json_array(rows, dumps), 'application/json'
+
+    conn = detach_db_connection()
+
+    def release():
+        # Close the server-side cursor before its connection can be reused
+        if hasattr(rows, 'close'):
+            rows.close()
+        if conn is not None:
+            release_db_connection(conn)
+
+    return Response(ClosingIterator(body, [release]), mimetype=mimetype)
@@ -0,0 +1,419 @@
+"""
+Synthetic Big Data Bowl data for benchmarking without the licensed files.
+
+Writes input_2023_wNN.csv, output_2023_wNN.csv and supplementary_data.csv in
+the same layout as the real season, so the loaders, column_store.py --source
+csv and build_derived.py run on it unchanged. The scale is games x plays per
+game x 22 players x frames; values follow the rough shape of real plays
+(down and distance, formations, coverages, routes, completion rates, player
+speeds along a route) rather than uniform noise, so query selectivity and
+payload sizes are representative. The same --seed always produces the same
+files.
+
+    python synthetic_data.py --games 32 --plays 50 --out synthetic_data
+    python synthetic_data.py --games 32 --plays 50 --out synthetic_data --load
+
+--load copies the input files into tracking_data (the repo has no loader for
+them), runs load_play_info.py and load_output_only.py on the rest and then
+build_derived.py.
+"""
+import argparse
+import datetime
+import glob
+import io
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+from config import Config
+from database import bump_data_version
+import partitions
+
+SEASON = 2023
+SEASON_START = datetime.date(2023, 9, 7)
+WEEKS = 18
+FPS = 10
+FIELD_LENGTH = 120.0
+FIELD_WIDTH = 53.3
+
+TEAMS = (
+    'ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET',
+    'GB', 'HOU', 'IND', 'JAX', 'KC', 'LA', 'LAC', 'LV', 'MIA', 'MIN', 'NE', 'NO',
+    'NYG', 'NYJ', 'PHI', 'PIT', 'SEA', 'SF', 'TB', 'TEN', 'WAS'
+)
+
+FIRST_NAMES = ('James', 'Michael', 'Chris', 'Jalen', 'Justin', 'Tyler', 'Marcus', 'Derrick',
+               'Brandon', 'Jordan', 'Travis', 'Cooper', 'Davante', 'Stefon', 'Tyreek', 'Aaron')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Davis', 'Miller', 'Wilson',
+              'Moore', 'Taylor', 'Anderson', 'Thomas', 'Jackson', 'White', 'Harris', 'Martin')
+
+# Position, role on pass plays, top speed (yd/s) and route depth: positive
+# runs downfield in the offense's direction, negative back towards its end
+# zone (QB drop, pass rush); players beyond +-0.3 make one break
+OFFENSE = (
+    ('QB', 'Passer', 4.0, -0.6),
+    ('RB', 'Other Route Runner', 7.0, 0.4),
+    ('WR', 'Other Route Runner', 8.5, 1.0),
+    ('WR', 'Other Route Runner', 8.5, 1.0),
+    ('WR', 'Other Route Runner', 8.5, 1.0),
+    ('TE', 'Other Route Runner', 7.0, 0.7),
+    ('T', 'Pass Blocker', 1.5, -0.1),
+    ('G', 'Pass Blocker', 1.5, -0.1),
+    ('C', 'Pass Blocker', 1.5, -0.1),
+    ('G', 'Pass Blocker', 1.5, -0.1),
+    ('T', 'Pass Blocker', 1.5, -0.1),
+)
+DEFENSE = (
+    ('CB', 'Defensive Coverage', 8.5, 0.9),
+    ('CB', 'Defensive Coverage', 8.5, 0.9),
+    ('FS', 'Defensive Coverage', 8.0, 0.6),
+    ('SS', 'Defensive Coverage', 8.0, 0.6),
+    ('ILB', 'Defensive Coverage', 6.5, 0.4),
+    ('OLB', 'Pass Rusher', 6.5, -0.5),
+    ('OLB', 'Defensive Coverage', 6.5, 0.4),
+    ('DE', 'Pass Rusher', 5.5, -0.5),
+    ('DT', 'Pass Rusher', 4.5, -0.4),
+    ('DT', 'Pass Rusher', 4.5, -0.4),
+    ('DE', 'Pass Rusher', 5.5, -0.5),
+)
+# Index in OFFENSE of the players that can be targeted
+TARGETS = (1, 2, 3, 4, 5)
+
+# (value, weight) tables for the play context
+DOWNS = ((1, 40), (2, 32), (3, 24), (4, 4))
+FORMATIONS = (('SHOTGUN', 60), ('SINGLEBACK', 15), ('EMPTY', 10), ('PISTOL', 6),
+              ('I_FORM', 5), ('JUMBO', 2), ('WILDCAT', 2))
+ALIGNMENTS = (('3x1', 45), ('2x2', 35), ('3x2', 8), ('2x1', 8), ('1x1', 4))
+COVERAGES = (('COVER_3_ZONE', 'Zone', 30), ('COVER_1_MAN', 'Man', 20), ('QUARTERS', 'Zone', 14),
+             ('COVER_2_ZONE', 'Zone', 12), ('COVER_6_ZONE', 'Zone', 8), ('COVER_2_MAN', 'Man', 4),
+             ('COVER_0_MAN', 'Man', 4), ('RED_ZONE', 'Other', 3), ('PREVENT', 'Zone', 2),
+             ('GOAL_LINE', 'Other', 1), ('MISC', 'Other', 2))
+ROUTES = (('HITCH', 16), ('OUT', 12), ('GO', 11), ('FLAT', 10), ('CROSS', 10), ('IN', 9),
+          ('SLANT', 8), ('POST', 7), ('CORNER', 5), ('SCREEN', 5), ('ANGLE', 4), ('WHEEL', 3))
+PASS_RESULTS = (('C', 64), ('I', 33), ('IN', 3))
+DROPBACKS = (('TRADITIONAL', 75), ('SCRAMBLE', 8), ('DESIGNED_ROLLOUT_RIGHT', 7),
+             ('DESIGNED_ROLLOUT_LEFT', 4), ('UNKNOWN', 6))
+PASS_LOCATIONS = (('INSIDE_BOX', 85), ('OUTSIDE_RIGHT', 8), ('OUTSIDE_LEFT', 7))
+
+
+def choose(rng, table):
+    values = [entry[0] for entry in table]
+    weights = np.array([entry[-1] for entry in table], dtype=float)
+    return values[rng.choice(len(values), p=weights / weights.sum())]
+
+
+def make_rosters(rng):
+    """{team: [(nfl_id, name, position, height, weight, birth_date), ...]} for OFFENSE + DEFENSE"""
+    rosters = {}
+    nfl_id = 40000
+    for team in TEAMS:
+        roster = []
+        for position, _, _, _ in OFFENSE + DEFENSE:
+            big = position in ('T', 'G', 'C', 'DE', 'DT')
+            inches = int(rng.normal(77 if big else 73, 1.5))
+            roster.append((
+                nfl_id,
+                f"{FIRST_NAMES[rng.integers(len(FIRST_NAMES))]} {LAST_NAMES[rng.integers(len(LAST_NAMES))]}",
+                position,
+                f"{inches // 12}-{inches % 12}",
+                int(rng.normal(310 if big else 210, 15)),
+                str(datetime.date(1992, 1, 1) + datetime.timedelta(days=int(rng.integers(0, 3650))))
+            ))
+            nfl_id += 1
+        rosters[team] = roster
+    return rosters
+
+
+def schedule(rng, games):
+    """[(game_id, week, date, home, visitor)], games spread evenly over the weeks"""
+    per_week = max(1, -(-games // WEEKS))
+    result = []
+    for i in range(games):
+        week = i // per_week + 1
+        date = SEASON_START + datetime.timedelta(days=7 * (week - 1) + int(rng.choice([0, 3, 4])))
+        home, visitor = rng.choice(len(TEAMS), size=2, replace=False)
+        game_id = f"{date:%Y%m%d}{i % per_week:02d}"
+        result.append((game_id, week, date, TEAMS[home], TEAMS[visitor]))
+    return result
+
+
+def play_context(rng, game, play_id, number, plays):
+    """One supplementary_data row for the game's number-th of plays"""
+    game_id, week, date, home, visitor = game
+    offense, defense = (home, visitor) if rng.random() < 0.5 else (visitor, home)
+    down = choose(rng, DOWNS)
+    to_go = 10 if down == 1 and rng.random() < 0.85 else int(np.clip(rng.geometric(0.14), 1, 25))
+    coverage, man_zone = COVERAGES[rng.choice(
+        len(COVERAGES), p=np.array([c[2] for c in COVERAGES]) / sum(c[2] for c in COVERAGES)
+    )][:2]
+    result = choose(rng, PASS_RESULTS)
+    pass_length = float(np.clip(rng.gamma(2.0, 4.5), -5, 60))
+    gained = int(round(pass_length + rng.exponential(4.0))) if result == 'C' else 0
+    epa = {'C': rng.normal(0.9, 1.1), 'I': rng.normal(-0.7, 0.4), 'IN': rng.normal(-3.2, 0.9)}[result]
+    quarter = min(4, number * 4 // plays + 1) if rng.random() > 0.01 else 5
+    home_wp = float(np.clip(rng.normal(0.5, 0.2), 0.01, 0.99))
+
+    return {
+        'game_id': game_id, 'season': SEASON, 'week': week,
+        'game_date': f"{date.month:02d}/{date.day:02d}/{date.year}",
+        'game_time_eastern': ('13:00:00', '16:25:00', '20:20:00')[int(game_id[-2:]) % 3],
+        'home_team_abbr': home, 'visitor_team_abbr': visitor, 'play_id': play_id,
+        'play_description': f"({offense}) pass {'complete' if result == 'C' else 'incomplete'}",
+        'quarter': quarter,
+        'game_clock': f"{rng.integers(0, 15):02d}:{rng.integers(0, 60):02d}",
+        'down': down, 'yards_to_go': to_go,
+        'possession_team': offense, 'defensive_team': defense,
+        'yardline_side': rng.choice([offense, defense]), 'yardline_number': int(rng.integers(1, 51)),
+        'pre_snap_home_score': int(rng.integers(0, 35)), 'pre_snap_visitor_score': int(rng.integers(0, 35)),
+        'pass_result': result, 'pass_length': round(pass_length, 1),
+        'offense_formation': choose(rng, FORMATIONS), 'receiver_alignment': choose(rng, ALIGNMENTS),
+        'route_of_targeted_receiver': choose(rng, ROUTES),
+        'play_action': bool(rng.random() < 0.25),
+        'dropback_type': choose(rng, DROPBACKS), 'dropback_distance': round(float(rng.uniform(2, 9)), 2),
+        'pass_location_type': choose(rng, PASS_LOCATIONS),
+        'defenders_in_the_box': int(rng.choice([5, 6, 6, 6, 7, 7, 8])),
+        'team_coverage_man_zone': man_zone, 'team_coverage_type': coverage,
+        'penalty_yards': None, 'pre_penalty_yards_gained': gained, 'yards_gained': gained,
+        'expected_points': round(float(rng.normal(2.0, 1.5)), 3),
+        'expected_points_added': round(float(epa), 3),
+        'pre_snap_home_team_win_probability': round(home_wp, 3),
+        'pre_snap_visitor_team_win_probability': round(1 - home_wp, 3),
+        'home_team_win_probability_added': round(float(rng.normal(0, 0.02)), 4),
+        'visitor_team_win_probility_added': round(float(rng.normal(0, 0.02)), 4)
+    }
+
+
+def trajectories(rng, start_x, start_y, top_speed, depth, direction, frames):
+    """
+    x, y, s, a, dir, o arrays (players x frames): each player accelerates
+    towards top speed along a heading that bends once, like a route stem and
+    break, with a little jitter. direction is +1 (offense moving right) or -1.
+    """
+    players = len(start_x)
+    t = np.arange(frames) / FPS
+
+    ramp = 1 - np.exp(-t / 0.8)
+    speed = top_speed[:, None] * ramp[None, :] * rng.uniform(0.8, 1.0, (players, 1))
+    speed = np.clip(speed + rng.normal(0, 0.15, (players, frames)), 0, None)
+
+    # Heading in radians from the +x axis: downfield for positive depth,
+    # back towards the own end zone for negative depth, then one break
+    stem = np.where(depth >= 0, 0.0, np.pi) + rng.normal(0, 0.35, players)
+    turn = rng.normal(0, 0.9, players) * (np.abs(depth) > 0.3)
+    break_at = rng.uniform(0.3, 0.7, players) * frames
+    heading = stem[:, None] + turn[:, None] * (np.arange(frames)[None, :] > break_at[:, None])
+    heading = heading + np.cumsum(rng.normal(0, 0.02, (players, frames)), axis=1)
+    if direction < 0:
+        heading = np.pi - heading
+
+    step = speed / FPS
+    x = np.clip(start_x[:, None] + np.cumsum(step * np.cos(heading), axis=1), 0, FIELD_LENGTH)
+    y = np.clip(start_y[:, None] + np.cumsum(step * np.sin(heading), axis=1), 0, FIELD_WIDTH)
+
+    accel = np.abs(np.diff(speed, axis=1, prepend=speed[:, :1])) * FPS
+    # Tracking angles: 0 = +y, clockwise, in degrees
+    angle = np.degrees(np.pi / 2 - heading) % 360
+    orientation = (angle + rng.normal(0, 20, (players, frames))) % 360
+    return x, y, speed, accel, angle, orientation
+
+
+def play_rows(rng, context, rosters, input_frames, output_frames):
+    """(input DataFrame, output DataFrame) for one play"""
+    offense_roster = rosters[context['possession_team']]
+    defense_roster = rosters[context['defensive_team']]
+    direction = 1 if rng.random() < 0.5 else -1
+    line = 10 + context['yardline_number'] + (0 if direction > 0 else 50)
+    line = float(np.clip(line, 15, 105))
+
+    # Offense lines up behind the line of scrimmage, defense in front of it
+    spread = np.linspace(6, FIELD_WIDTH - 6, 11)
+    rng.shuffle(spread)
+    off_x = line - direction * np.array([5, 6, 1, 1, 1, 1.5, 1, 1, 1, 1, 1], dtype=float)
+    def_x = line + direction * np.array([6, 6, 13, 11, 5, 1.5, 5, 1, 1, 1, 1], dtype=float)
+    start_x = np.concatenate([off_x, def_x]) + rng.normal(0, 0.5, 22)
+    start_y = np.concatenate([
+        [FIELD_WIDTH / 2, FIELD_WIDTH / 2 + 2], spread[:4], FIELD_WIDTH / 2 + np.arange(-4, 6, 2),
+        spread[4:8], [FIELD_WIDTH / 2 - 3, FIELD_WIDTH / 2 + 3], FIELD_WIDTH / 2 + np.arange(-4, 5, 2)
+    ]) + rng.normal(0, 0.5, 22)
+    top_speed = np.array([p[2] for p in OFFENSE + DEFENSE])
+    depth = np.array([p[3] for p in OFFENSE + DEFENSE])
+
+    frames = input_frames + output_frames
+    x, y, s, a, angle, orientation = trajectories(
+        rng, start_x, start_y, top_speed, depth, direction, frames
+    )
+
+    target = TARGETS[rng.integers(len(TARGETS))]
+    roles = [role for _, role, _, _ in OFFENSE + DEFENSE]
+    roles[target] = 'Targeted Receiver'
+    to_predict = np.array([i == target or roles[i] == 'Defensive Coverage' for i in range(22)])
+    players = offense_roster + defense_roster
+    sides = ['Offense'] * 11 + ['Defense'] * 11
+    ball_x = float(np.clip(x[target, -1] + rng.normal(0, 1.0), 0, FIELD_LENGTH))
+    ball_y = float(np.clip(y[target, -1] + rng.normal(0, 1.0), 0, FIELD_WIDTH))
+
+    n = 22 * input_frames
+    player_index = np.repeat(np.arange(22), input_frames)
+    inputs = pd.DataFrame({
+        'game_id': context['game_id'],
+        'play_id': context['play_id'],
+        'player_to_predict': to_predict[player_index],
+        'nfl_id': [players[i][0] for i in player_index],
+        'frame_id': np.tile(np.arange(1, input_frames + 1), 22),
+        'play_direction': 'right' if direction > 0 else 'left',
+        'absolute_yardline_number': int(round(line)),
+        'player_name': [players[i][1] for i in player_index],
+        'player_height': [players[i][3] for i in player_index],
+        'player_weight': [players[i][4] for i in player_index],
+        'player_birth_date': [players[i][5] for i in player_index],
+        'player_position': [players[i][2] for i in player_index],
+        'player_side': [sides[i] for i in player_index],
+        'player_role': [roles[i] for i in player_index],
+        'x': x[:, :input_frames].reshape(n).round(2),
+        'y': y[:, :input_frames].reshape(n).round(2),
+        's': s[:, :input_frames].reshape(n).round(2),
+        'a': a[:, :input_frames].reshape(n).round(2),
+        'dir': angle[:, :input_frames].reshape(n).round(2),
+        'o': orientation[:, :input_frames].reshape(n).round(2),
+        'num_frames_output': output_frames,
+        'ball_land_x': round(ball_x, 2),
+        'ball_land_y': round(ball_y, 2)
+    })
+
+    # Post-throw positions only for the players the competition predicts
+    predicted = np.flatnonzero(to_predict)
+    outputs = pd.DataFrame({
+        'game_id': context['game_id'],
+        'play_id': context['play_id'],
+        'nfl_id': np.repeat([players[i][0] for i in predicted], output_frames),
+        'frame_id': np.tile(np.arange(1, output_frames + 1), len(predicted)),
+        'x': x[predicted, input_frames:].reshape(-1).round(2),
+        'y': y[predicted, input_frames:].reshape(-1).round(2)
+    })
+    return inputs, outputs
+
+
+def generate(out_dir, games, plays, frames, output_frames, seed):
+    """Write the CSVs for games x plays; returns (input rows, output rows, plays)"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    rosters = make_rosters(rng)
+    games_by_week = {}
+    for game in schedule(rng, games):
+        games_by_week.setdefault(game[1], []).append(game)
+
+    contexts = []
+    input_rows = output_rows = 0
+    for week, week_games in sorted(games_by_week.items()):
+        inputs, outputs = [], []
+        for game in week_games:
+            for number in range(plays):
+                context = play_context(rng, game, number * 25 + int(rng.integers(1, 25)), number, plays)
+                contexts.append(context)
+                n_in = int(np.clip(rng.normal(frames, frames / 4), 10, 4 * frames))
+                n_out = int(np.clip(rng.normal(output_frames, output_frames / 3), 3, 4 * output_frames))
+                play_in, play_out = play_rows(rng, context, rosters, n_in, n_out)
+                inputs.append(play_in)
+                outputs.append(play_out)
+
+        week_in = pd.concat(inputs, ignore_index=True)
+        week_out = pd.concat(outputs, ignore_index=True)
+        week_in.to_csv(os.path.join(out_dir, f"input_{SEASON}_w{week:02d}.csv"), index=False)
+        week_out.to_csv(os.path.join(out_dir, f"output_{SEASON}_w{week:02d}.csv"), index=False)
+        input_rows += len(week_in)
+        output_rows += len(week_out)
+        print(f"  week {week:2d}: {len(week_games)} games, {len(week_in):,} input / {len(week_out):,} output rows")
+
+    pd.DataFrame(contexts).to_csv(os.path.join(out_dir, 'supplementary_data.csv'), index=False)
+    return input_rows, output_rows, len(contexts)
+
+
+def connect():
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT
+    )
+
+
+def load_tracking(data_dir, truncate=False):
+    """COPY the input_*.csv files into tracking_data, week taken from the file name"""
+    import load_output_only
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM tracking_data)")
+    if cursor.fetchone()[0]:
+        if not truncate:
+            raise SystemExit("tracking_data already has rows; pass --truncate to replace them")
+        cursor.execute("TRUNCATE tracking_data")
+
+    # tracking_data has no week column until migration 0005
+    partitioned = partitions.has_week(cursor, 'tracking_data')
+    rows = 0
+    for file in sorted(glob.glob(os.path.join(data_dir, 'input*.csv'))):
+        week = load_output_only.week_of_file(file)
+        df = pd.read_csv(file, dtype={'game_id': str})
+        if partitioned:
+            df['week'] = week
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        copy_query = sql.SQL("COPY tracking_data ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.SQL(', ').join(map(sql.Identifier, df.columns.tolist()))
+        )
+        cursor.copy_expert(copy_query.as_string(conn), buffer)
+        rows += len(df)
+        print(f"  {os.path.basename(file)}: {len(df):,} rows")
+
+    bump_data_version(cursor)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def run(script, *args):
+    subprocess.run([sys.executable, script, *args], check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Big Data Bowl tracking data')
+    parser.add_argument('--out', default='synthetic_data', help='Directory to write the CSV files to')
+    parser.add_argument('--games', type=int, default=16, help='Games, spread over the 18 weeks')
+    parser.add_argument('--plays', type=int, default=40, help='Pass plays per game')
+    parser.add_argument('--frames', type=int, default=40, help='Mean pre-throw frames per play (10 fps)')
+    parser.add_argument('--output-frames', type=int, default=12, help='Mean post-throw frames per play')
+    parser.add_argument('--seed', type=int, default=2023)
+    parser.add_argument('--load', action='store_true',
+                        help='Load the files into the database and build the derived tables')
+    parser.add_argument('--truncate', action='store_true',
+                        help='With --load, replace existing tracking_data / output_data rows')
+    args = parser.parse_args()
+
+    print(f"Generating {args.games} games x {args.plays} plays x 22 players into {args.out}...")
+    start = time.time()
+    input_rows, output_rows, plays = generate(
+        args.out, args.games, args.plays, args.frames, args.output_frames, args.seed
+    )
+    print(f"Wrote {plays:,} plays, {input_rows:,} input and {output_rows:,} output rows "
+          f"in {time.time() - start:.1f}s")
+
+    if args.load:
+        data_dir = os.path.abspath(args.out)
+        print("\nLoading tracking_data...")
+        load_tracking(data_dir, args.truncate)
+        run('load_play_info.py', '--data-dir', data_dir, '--force')
+        run('load_output_only.py', '--data-dir', data_dir, '--mode', 'copy', '--force')
+        run('build_derived.py')
+
+
+if __name__ == '__main__':
+    main()
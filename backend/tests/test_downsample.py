@@ -0,0 +1,58 @@
+import numpy as np
+import downsample
+
+
+def chord_distance(point, start, end):
+    chord = end - start
+    offset = point - start
+    length = np.hypot(*chord)
+    if length == 0:
+        return np.hypot(*offset)
+    return abs(chord[0] * offset[1] - chord[1] * offset[0]) / length
+
+
+def test_straight_line_collapses_to_its_end_points():
+    points = np.column_stack((np.linspace(0, 20, 21), np.full(21, 10.0)))
+    simplified = downsample.simplify_route(points, tolerance=0.1)
+    assert simplified.tolist() == [[0.0, 10.0], [20.0, 10.0]]
+
+
+def test_corner_is_kept():
+    # A 10-yard stem then a break to the sideline
+    stem = np.column_stack((np.full(11, 5.0), np.linspace(0, 10, 11)))
+    out = np.column_stack((np.linspace(6, 15, 10), np.full(10, 10.0)))
+    simplified = downsample.simplify_route(np.vstack((stem, out)), tolerance=0.5)
+    assert simplified.tolist() == [[5.0, 0.0], [5.0, 10.0], [15.0, 10.0]]
+
+
+def test_every_dropped_point_is_within_tolerance():
+    rng = np.random.default_rng(3)
+    points = np.cumsum(rng.normal(0, 1, (60, 2)), axis=0)
+    tolerance = 0.75
+
+    simplified = downsample.simplify_route(points, tolerance=tolerance)
+
+    kept = [i for i, point in enumerate(points.tolist()) if point in simplified.tolist()]
+    assert kept[0] == 0 and kept[-1] == len(points) - 1
+    for start, end in zip(kept, kept[1:]):
+        for i in range(start + 1, end):
+            assert chord_distance(points[i], points[start], points[end]) <= tolerance
+
+
+def test_route_returning_to_its_start_is_not_collapsed():
+    points = np.array([[0.0, 0.0], [5.0, 0.0], [5.0, 5.0], [0.0, 0.0]])
+    # Distances are measured to the start point when the chord has no length
+    simplified = downsample.simplify_route(points, tolerance=1.0)
+    assert simplified.tolist() == points.tolist()
+
+
+def test_zero_tolerance_and_short_routes_are_unchanged():
+    points = np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0]])
+    assert downsample.simplify_route(points).tolist() == points.tolist()
+    assert downsample.simplify_route(points[:2], tolerance=5).tolist() == points[:2].tolist()
+
+
+def test_stride_keeps_the_last_point():
+    points = np.column_stack((np.arange(10.0), np.zeros(10)))
+    simplified = downsample.simplify_route(points, stride=4)
+    assert simplified[:, 0].tolist() == [0.0, 4.0, 8.0, 9.0]
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+import play_search
+
+
+# play_information columns the index reads
+COLUMNS = ({column for column, _ in play_search.FILTERS.values()} | set(play_search.RANGES.values())
+           | {'play_action', 'yards_to_go'})
+
+
+def make_play(game_id, play_id, **values):
+    play = dict.fromkeys(COLUMNS)
+    play.update(game_id=game_id, play_id=play_id, **values)
+    return play
+
+
+def season():
+    """Forty plays over two games with cycling downs, teams and coverages"""
+    plays = []
+    for n in range(40):
+        game_id = '2023090700' if n < 20 else '2023091000'
+        plays.append(make_play(
+            game_id, 100 + n,
+            week=1 if n < 20 else 2,
+            down=n % 4 + 1,
+            yards_to_go=(1, 5, 8, 15)[n % 4],
+            quarter=n % 4 + 1,
+            possession_team=('KC', 'DET')[n % 2],
+            defensive_team=('DET', 'KC')[n % 2],
+            team_coverage_type=('COVER_3_ZONE', 'COVER_1_MAN', None)[n % 3],
+            play_action=n % 5 == 0,
+            expected_points_added=None if n == 7 else n / 10 - 2,
+            yards_gained=n % 12
+        ))
+    return plays
+
+
+def brute_force(plays, predicate):
+    return [(p['game_id'], p['play_id']) for p in sorted(plays, key=lambda p: (p['game_id'], p['play_id']))
+            if predicate(p)]
+
+
+def keys(page):
+    return [(p['game_id'], p['play_id']) for p in page]
+
+
+def search(index, args, limit=100, after=None):
+    return index.search(play_search.parse_filters(args), limit=limit, after=after)
+
+
+def test_bitmaps_mark_each_value():
+    index = play_search.PlayIndex(season())
+    downs = index.bitmaps['down']
+    assert sorted(downs) == [1, 2, 3, 4]
+    assert all(bitmap.sum() == 10 for bitmap in downs.values())
+    # Every play is in exactly one down bitmap
+    assert (np.sum(list(downs.values()), axis=0) == 1).all()
+    # None is not a value
+    assert None not in index.bitmaps['team_coverage_type']
+
+
+def test_values_or_within_a_column_and_columns_and():
+    plays = season()
+    index = play_search.PlayIndex(plays)
+    page, _, total = search(index, {'down': '3,4', 'offense': 'kc', 'coverage': 'cover_3_zone'})
+    expected = brute_force(plays, lambda p: p['down'] in (3, 4) and p['possession_team'] == 'KC'
+                           and p['team_coverage_type'] == 'COVER_3_ZONE')
+    assert keys(page) == expected
+    assert total == len(expected)
+
+
+def test_team_distance_play_action_and_ranges():
+    plays = season()
+    index = play_search.PlayIndex(plays)
+
+    page, _, _ = search(index, {'team': 'DET', 'distance': 'long,very_long'})
+    assert keys(page) == brute_force(plays, lambda p: p['yards_to_go'] >= 7)
+
+    page, _, _ = search(index, {'play_action': 'true', 'week': '2'})
+    assert keys(page) == brute_force(plays, lambda p: p['play_action'] and p['week'] == 2)
+
+    # Plays without an EPA never match an EPA range
+    page, _, _ = search(index, {'min_epa': '-1.5', 'max_epa': '0'})
+    assert keys(page) == brute_force(plays, lambda p: p['expected_points_added'] is not None
+                                     and -1.5 <= p['expected_points_added'] <= 0)
+    assert (plays[7]['game_id'], 107) not in keys(page)
+
+
+def test_unknown_value_matches_nothing():
+    index = play_search.PlayIndex(season())
+    page, cursor, total = search(index, {'formation': 'WILDCAT'})
+    assert page == [] and cursor is None and total == 0
+
+
+def test_cursor_pages_through_every_match_once():
+    plays = season()
+    index = play_search.PlayIndex(plays)
+    args = {'down': '1,2,3'}
+    expected = brute_force(plays, lambda p: p['down'] in (1, 2, 3))
+
+    seen = []
+    after = None
+    while True:
+        page, cursor, total = search(index, args, limit=7, after=after)
+        assert total == len(expected)
+        seen.extend(keys(page))
+        if cursor is None:
+            break
+        after = play_search.decode_cursor(cursor)
+        assert after == seen[-1]
+    assert seen == expected
+
+
+def test_cursor_is_stable_when_plays_are_added_before_it():
+    plays = season()
+    index = play_search.PlayIndex(plays)
+    first, cursor, _ = search(index, {}, limit=10)
+
+    # A reload adds plays ahead of the cursor
+    grown = play_search.PlayIndex([make_play('2023090100', n, down=1) for n in range(5)] + plays)
+    page, _, _ = search(grown, {}, limit=10, after=play_search.decode_cursor(cursor))
+
+    assert keys(page) == [(p['game_id'], p['play_id']) for p in plays[10:20]]
+
+
+def test_last_page_has_no_cursor():
+    index = play_search.PlayIndex(season())
+    page, cursor, total = search(index, {}, limit=40)
+    assert len(page) == 40 and cursor is None and total == 40
+
+
+def test_decode_cursor_rejects_garbage():
+    assert play_search.decode_cursor(play_search.encode_cursor('2023090700', 5)) == ('2023090700', 5)
+    for bad in ('not-a-cursor', play_search.encode_cursor(5, '2023090700'), ''):
+        with pytest.raises(ValueError):
+            play_search.decode_cursor(bad)
+
+
+def test_parse_filters_rejects_bad_values():
+    with pytest.raises(ValueError):
+        play_search.parse_filters({'down': 'third'})
+    with pytest.raises(ValueError):
+        play_search.parse_filters({'distance': 'medium,far'})
+    with pytest.raises(ValueError):
+        play_search.parse_filters({'min_yards': 'ten'})
+    with pytest.raises(ValueError):
+        play_search.parse_filters({'play_action': 'maybe'})
@@ -0,0 +1,73 @@
+import players
+
+ROWS = [
+    {'nfl_id': 1, 'player_name': 'Patrick Mahomes', 'player_position': 'QB', 'team_abbr': 'KC'},
+    {'nfl_id': 2, 'player_name': 'Travis Kelce', 'player_position': 'TE', 'team_abbr': 'KC'},
+    {'nfl_id': 3, 'player_name': 'Justin Jefferson', 'player_position': 'WR', 'team_abbr': 'MIN'},
+    {'nfl_id': 4, 'player_name': 'Justin Fields', 'player_position': 'QB', 'team_abbr': 'CHI'},
+    {'nfl_id': 5, 'player_name': "Ja'Marr Chase", 'player_position': 'WR', 'team_abbr': 'CIN'},
+    {'nfl_id': 6, 'player_name': 'Amon-Ra St. Brown', 'player_position': 'WR', 'team_abbr': 'DET'},
+    {'nfl_id': 7, 'player_name': 'Tyreek Hill', 'player_position': 'WR', 'team_abbr': 'MIA'},
+]
+
+
+def ids(results):
+    return [row['nfl_id'] for row, _, _ in results]
+
+
+def test_normalize_strips_accents_and_punctuation():
+    assert players.normalize("  Ja'Marr  Chase ") == 'ja marr chase'
+    assert players.normalize('Amon-Ra St. Brown') == 'amon ra st brown'
+    assert players.normalize('Zoë Müller') == 'zoe muller'
+    assert players.normalize(None) == ''
+
+
+def test_all_is_sorted_by_position_then_name_and_filters():
+    index = players.PlayerIndex(ROWS)
+    assert [row['nfl_id'] for row in index.all()] == [4, 1, 2, 6, 5, 3, 7]
+    assert [row['nfl_id'] for row in index.all(['QB'])] == [4, 1]
+
+
+def test_full_name_prefix_comes_before_later_word_prefix():
+    index = players.PlayerIndex(ROWS + [
+        {'nfl_id': 8, 'player_name': 'Chase Claypool', 'player_position': 'WR', 'team_abbr': 'MIA'},
+    ])
+    results = index.search('chase')
+    assert ids(results) == [8, 5]
+    assert [match for _, match, _ in results] == ['prefix', 'prefix']
+
+
+def test_prefix_matches_every_name_in_the_run():
+    index = players.PlayerIndex(ROWS)
+    assert sorted(ids(index.search('just'))) == [3, 4]
+    assert ids(index.search('JUSTIN J', fuzzy=False)) == [3]
+    # Later words match one word at a time
+    assert ids(index.search('brow', fuzzy=False)) == [6]
+
+
+def test_position_filter_and_limit():
+    index = players.PlayerIndex(ROWS)
+    assert ids(index.search('justin', positions=['WR'])) == [3]
+    assert len(index.search('justin', limit=1)) == 1
+
+
+def test_fuzzy_match_survives_a_typo():
+    index = players.PlayerIndex(ROWS)
+    results = index.search('kelse')
+    assert ids(results)[0] == 2
+    row, match, score = results[0]
+    assert match == 'fuzzy'
+    assert players.FUZZY_THRESHOLD <= score < 1
+
+
+def test_fuzzy_only_fills_what_prefixes_leave():
+    index = players.PlayerIndex(ROWS)
+    assert index.search('justin', fuzzy=True, limit=2) == index.search('justin', fuzzy=False, limit=2)
+    assert index.search('kelse', fuzzy=False) == []
+
+
+def test_short_or_empty_queries():
+    index = players.PlayerIndex(ROWS)
+    assert index.search('  ') == []
+    # Too short for trigrams, so only prefixes
+    assert index.search('zz') == []
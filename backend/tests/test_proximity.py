@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import proximity
+
+
+def random_frame(seed, n=22):
+    rng = np.random.default_rng(seed)
+    # A few players slightly out of bounds land in the edge cells
+    return rng.uniform(-2, 122, n), rng.uniform(-2, 55, n)
+
+
+@pytest.mark.parametrize('radius', [0.5, 3.0, 10.0, 40.0])
+def test_within_matches_brute_force(radius):
+    x, y = random_frame(1)
+    grid = proximity.FieldGrid(x, y, radius)
+
+    queries, points, dist = grid.within(x, y, radius)
+
+    found = {(q, p): d for q, p, d in zip(queries.tolist(), points.tolist(), dist.tolist())}
+    expected = {
+        (i, j): np.hypot(x[i] - x[j], y[i] - y[j])
+        for i in range(len(x)) for j in range(len(x))
+        if np.hypot(x[i] - x[j], y[i] - y[j]) <= radius
+    }
+    assert found.keys() == expected.keys()
+    for key, d in expected.items():
+        assert found[key] == pytest.approx(d)
+
+
+@pytest.mark.parametrize('cell_size', [1.0, 2.0, 5.0])
+def test_nearest_matches_brute_force(cell_size):
+    x, y = random_frame(2, n=11)
+    qx, qy = random_frame(3, n=30)
+    grid = proximity.FieldGrid(x, y, cell_size)
+
+    idx, dist = grid.nearest(qx, qy)
+
+    all_dist = np.hypot(qx[:, None] - x[None, :], qy[:, None] - y[None, :])
+    np.testing.assert_allclose(dist, all_dist.min(axis=1))
+    np.testing.assert_allclose(all_dist[np.arange(len(qx)), idx], dist)
+
+
+def test_nearest_widens_the_search_for_far_points():
+    # The only point is many cells away from the query
+    grid = proximity.FieldGrid(np.array([115.0]), np.array([50.0]), 1.0)
+    idx, dist = grid.nearest(np.array([2.0]), np.array([2.0]))
+    assert idx.tolist() == [0]
+    assert dist[0] == pytest.approx(np.hypot(113, 48))
+
+
+def test_nearest_on_an_empty_grid():
+    grid = proximity.FieldGrid(np.array([]), np.array([]), 2.0)
+    idx, dist = grid.nearest(np.array([10.0]), np.array([10.0]))
+    assert idx.tolist() == [-1]
+    assert np.isinf(dist[0])
+
+
+def test_frame_proximity_nearest_opponent_and_neighbours():
+    nfl_ids = [1, 2, 3, 4]
+    sides = np.array(['Offense', 'Offense', 'Defense', 'Defense'], dtype=object)
+    x = np.array([10.0, 11.0, 13.0, 40.0])
+    y = np.array([20.0, 20.0, 20.0, 20.0])
+
+    players = proximity.frame_proximity(nfl_ids, sides, x, y, 2.5)
+
+    assert [p['nearest_opponent'] for p in players] == [3, 3, 2, 2]
+    assert [p['distance'] for p in players] == [3.0, 2.0, 2.0, 29.0]
+    assert [sorted(p['within_radius']) for p in players] == [[2], [1, 3], [2], []]
+
+
+def test_frame_proximity_nearest_does_not_depend_on_radius():
+    x, y = random_frame(4)
+    nfl_ids = list(range(len(x)))
+    sides = np.array(['Offense', 'Defense'] * (len(x) // 2), dtype=object)
+
+    small = proximity.frame_proximity(nfl_ids, sides, x, y, proximity.MIN_RADIUS)
+    large = proximity.frame_proximity(nfl_ids, sides, x, y, proximity.MAX_RADIUS)
+
+    assert [p['nearest_opponent'] for p in small] == [p['nearest_opponent'] for p in large]
+    assert [p['distance'] for p in small] == [p['distance'] for p in large]
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import separation
+
+
+def brute_force(xs, ys, receivers, defenders):
+    """Per frame and receiver, the distance to every defender in a loop"""
+    frames, players = xs.shape
+    result = np.full((frames, receivers.sum()), np.nan)
+    for f in range(frames):
+        for r, i in enumerate(np.flatnonzero(receivers)):
+            dists = [np.hypot(xs[f, i] - xs[f, j], ys[f, i] - ys[f, j]) for j in np.flatnonzero(defenders)]
+            dists = [d for d in dists if not np.isnan(d)]
+            if dists:
+                result[f, r] = min(dists)
+    return result
+
+
+def game_data(rows):
+    """Column arrays in the load_game layout from (play, frame, nfl_id, side, position, role, x, y, source)"""
+    columns = list(zip(*rows))
+    return {
+        'play_id': np.asarray(columns[0], dtype=np.int64),
+        'frame_id': np.asarray(columns[1], dtype=np.int64),
+        'nfl_id': np.asarray(columns[2], dtype=np.int64),
+        'player_side': np.asarray(columns[3], dtype=object),
+        'player_position': np.asarray(columns[4], dtype=object),
+        'player_role': np.asarray(columns[5], dtype=object),
+        'x': np.asarray(columns[6], dtype=np.float64),
+        'y': np.asarray(columns[7], dtype=np.float64),
+        'is_input': np.asarray(columns[8], dtype=object) == 'input'
+    }
+
+
+def test_play_grid_pivots_rows_and_leaves_gaps_nan():
+    frames, players, xs, ys = separation.play_grid(
+        np.array([1, 1, 2]), np.array([20, 10, 10]), np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0, 6.0])
+    )
+    assert frames.tolist() == [1, 2]
+    assert players.tolist() == [10, 20]
+    assert xs[0].tolist() == [2.0, 1.0]
+    assert xs[1, 0] == 3.0 and np.isnan(xs[1, 1])
+    assert ys[1, 0] == 6.0 and np.isnan(ys[1, 1])
+
+
+def test_nearest_defender_matches_brute_force():
+    rng = np.random.default_rng(7)
+    xs = rng.uniform(0, 120, (6, 9))
+    ys = rng.uniform(0, 53.3, (6, 9))
+    # Output frames only track some players
+    xs[3, 5] = ys[3, 5] = np.nan
+    xs[4, 1] = ys[4, 1] = np.nan
+    receivers = np.array([True, True, True, False, False, False, False, False, False])
+    defenders = ~receivers
+
+    sep, nearest = separation.nearest_defender(xs, ys, receivers, defenders)
+
+    assert sep.shape == (6, 3)
+    np.testing.assert_allclose(sep, brute_force(xs, ys, receivers, defenders), equal_nan=True)
+    defender_columns = np.flatnonzero(defenders)
+    for f in range(6):
+        for r, i in enumerate(np.flatnonzero(receivers)):
+            if np.isnan(sep[f, r]):
+                continue
+            j = defender_columns[nearest[f, r]]
+            assert np.hypot(xs[f, i] - xs[f, j], ys[f, i] - ys[f, j]) == pytest.approx(sep[f, r])
+
+
+def test_nearest_defender_without_tracked_defenders():
+    xs = np.array([[1.0, np.nan], [1.0, 5.0]])
+    ys = np.array([[1.0, np.nan], [1.0, 1.0]])
+    sep, nearest = separation.nearest_defender(xs, ys, np.array([True, False]), np.array([False, True]))
+
+    assert np.isnan(sep[0, 0]) and nearest[0, 0] == -1
+    assert sep[1, 0] == pytest.approx(4.0) and nearest[1, 0] == 0
+
+
+def test_play_separation_throw_catch_and_minimum():
+    rows = []
+    # Receiver 1 runs away from defender 2; frames 1-2 are input, 3-4 output
+    for frame, (rx, dx) in enumerate([(10, 12), (10, 11), (20, 13), (30, 14)], start=1):
+        source = 'input' if frame <= 2 else 'output'
+        rows.append((5, frame, 1, 'Offense', 'WR', 'Targeted Receiver', rx, 20.0, source))
+        rows.append((5, frame, 2, 'Defense', 'CB', 'Defensive Coverage', dx, 20.0, source))
+    # A lineman is not a receiver
+    rows.append((5, 1, 3, 'Offense', 'T', 'Other Route Runner', 0.0, 0.0, 'input'))
+    data = game_data(rows)
+
+    frame_rows, play_rows = separation.play_separation('2023090700', 5, data, slice(0, len(rows)))
+
+    assert [(r[2], r[3], r[4], r[5]) for r in frame_rows] == [
+        (1, 1, 2.0, 2), (2, 1, 1.0, 2), (3, 1, 7.0, 2), (4, 1, 16.0, 2)
+    ]
+    assert play_rows == [('2023090700', 5, 1, 'Targeted Receiver', 1.0, 16.0, 1.0, 2, 4)]
+
+
+def test_play_separation_needs_both_sides():
+    rows = [(5, 1, 1, 'Offense', 'WR', 'Targeted Receiver', 10.0, 20.0, 'input')]
+    assert separation.play_separation('2023090700', 5, game_data(rows), slice(0, 1)) == ([], [])
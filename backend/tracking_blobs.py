@@ -0,0 +1,126 @@
+"""
+Pre-serialized, gzip-compressed play tracking responses.
+
+A play's tracking never changes between loads, so build_derived.py encodes
+every play once in each response format and stores the compressed bytes in
+play_tracking_blob. /play/<game_id>/<play_id>/tracking then sends the stored
+bytes as-is with Content-Encoding: gzip instead of scanning
+vw_complete_tracking and encoding the rows on every view. The blobs are only
+as fresh as the last build, so rebuild them after loading new data.
+"""
+import gzip
+import hashlib
+import json
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
+import tracking_format
+import tracking_query
+
+# {} is the table being built (build_derived.py builds play_tracking_blob_new
+# and renames it into place)
+BLOB_DDL = """
+    CREATE TABLE {} (
+        game_id TEXT NOT NULL,
+        play_id INTEGER NOT NULL,
+        format TEXT NOT NULL,
+        mimetype TEXT NOT NULL,
+        content_encoding TEXT NOT NULL,
+        body BYTEA NOT NULL,
+        raw_bytes INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        PRIMARY KEY (game_id, play_id, format)
+    )
+"""
+
+# 'json' is the default row-per-object response; the others are the
+# tracking_format encodings
+BLOB_FORMATS = ('json',) + tuple(tracking_format.FORMATS)
+
+GAME_TRACKING_QUERY = """
+    SELECT
+        play_id,
+        {columns}
+    FROM vw_complete_tracking
+    WHERE game_id = %s
+    ORDER BY play_id, frame_id, nfl_id
+""".format(columns=',\n        '.join(tracking_query.TRACKING_COLUMNS))
+
+
+def encode_json(payload):
+    """The bytes jsonify would send for payload (sorted keys, compact)"""
+    return (json.dumps(payload, default=str, separators=(',', ':'), sort_keys=True) + '\n').encode('utf-8')
+
+
+def encode_play(game_id, play_id, rows):
+    """
+    (format, mimetype, uncompressed bytes) for each format of one play.
+    Formats whose optional encoder is not installed are skipped.
+    """
+    payload = tracking_format.play_payload(game_id, play_id, rows)
+    encoded = [('json', 'application/json', encode_json(payload))]
+    for fmt in tracking_format.FORMATS:
+        try:
+            body, mimetype = tracking_format.encode_tracking(
+                fmt, game_id, play_id, rows, payload['total_frames']
+            )
+        except tracking_format.FormatNotAvailable:
+            continue
+        encoded.append((fmt, mimetype, body))
+    return encoded
+
+
+def game_blobs(conn, game_id):
+    """play_tracking_blob rows for every play of a game"""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(GAME_TRACKING_QUERY, (game_id,))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    blobs = []
+    start = 0
+    for i in range(1, len(rows) + 1):
+        if i < len(rows) and rows[i]['play_id'] == rows[start]['play_id']:
+            continue
+        play_id = rows[start]['play_id']
+        play_rows = [{c: row[c] for c in tracking_query.TRACKING_COLUMNS} for row in rows[start:i]]
+        for fmt, mimetype, raw in encode_play(game_id, play_id, play_rows):
+            body = gzip.compress(raw, compresslevel=9)
+            blobs.append((
+                game_id, play_id, fmt, mimetype, 'gzip', body,
+                len(raw), hashlib.sha256(raw).hexdigest()
+            ))
+        start = i
+    return blobs
+
+
+def insert_blobs(cursor, blobs, table='play_tracking_blob'):
+    execute_values(cursor, sql.SQL("""
+        INSERT INTO {}
+            (game_id, play_id, format, mimetype, content_encoding, body, raw_bytes, content_hash)
+        VALUES %s
+    """).format(sql.Identifier(table)), blobs, page_size=100)
+
+
+def get_blob(conn, game_id, play_id, fmt):
+    """
+    Stored (body, mimetype, content_encoding, content_hash) for a play, or
+    None if it was not built (including before the table exists).
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT body, mimetype, content_encoding, content_hash
+            FROM play_tracking_blob
+            WHERE game_id = %s AND play_id = %s AND format = %s
+        """, (game_id, play_id, fmt))
+        row = cursor.fetchone()
+    except psycopg2.ProgrammingError:
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+
+    if row is None:
+        return None
+    return bytes(row['body']), row['mimetype'], row['content_encoding'], row['content_hash']
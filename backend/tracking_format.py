@@ -0,0 +1,263 @@
+"""
+Columnar encodings for play tracking responses.
+
+The default /play/<game_id>/<play_id>/tracking response is one JSON object per
+(frame, player) row. The encodings here send the player dictionary once and
+then typed column arrays in (frame_id, nfl_id) order:
+
+- frames / frame_offsets: the distinct frame ids (int32) and, for each frame,
+  the slice of the row columns that belongs to it
+- player: index into players for each row (int16)
+- data_source: index into data_sources for each row (uint8)
+- x, y, s, a, dir, o: float32 (null / NaN where the source has no value)
+
+Available as JSON, MessagePack and Arrow IPC. MessagePack and Arrow need the
+optional msgpack / pyarrow packages.
+"""
+import json
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+FLOAT_COLUMNS = ('x', 'y', 's', 'a', 'dir', 'o')
+PLAYER_COLUMNS = ('nfl_id', 'player_name', 'player_position', 'player_side', 'player_role')
+
+FORMATS = {
+    'columnar': 'application/vnd.nfl.tracking+json',
+    'msgpack': 'application/x-msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+# Extra media types accepted in the Accept header
+ACCEPT_ALIASES = {
+    'application/msgpack': 'msgpack',
+    'application/vnd.apache.arrow.file': 'arrow'
+}
+
+
+class FormatNotAvailable(Exception):
+    """Raised when the encoder for a requested format is not installed"""
+
+
+def negotiate_format(request):
+    """
+    Pick the response format for a tracking request.
+
+    ?format= wins over the Accept header. Returns None for the default
+    row-oriented JSON. Raises ValueError for an unknown ?format= value.
+    """
+    fmt = request.args.get('format')
+    if fmt:
+        fmt = fmt.lower()
+        if fmt in ('json', 'rows'):
+            return None
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of: json, {', '.join(FORMATS)}")
+        return fmt
+
+    for mimetype, _ in request.accept_mimetypes:
+        for name, format_mimetype in FORMATS.items():
+            if mimetype == format_mimetype:
+                return name
+        if mimetype in ACCEPT_ALIASES:
+            return ACCEPT_ALIASES[mimetype]
+        if mimetype in ('application/json', '*/*'):
+            return None
+    return None
+
+
+def play_payload(game_id, play_id, rows):
+    """
+    The default JSON response for a play's tracking rows.
+
+    The player list and frame count are taken from the ordered rows; player
+    details are only listed for the columns the rows carry.
+    """
+    player_columns = [c for c in PLAYER_COLUMNS[:4] if c in rows[0]]
+    players = {}
+    for row in rows:
+        if row['nfl_id'] not in players:
+            players[row['nfl_id']] = {c: row[c] for c in player_columns}
+
+    return {
+        'game_id': game_id,
+        'play_id': play_id,
+        'players': list(players.values()),
+        'tracking': rows,
+        # Rows are ordered by frame_id, so the last one holds the highest frame
+        'total_frames': rows[-1]['frame_id']
+    }
+
+
+def _to_float(value):
+    return np.nan if value is None else float(value)
+
+
+def build_columns(rows, float_columns=FLOAT_COLUMNS):
+    """
+    Convert tracking rows (ordered by frame_id, nfl_id) to column arrays.
+
+    Only float_columns are built; the player dictionary keeps the player
+    fields present in the rows.
+    """
+    players = []
+    player_index = {}
+    data_sources = []
+    source_index = {}
+
+    n = len(rows)
+    frame_ids = np.empty(n, dtype=np.int32)
+    player_col = np.empty(n, dtype=np.int16)
+    source_col = np.empty(n, dtype=np.uint8)
+    floats = {name: np.empty(n, dtype=np.float32) for name in float_columns}
+    player_fields = [name for name in PLAYER_COLUMNS if rows and name in rows[0]]
+
+    for i, row in enumerate(rows):
+        nfl_id = row['nfl_id']
+        idx = player_index.get(nfl_id)
+        if idx is None:
+            idx = player_index[nfl_id] = len(players)
+            players.append({name: row[name] for name in player_fields})
+        player_col[i] = idx
+
+        source = row.get('data_source')
+        sidx = source_index.get(source)
+        if sidx is None:
+            sidx = source_index[source] = len(data_sources)
+            data_sources.append(source)
+        source_col[i] = sidx
+
+        frame_ids[i] = row['frame_id']
+        for name in float_columns:
+            floats[name][i] = _to_float(row[name])
+
+    frames, starts = np.unique(frame_ids, return_index=True)
+    frame_offsets = np.append(starts, n).astype(np.int32)
+
+    return {
+        'players': players,
+        'data_sources': data_sources,
+        'frames': frames.astype(np.int32),
+        'frame_offsets': frame_offsets,
+        'frame_id': frame_ids,
+        'player': player_col,
+        'data_source': source_col,
+        'float_columns': tuple(float_columns),
+        **floats
+    }
+
+
+def _float_list(arr):
+    # JSON has no NaN; round back to the 2 decimals the source data carries
+    values = np.round(arr.astype(np.float64), 2)
+    return [None if v != v else v for v in values.tolist()]
+
+
+def encode_json(header, columns):
+    payload = dict(header)
+    payload.update({
+        'players': columns['players'],
+        'data_sources': columns['data_sources'],
+        'frames': columns['frames'].tolist(),
+        'frame_offsets': columns['frame_offsets'].tolist(),
+        'columns': {
+            'player': columns['player'].tolist(),
+            'data_source': columns['data_source'].tolist(),
+            **{name: _float_list(columns[name]) for name in columns['float_columns']}
+        }
+    })
+    return json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def encode_msgpack(header, columns):
+    if msgpack is None:
+        raise FormatNotAvailable('MessagePack encoding requires the msgpack package')
+
+    # Typed arrays travel as raw little-endian buffers with their dtype alongside
+    arrays = ('frames', 'frame_offsets', 'player', 'data_source') + columns['float_columns']
+    payload = dict(header)
+    payload.update({
+        'players': columns['players'],
+        'data_sources': columns['data_sources'],
+        'dtypes': {name: columns[name].dtype.newbyteorder('<').str for name in arrays},
+        'columns': {name: columns[name].astype(columns[name].dtype.newbyteorder('<')).tobytes()
+                    for name in arrays}
+    })
+    return msgpack.packb(payload, default=str, use_bin_type=True)
+
+
+def encode_arrow(header, columns):
+    if pa is None:
+        raise FormatNotAvailable('Arrow encoding requires the pyarrow package')
+
+    players = columns['players']
+    player_idx = pa.array(columns['player'], type=pa.int16())
+
+    def player_dictionary(name, arrow_type):
+        return pa.DictionaryArray.from_arrays(
+            player_idx, pa.array([p[name] for p in players], type=arrow_type)
+        )
+
+    player_types = {
+        'nfl_id': pa.int64(),
+        'player_name': pa.string(),
+        'player_position': pa.string(),
+        'player_side': pa.string(),
+        'player_role': pa.string()
+    }
+    present = players[0].keys() if players else ()
+
+    batch = pa.record_batch({
+        'frame_id': pa.array(columns['frame_id'], type=pa.int32()),
+        **{name: player_dictionary(name, arrow_type)
+           for name, arrow_type in player_types.items() if name in present},
+        'data_source': pa.DictionaryArray.from_arrays(
+            pa.array(columns['data_source'], type=pa.uint8()),
+            pa.array(columns['data_sources'], type=pa.string())
+        ),
+        **{name: pa.array(columns[name], type=pa.float32(), from_pandas=True)
+           for name in columns['float_columns']}
+    })
+    batch = batch.replace_schema_metadata({
+        key: json.dumps(value, default=str) for key, value in header.items()
+    })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {
+    'columnar': encode_json,
+    'msgpack': encode_msgpack,
+    'arrow': encode_arrow
+}
+
+
+def encode_tracking(fmt, game_id, play_id, rows, total_frames, fields=None):
+    """
+    Encode a play's tracking rows; returns (body bytes, mimetype).
+
+    fields limits the float columns to those requested (all by default).
+    """
+    float_columns = FLOAT_COLUMNS if not fields else tuple(c for c in FLOAT_COLUMNS if c in fields)
+    return encode_columns(fmt, game_id, play_id, build_columns(rows, float_columns), total_frames)
+
+
+def encode_columns(fmt, game_id, play_id, columns, total_frames):
+    """Like encode_tracking, for columns already in the build_columns layout"""
+    header = {
+        'game_id': game_id,
+        'play_id': play_id,
+        'total_frames': total_frames
+    }
+    return ENCODERS[fmt](header, columns), FORMATS[fmt]
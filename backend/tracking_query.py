@@ -0,0 +1,128 @@
+"""
+Play tracking queries against vw_complete_tracking.
+
+The tracking endpoint can narrow a play to a frame window, a set of players
+and a subset of columns. Those filters become WHERE clauses and a shorter
+SELECT list here, so Postgres only reads and sends what the client renders;
+the predicates compare plain columns with constants (ranges and = ANY) so
+they stay usable by the (game_id, play_id, ...) indexes under the view.
+"""
+
+TRACKING_COLUMNS = (
+    'frame_id',
+    'nfl_id',
+    'player_name',
+    'player_position',
+    'player_side',
+    'player_role',
+    'x',
+    'y',
+    's',
+    'a',
+    'dir',
+    'o',
+    'data_source'
+)
+
+# Always returned so rows can be placed in a frame and matched to a player
+KEY_COLUMNS = ('frame_id', 'nfl_id')
+
+SIDES = ('Offense', 'Defense')
+
+PLAY_TRACKING_QUERY = """
+    SELECT
+        {columns}
+    FROM vw_complete_tracking
+    WHERE game_id = %s AND play_id = %s{filters}
+    ORDER BY frame_id, nfl_id
+"""
+
+
+def _int_list(value, name):
+    try:
+        return [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of integers")
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+
+def parse_filters(args):
+    """
+    Read the tracking filter parameters from request args.
+
+    Returns a dict with only the filters that were given (empty when the
+    whole play is wanted). Raises ValueError with a message for the client.
+    """
+    filters = {}
+
+    if args.get('from_frame'):
+        filters['from_frame'] = _int(args['from_frame'], 'from_frame')
+    if args.get('to_frame'):
+        filters['to_frame'] = _int(args['to_frame'], 'to_frame')
+    if 'from_frame' in filters and 'to_frame' in filters and filters['from_frame'] > filters['to_frame']:
+        raise ValueError('from_frame must not be greater than to_frame')
+
+    if args.get('nfl_ids'):
+        filters['nfl_ids'] = _int_list(args['nfl_ids'], 'nfl_ids')
+
+    if args.get('side'):
+        side = args['side'].capitalize()
+        if side not in SIDES:
+            raise ValueError(f"side must be one of: {', '.join(SIDES)}")
+        filters['side'] = side
+
+    if args.get('position'):
+        filters['position'] = [p.strip().upper() for p in args['position'].split(',') if p.strip()]
+
+    if args.get('fields'):
+        fields = [f.strip().lower() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in TRACKING_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        filters['fields'] = fields
+
+    return filters
+
+
+def select_columns(filters):
+    """Columns to return, in TRACKING_COLUMNS order"""
+    fields = filters.get('fields')
+    if not fields:
+        return TRACKING_COLUMNS
+    return tuple(c for c in TRACKING_COLUMNS if c in KEY_COLUMNS or c in fields)
+
+
+def build_query(game_id, play_id, filters=None):
+    """(query, params) for one play's tracking rows, with filters pushed down"""
+    filters = filters or {}
+    clauses = []
+    params = [game_id, play_id]
+
+    if 'from_frame' in filters:
+        clauses.append('frame_id >= %s')
+        params.append(filters['from_frame'])
+    if 'to_frame' in filters:
+        clauses.append('frame_id <= %s')
+        params.append(filters['to_frame'])
+    if 'nfl_ids' in filters:
+        clauses.append('nfl_id = ANY(%s)')
+        params.append(filters['nfl_ids'])
+    if 'side' in filters:
+        clauses.append('player_side = %s')
+        params.append(filters['side'])
+    if 'position' in filters:
+        clauses.append('player_position = ANY(%s)')
+        params.append(filters['position'])
+
+    # Column names come from TRACKING_COLUMNS, never from the request
+    query = PLAY_TRACKING_QUERY.format(
+        columns=',\n        '.join(select_columns(filters)),
+        filters=''.join('\n        AND ' + clause for clause in clauses)
+    )
+    return query, params
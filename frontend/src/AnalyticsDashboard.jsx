@@ -12,6 +12,7 @@ function AnalyticsDashboard() {
   const [heatmapData, setHeatmapData] = useState([]);
   const [formationData, setFormationData] = useState([]);
   const [teams, setTeams] = useState([]);
+  const [weeks, setWeeks] = useState([...Array(18)].map((_, i) => i + 1));
   const [loading, setLoading] = useState(true);
   const [filterType, setFilterType] = useState('side');
   const [selectedFilter, setSelectedFilter] = useState('all');
@@ -19,13 +20,16 @@ function AnalyticsDashboard() {
   const [selectedTeam, setSelectedTeam] = useState('all');
 
   useEffect(() => {
-    // Fetch teams list on mount
-    axios.get('https://nfl-analytics-production.up.railway.app/api/analytics/teams')
+    // Fetch the team and week filter options on mount
+    axios.get('https://nfl-analytics-production.up.railway.app/api/meta')
       .then(response => {
-        setTeams(response.data);
+        setTeams(response.data.teams);
+        if (response.data.weeks.length > 0) {
+          setWeeks(response.data.weeks);
+        }
       })
       .catch(err => {
-        console.error('Error fetching teams:', err);
+        console.error('Error fetching filter options:', err);
       });
   }, []);
 
@@ -34,16 +38,10 @@ function AnalyticsDashboard() {
   }, [filterType, selectedFilter, selectedWeek, selectedTeam]);
 
   const fetchAllData = () => {
-    fetchSpeedData();
-    fetchRouteData();
-    fetchHeatmapData();
-    fetchFormationData();
-  };
-
-  const fetchSpeedData = () => {
     setLoading(true);
     
-    let url = 'https://nfl-analytics-production.up.railway.app/api/analytics/speed-stats';
+    // One request runs all four sections concurrently on the backend
+    let url = 'https://nfl-analytics-production.up.railway.app/api/analytics/dashboard';
     const params = [];
     
     if (selectedFilter !== 'all') {
@@ -68,90 +66,26 @@ function AnalyticsDashboard() {
     
     axios.get(url)
       .then(response => {
-        setSpeedData(response.data);
+        const sections = response.data.sections;
+        const sectionData = (name) => {
+          if (sections[name].error) {
+            console.error(`Error fetching ${name} data:`, sections[name].error);
+          }
+          return sections[name].data || [];
+        };
+        
+        setSpeedData(sectionData('speed-stats'));
+        setRouteData(sectionData('route-analysis'));
+        setHeatmapData(sectionData('down-distance-heatmap'));
+        setFormationData(sectionData('formation-matchup'));
         setLoading(false);
       })
       .catch(err => {
-        console.error('Error fetching speed data:', err);
+        console.error('Error fetching dashboard data:', err);
         setLoading(false);
       });
   };
 
-  const fetchRouteData = () => {
-    let url = 'https://nfl-analytics-production.up.railway.app/api/analytics/route-analysis';
-    const params = [];
-    
-    if (selectedWeek !== 'all') {
-      params.push(`week=${selectedWeek}`);
-    }
-    
-    if (selectedTeam !== 'all') {
-      params.push(`team=${selectedTeam}`);
-    }
-    
-    if (params.length > 0) {
-      url += '?' + params.join('&');
-    }
-    
-    axios.get(url)
-      .then(response => {
-        setRouteData(response.data);
-      })
-      .catch(err => {
-        console.error('Error fetching route data:', err);
-      });
-  };
-
-  const fetchHeatmapData = () => {
-    let url = 'https://nfl-analytics-production.up.railway.app/api/analytics/down-distance-heatmap';
-    const params = [];
-    
-    if (selectedWeek !== 'all') {
-      params.push(`week=${selectedWeek}`);
-    }
-    
-    if (selectedTeam !== 'all') {
-      params.push(`team=${selectedTeam}`);
-    }
-    
-    if (params.length > 0) {
-      url += '?' + params.join('&');
-    }
-    
-    axios.get(url)
-      .then(response => {
-        setHeatmapData(response.data);
-      })
-      .catch(err => {
-        console.error('Error fetching heatmap data:', err);
-      });
-  };
-
-  const fetchFormationData = () => {
-    let url = 'https://nfl-analytics-production.up.railway.app/api/analytics/formation-matchup';
-    const params = [];
-    
-    if (selectedWeek !== 'all') {
-      params.push(`week=${selectedWeek}`);
-    }
-    
-    if (selectedTeam !== 'all') {
-      params.push(`team=${selectedTeam}`);
-    }
-    
-    if (params.length > 0) {
-      url += '?' + params.join('&');
-    }
-    
-    axios.get(url)
-      .then(response => {
-        setFormationData(response.data);
-      })
-      .catch(err => {
-        console.error('Error fetching formation data:', err);
-      });
-  };
-
   return (
     <div className="analytics-dashboard">
       <header className="dashboard-header">
@@ -212,8 +146,8 @@ function AnalyticsDashboard() {
             className="filter-select"
           >
             <option value="all">All Weeks</option>
-            {[...Array(18)].map((_, i) => (
-              <option key={i + 1} value={i + 1}>Week {i + 1}</option>
+            {weeks.map(week => (
+              <option key={week} value={week}>Week {week}</option>
             ))}
           </select>
         </div>
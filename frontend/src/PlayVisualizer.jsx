@@ -3,6 +3,7 @@ import axios from 'axios';
 import PlayInfoPanel from './PlayInfoPanel';
 import PreSnapView from './PreSnapView';
 import RouteView from './RouteView';
+import { decodeColumnarTracking } from './trackingFormat';
 
 function PlayVisualizer() {
   const [games, setGames] = useState([]);
@@ -44,9 +45,9 @@ function PlayVisualizer() {
     setSelectedPlay(play.play_id);
     setPlayInfo(play);
     
-    axios.get(`https://nfl-analytics-production.up.railway.app/api/play/${selectedGame}/${play.play_id}/tracking`)
+    axios.get(`https://nfl-analytics-production.up.railway.app/api/play/${selectedGame}/${play.play_id}/tracking?format=columnar`)
       .then(response => {
-        setTrackingData(response.data.tracking);
+        setTrackingData(decodeColumnarTracking(response.data));
       })
       .catch(err => {
         console.error('Error fetching tracking data:', err);
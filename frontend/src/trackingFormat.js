@@ -0,0 +1,24 @@
+// Expands the compact columnar tracking payload (/tracking?format=columnar)
+// back into the one-object-per-row shape the play views render. Payloads
+// requested with ?fields= only carry some columns; rows get just those.
+export const decodeColumnarTracking = (payload) => {
+  const { players, data_sources: dataSources, frames, frame_offsets: offsets, columns } = payload;
+  const valueColumns = ['x', 'y', 's', 'a', 'dir', 'o'].filter((name) => columns[name]);
+  const rows = [];
+
+  frames.forEach((frameId, f) => {
+    for (let i = offsets[f]; i < offsets[f + 1]; i++) {
+      const row = { frame_id: frameId, ...players[columns.player[i]] };
+      valueColumns.forEach((name) => {
+        row[name] = columns[name][i];
+      });
+      const source = dataSources[columns.data_source[i]];
+      if (source !== null && source !== undefined) {
+        row.data_source = source;
+      }
+      rows.push(row);
+    }
+  });
+
+  return rows;
+};